@@ -1,67 +1,263 @@
+import threading
+import time
+
 import sounddevice as sd
 import numpy as np
 
+from synth.ringbuffer import RingBuffer
+
+
 class AudioEngine:
-    def __init__(self, fs=44100):
-        """Initialise le moteur audio
+    def __init__(self, fs=44100, latency=0.1, metrics=None, fmt="float32", device=None, channels=1, device_latency=None,
+                 backoff=(0.05, 2.0), stall_timeout=0.5, fault_callbacks=20):
+        """Initialise le moteur audio en mode "pull" (callback)
         input:  - fs: Fréquence d'échantillonnage (en Hz) pour la génération du signal audio (par défaut 44100 Hz)
-        
-        1) Initialise la fréquence d'échantillonnage (self.fs) avec la valeur fournie
-        2) Tente de créer un flux de sortie audio avec la fréquence d'échantillonnage spécifiée, 1 canal, et le type de données int16
-        3) Si une erreur survient lors de l'initialisation du flux audio, affiche un message d'erreur et définit self.stream à None"""
-        try:
+                - fmt: Format des échantillons envoyés à la carte son ("float32" par défaut, ou "int16"), voir OutputStage
+                - latency: Profondeur du buffer circulaire en secondes. C'est elle qui fixe la latence, et non le timer de l'interface
+                - metrics: Instance de Metrics pour l'instrumentation (None : désactivée, aucun coût)
+                - device: Périphérique de sortie (index ou nom, voir sounddevice.query_devices). None : périphérique par défaut
+                - channels: Nombre de canaux de sortie (un bloc mono est recopié sur tous les canaux)
+                - device_latency: Latence demandée au pilote ("low", "high" ou en secondes). None : valeur par défaut de sounddevice
+                - backoff: (délai initial, délai maximal) en secondes entre deux tentatives de réouverture du flux (délai doublé à chaque échec)
+                - stall_timeout: Durée (en secondes) sans callback au-delà de laquelle le flux est considéré comme perdu
+                - fault_callbacks: Nombre de callbacks consécutifs signalant un underflow du pilote alors que le buffer avait des trames
+                  (défaut du périphérique, et non du rendu) au-delà duquel le flux est rouvert
+
+        1) Initialise la fréquence d'échantillonnage (self.fs) et les compteurs
+        2) Préalloue le buffer circulaire dans lequel SignalGenerator dépose les blocs à l'avance
+        3) Tente de créer et de démarrer le flux de sortie audio avec callback : PortAudio vient lui-même chercher les échantillons.
+           Le flux est ouvert une seule fois et reste ouvert
+        4) Si une erreur survient lors de l'initialisation du flux audio, affiche un message d'erreur et laisse self.stream à None
+           jusqu'à ce qu'une nouvelle tentative réussisse. Dans les deux cas, démarre le thread de surveillance, qui rouvre le flux
+           en cas de perte du périphérique et retente la première ouverture si elle a échoué (voir _supervise)
+
+        Attributs :
+        - ring : RingBuffer partagé entre le producteur (App) et le callback audio
+        - underruns : nombre de callbacks n'ayant pas trouvé assez d'échantillons dans le buffer pendant la lecture
+        - underrun_frames : nombre total de trames remplacées par du silence lors de ces underruns
+        - consumed : événement signalé à chaque callback, il cadence le thread de rendu sur l'horloge de la carte son
+        - metrics : instrumentation (jitter des callbacks, drapeaux d'état de PortAudio) ou None
+        - clock : (trames lues dans le buffer circulaire, heure perf_counter) au dernier callback, ou None avant le premier :
+                  horloge de lecture de la carte son, utilisée pour placer les événements horodatés (voir frame_at)
+        - faults, reopens, reopen_failures, reopen_time_last, reopen_time_max, dropped_frames, last_error :
+                  compteurs des pannes du flux et de leur réparation (voir stream_stats)
+        """
         # 1)
-            self.fs = fs
+        self.fs = fs
+        self.fmt = fmt
+        self.channels = int(channels)
+        self.underruns = 0 # Nombre de callbacks en manque d'échantillons
+        self.underrun_frames = 0 # Nombre de trames de silence insérées
+        self._feeding = False # Vrai tant que le producteur alimente le buffer (évite de compter le silence au repos comme un underrun)
+        self.consumed = threading.Event() # Signalé par le callback quand des trames ont été consommées
+        self.metrics = metrics
+        self.clock = None
+        self.backoff = backoff
+        self.stall_timeout = stall_timeout
+        self.fault_callbacks = fault_callbacks
+        self._bad_callbacks = 0 # Callbacks consécutifs avec underflow du pilote
+        self._fault = threading.Event() # Signalé (callback, fin de flux inattendue) quand le flux doit être rouvert
+        self._closing = threading.Event() # Signalé par terminate : plus de réouverture
+        self._lock = threading.Lock() # Ouverture et fermeture du flux (thread de surveillance et terminate)
+        self.faults = 0 # Pannes détectées
+        self.reopens = 0 # Réouvertures réussies
+        self.reopen_failures = 0 # Tentatives de réouverture échouées
+        self.reopen_time_last = 0.0 # Durée de la dernière interruption, de la détection à la reprise (s)
+        self.reopen_time_max = 0.0
+        self.dropped_frames = 0 # Trames non jouées pendant les interruptions (durée × fs)
+        self.last_error = None
         # 2)
-            self.stream = sd.OutputStream(samplerate=fs, channels=1, dtype='int16') 
-            self.stream.start()
-        # 3)    
+        self.ring = RingBuffer(int(latency * fs), channels=self.channels, dtype=np.dtype(fmt))
+        # 3)
+        options = {} if device_latency is None else {"latency": device_latency}
+        self._stream_args = dict(samplerate=fs, device=device, channels=self.channels, dtype=fmt, callback=self._callback,
+                                 finished_callback=self._finished, **options)
+        self.stream = None
+        try:
+            self._open()
+        # 4)
         except Exception as e:
-            print(f"Erreur lors de l'initialisation du flux audio : {e}")
+            print(f"Erreur lors de l'initialisation du flux audio : {e} (nouvelles tentatives en arrière-plan)")
             self.stream = None
+            self.last_error = f"ouverture du flux : {e}"
+        self._supervisor = threading.Thread(target=self._supervise, name="AudioSupervisor", daemon=True)
+        self._supervisor.start()
 
-    def play(self, data):
-        """Joue le signal audio fourni
-        input:  - data: Tableau de données audio à jouer (doit être un tableau numpy de type int16)
-
-        1) Vérifie que le flux audio est actif
-        2) Si le flux audio n'est pas actif, tente de le redémarrer
-        3) Tente d'écrire les données audio dans le flux, en s'assurant que les données sont correctement formatées pour l'audio (int16, mono)
-        4) Si une erreur survient, affiche un message d'erreur
+    def _open(self):
+        """Crée et démarre le flux de sortie (lève l'exception de sounddevice en cas d'échec)"""
+        stream = sd.OutputStream(**self._stream_args)
+        stream.start()
+        self.stream = stream
 
+    def _callback(self, outdata, frames, time_info, status):
+        """Callback appelé par PortAudio (thread audio) à chaque fois que la carte son a besoin de trames
+        1) Copie les trames disponibles du buffer circulaire dans outdata (silence pour le reste)
+        2) Si le buffer n'a pas pu fournir toutes les trames pendant la lecture, compte un underrun
+        3) Transmet l'heure d'appel et les drapeaux d'état (underflow, overflow) à l'instrumentation si elle est activée.
+           Un underflow signalé par le pilote alors que le buffer a fourni toutes les trames vient du périphérique :
+           après fault_callbacks callbacks consécutifs de ce type, le thread de surveillance est prévenu (rien n'est rouvert ici)
+        4) Met à jour l'horloge de lecture (une seule affectation : le thread de rendu lit toujours un couple cohérent)
+           et réveille le thread de rendu : de la place vient de se libérer dans le buffer
+        Aucune allocation de tableau ici : ce code s'exécute sur le thread temps réel.
         """
         # 1)
-        if self.stream is None or not self.stream.active: # Vérifie que le flux audio est actif
+        n = self.ring.read_into(outdata)
         # 2)
-            try:
-                self.stream = sd.OutputStream(samplerate=self.fs, channels=1, dtype='int16') # Tente de redémarrer le flux audio
-                self.stream.start() # Démarre le flux audio
-            except Exception as e: # Si une erreur survient lors du redémarrage du flux audio
-                print(f"Erreur lors du redémarrage du flux audio : {e}") # Affiche un message d'erreur
-                return # Quitte la méthode si le flux audio ne peut pas être redémarré
+        if n < frames and self._feeding:
+            self.underruns += 1
+            self.underrun_frames += frames - n
         # 3)
-        try:
-            if isinstance(data, np.ndarray): # Vérifie que les données sont un tableau numpy
-                data = np.asarray(data, dtype=np.int16) # Assure que les données sont de type int16 pour l'audio
-                if data.ndim > 1: # Si les données ont plus d'une dimension (ex: stéréo), les convertit en mono en prenant la moyenne des canaux
-                    data = data.mean(axis=1).astype(np.int16) # Convertit en mono et assure que le résultat est de type int16
-                elif data.ndim == 1: # Si les données sont déjà mono, assure qu'elles sont de type int16
-                    data = data.astype(np.int16)
-                if data.ndim == 1: # Si les données sont mono, les reshape pour qu'elles soient compatibles avec le flux audio (shape (N, 1))
-                    data = data.reshape(-1, 1) # Reshape pour mono
-            self.stream.write(data) # transmet à la carte son via PortAudio, qui le joue dans les haut-parleurs.
+        if self.metrics is not None:
+            self.metrics.record_callback(frames, status)
+        if status and status.output_underflow and n == frames:
+            self._bad_callbacks += 1
+            if self._bad_callbacks >= self.fault_callbacks:
+                self._fault.set()
+        else:
+            self._bad_callbacks = 0
         # 4)
-        except Exception as e: # Si une erreur survient lors de la lecture des données audio
-            print(f"Erreur lors de la lecture des données audio : {e}") # Affiche un message d'erreur
+        self.clock = (self.ring.read_position(), time.perf_counter())
+        self.consumed.set()
+
+    def _finished(self):
+        """Appelé par sounddevice quand le flux s'arrête : hors de terminate, c'est une panne (périphérique débranché, erreur du pilote)"""
+        if not self._closing.is_set():
+            self._fault.set()
+
+    def _supervise(self):
+        """Thread de surveillance du flux (jamais le thread audio ni celui de l'interface)
+        1) Si la première ouverture a échoué (voir __init__), la retente comme une réouverture, avec le même backoff
+        2) Attend un signal de panne, ou vérifie périodiquement que le flux est actif et que les callbacks arrivent
+        3) En cas de panne, rouvre le flux (voir _recover)
+        """
+        # 1)
+        if self.stream is None:
+            self._recover(self.last_error)
+        interval = min(self.stall_timeout / 2, 0.25)
+        while not self._closing.is_set():
+            # 2)
+            reason = "erreur signalée par le flux" if self._fault.wait(interval) else None
+            if self._closing.is_set():
+                return
+            stream, clock = self.stream, self.clock
+            if reason is None and stream is not None:
+                if not stream.active:
+                    reason = "flux arrêté"
+                elif clock is not None and time.perf_counter() - clock[1] > self.stall_timeout:
+                    reason = f"aucun callback depuis {self.stall_timeout * 1000:.0f} ms"
+            # 3)
+            if reason is not None:
+                self._recover(reason)
+
+    def _recover(self, reason):
+        """Ferme le flux en panne et le rouvre avec un délai croissant entre les tentatives (backoff borné)
+        1) Invalide l'horloge de lecture (les événements horodatés sont joués au prochain bloc) et ferme l'ancien flux
+        2) Tente de rouvrir; en cas d'échec, attend (délai doublé à chaque fois, au plus backoff[1]) puis recommence
+        3) Enregistre la durée de l'interruption et le nombre de trames non jouées
+        Le buffer circulaire n'est pas vidé : la lecture reprend sur les trames déjà rendues, sans rafale ni trou supplémentaire.
+        """
+        start = time.perf_counter()
+        self.faults += 1
+        self.last_error = reason
+        print(f"Erreur du flux audio ({reason}) : réouverture")
+        # 1)
+        self.clock = None
+        with self._lock:
+            old, self.stream = self.stream, None
+            if old is not None:
+                try:
+                    old.abort()
+                    old.close()
+                except Exception:
+                    pass # Le périphérique a peut-être déjà disparu
+        self.clock = None # Un dernier callback de l'ancien flux a pu la remettre à jour
+        # 2)
+        delay = self.backoff[0]
+        while not self._closing.is_set():
+            with self._lock:
+                if self._closing.is_set():
+                    return
+                try:
+                    self._open()
+                    break
+                except Exception as e:
+                    self.reopen_failures += 1
+                    self.last_error = f"{reason}; réouverture : {e}"
+            self._closing.wait(delay)
+            delay = min(delay * 2, self.backoff[1])
+        else:
+            return
+        # 3)
+        elapsed = time.perf_counter() - start
+        self.reopens += 1
+        self.reopen_time_last = elapsed
+        self.reopen_time_max = max(self.reopen_time_max, elapsed)
+        self.dropped_frames += int(elapsed * self.fs)
+        self._bad_callbacks = 0
+        self._fault.clear()
+        print(f"Flux audio rouvert en {elapsed * 1000:.0f} ms")
+
+    def stream_stats(self):
+        """Compteurs de pannes et de réouvertures du flux"""
+        return {
+            "faults": self.faults,
+            "reopens": self.reopens,
+            "reopen_failures": self.reopen_failures,
+            "reopen_ms_last": self.reopen_time_last * 1000,
+            "reopen_ms_max": self.reopen_time_max * 1000,
+            "dropped_frames": self.dropped_frames,
+            "last_error": self.last_error,
+        }
+
+    def frame_at(self, t):
+        """Estime l'index (dans le flux de trames déposées par play) de la trame lue par le callback à l'heure t (perf_counter)
+        output: Index de trame (float), ou None si le flux n'a pas encore démarré (ou est en cours de réouverture)
+        """
+        clock = self.clock
+        if clock is None:
+            return None
+        frame, at = clock
+        return frame + (t - at) * self.fs
+
+    def free_frames(self):
+        """Retourne le nombre de trames pouvant être déposées dans le buffer sans bloquer"""
+        return self.ring.free()
+
+    def fill_level(self):
+        """Retourne le taux de remplissage du buffer circulaire (entre 0.0 et 1.0)"""
+        return self.ring.available() / self.ring.capacity
+
+    def play(self, data):
+        """Dépose le signal audio fourni dans le buffer circulaire, sans jamais bloquer
+        input:  - data: Tableau numpy au format du moteur (fmt), de forme (n,) (recopié sur tous les canaux) ou (n, channels),
+                  sortant de OutputStage.process
+        output: Nombre de trames effectivement déposées (0 si le buffer est plein)
+
+        1) Indique que le producteur alimente le flux (les manques seront comptés comme underruns)
+        2) Copie les données dans le buffer circulaire; le callback audio les jouera à son rythme
+        """
+        # 1)
+        self._feeding = True
+        # 2)
+        return self.ring.write(data)
+
+    def stop_feeding(self):
+        """Indique que le producteur a fini de jouer : le silence qui suit n'est plus un underrun"""
+        self._feeding = False
 
     def terminate(self):
         """Termine le flux audio proprement
-        Vérifie si le flux audio existe, et s'il est actif, tente de le stopper et de le fermer. Si une erreur survient, affiche un message d'erreur
+        Arrête le thread de surveillance (plus de réouverture), puis vérifie si le flux audio existe, et s'il est actif, tente de le stopper et de le fermer.
+        Si une erreur survient, affiche un message d'erreur
         """
-
-        if self.stream is not None: # Vérifie si le flux audio existe
-            try:
-                self.stream.stop() # Tente de stopper le flux audio
-                self.stream.close() # Tente de fermer le flux audio
-            except Exception as e: # Si une erreur survient lors de la terminaison du flux audio
-                print(f"Erreur lors de la terminaison du flux audio : {e}") # Affiche un message d'erreur
+        self._closing.set() # Interrompt l'attente entre deux tentatives de réouverture
+        self._fault.set() # Réveille le thread de surveillance
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=1.0)
+        with self._lock:
+            if self.stream is not None: # Vérifie si le flux audio existe
+                try:
+                    self.stream.stop() # Tente de stopper le flux audio
+                    self.stream.close() # Tente de fermer le flux audio
+                except Exception as e: # Si une erreur survient lors de la terminaison du flux audio
+                    print(f"Erreur lors de la terminaison du flux audio : {e}") # Affiche un message d'erreur
@@ -0,0 +1,121 @@
+"""Banc d'essai des méthodes anti-repliement du carré et de la dent de scie
+
+Compare, pour chaque forme d'onde :
+- naive : forme d'onde calculée directement (OscillatorBank, "Carré" / "Dents de scie")
+- polyblep : forme d'onde corrigée par polyBLEP ("Carré (polyBLEP)" / "Dents de scie (polyBLEP)")
+- table : tables d'onde à bande limitée ("Carré (table)" / "Dents de scie (table)")
+- oversample4x : forme d'onde naïve rendue à 4 × fs puis filtrée passe-bas et décimée
+
+Deux mesures :
+- le temps CPU par voix et par seconde d'audio (en ms)
+- l'énergie de repliement : part de l'énergie hors des harmoniques de la note (en dB, plus bas = mieux)
+
+Utilisation : python benchmarks/bench_antialiasing.py [--fs 44100] [--voices 16] [--freq 3520]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Modules du synthé à la racine du dépôt
+from synth.generator import OscillatorBank, SignalGenerator  # noqa: E402
+
+BLOCK = 512 # Taille de bloc utilisée pour le rendu
+OVERSAMPLE = 4
+
+
+def decimation_filter(factor, taps=63):
+    """Filtre passe-bas FIR (sinus cardinal fenêtré par Blackman) coupant à la fréquence de Nyquist de la sortie décimée"""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(n / factor) * np.blackman(taps)
+    return h / h.sum()
+
+
+class Oversampled:
+    """Rendu naïf à OVERSAMPLE × fs, filtrage passe-bas et décimation du mix (un seul filtrage pour toutes les voix)"""
+
+    def __init__(self, fs, freqs):
+        self.bank = OscillatorBank(fs * OVERSAMPLE, max_voices=len(freqs), max_frames=BLOCK * OVERSAMPLE, dtype=np.float32)
+        for i, f in enumerate(freqs):
+            self.bank.add_voice(i, f)
+        self.h = decimation_filter(OVERSAMPLE)
+        self.buf = np.zeros(BLOCK * OVERSAMPLE, dtype=np.float32)
+        self.history = np.zeros(len(self.h) - 1, dtype=np.float32) # Fin du bloc précédent, pour un filtrage continu d'un bloc à l'autre
+
+    def render(self, out, wave):
+        self.bank.render(self.buf, wave)
+        full = np.convolve(np.concatenate((self.history, self.buf)), self.h, mode="valid")
+        self.history[:] = self.buf[-len(self.history):]
+        out[:] = full[::OVERSAMPLE]
+        return out
+
+
+def make_renderer(method, gen, freqs, wave):
+    """Retourne une fonction render(out) pour une méthode donnée"""
+    if method == "oversample4x":
+        over = Oversampled(gen.fs, freqs)
+        return lambda out: over.render(out, wave)
+    bank = gen.make_bank(max_voices=len(freqs), max_frames=BLOCK)
+    for i, f in enumerate(freqs):
+        bank.add_voice(i, f)
+    name = {"naive": wave, "polyblep": f"{wave} (polyBLEP)", "table": f"{wave} (table)"}[method]
+    return lambda out: bank.render(out, name)
+
+
+def cpu_per_voice(method, gen, wave, voices, seconds=1.0):
+    """Temps CPU moyen (ms) pour rendre une seconde d'audio d'une voix"""
+    freqs = list(440.0 * 2 ** (np.arange(voices) / 12 / 2)) # Voix réparties sur une octave
+    render = make_renderer(method, gen, freqs, wave)
+    out = np.zeros(BLOCK, dtype=np.float32) # Même type que la chaîne temps réel
+    n_blocks = int(seconds * gen.fs / BLOCK)
+    render(out) # Échauffement
+    start = time.perf_counter()
+    for _ in range(n_blocks):
+        render(out)
+    elapsed = time.perf_counter() - start
+    return elapsed / (n_blocks * BLOCK / gen.fs) / voices * 1000
+
+
+def alias_energy_db(method, gen, wave, freq, seconds=1.0):
+    """Énergie hors harmoniques (dB relatifs à l'énergie totale) d'une voix seule à la fréquence freq
+
+    Le signal est analysé par FFT avec une fenêtre de Blackman-Harris; les raies à ±3 cases de chaque harmonique
+    k·freq (sous Nyquist) sont considérées comme du signal, tout le reste comme du repliement.
+    """
+    render = make_renderer(method, gen, [freq], wave)
+    n_blocks = int(seconds * gen.fs / BLOCK)
+    sig = np.zeros(n_blocks * BLOCK, dtype=np.float32)
+    for b in range(n_blocks):
+        render(sig[b * BLOCK:(b + 1) * BLOCK])
+    window = np.blackman(len(sig)) # Fenêtre à faible fuite spectrale
+    power = np.abs(np.fft.rfft(sig * window)) ** 2
+    bins_hz = gen.fs / len(sig)
+    harmonic = np.zeros(len(power), dtype=bool)
+    for k in range(1, int(gen.fs / 2 // freq) + 1):
+        centre = int(round(k * freq / bins_hz))
+        harmonic[max(centre - 3, 0):centre + 4] = True
+    alias = power[~harmonic].sum()
+    return 10 * np.log10(alias / power.sum() + 1e-20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--voices", type=int, default=16)
+    parser.add_argument("--freq", type=float, default=3520.0, help="Fréquence de la note analysée (aiguë pour faire ressortir le repliement)")
+    args = parser.parse_args()
+
+    gen = SignalGenerator(args.fs)
+    print(f"fs = {args.fs} Hz, {args.voices} voix, note analysée {args.freq} Hz")
+    print(f"{'forme':<15}{'méthode':<15}{'CPU/voix (ms/s)':>18}{'repliement (dB)':>18}")
+    for wave in ("Carré", "Dents de scie"):
+        for method in ("naive", "polyblep", "table", "oversample4x"):
+            cpu = cpu_per_voice(method, gen, wave, args.voices)
+            alias = alias_energy_db(method, gen, wave, args.freq)
+            print(f"{wave:<15}{method:<15}{cpu:>18.3f}{alias:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
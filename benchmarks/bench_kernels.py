@@ -0,0 +1,115 @@
+"""Banc d'essai des backends de calcul (kernels.py) : parité et temps de rendu, numpy contre numba
+
+1) Parité : rend la même séquence de notes (attaque, relâchement de la moitié des notes, mono et stéréo avec unisson) avec les deux
+   backends, pour chaque forme d'onde, en float64 et en float32, et affiche l'écart maximal. La boucle compilée calcule la phase en
+   float64 : en float32, l'écart est celui de la phase arrondie de la version numpy (de l'ordre de 1e-4 sur les formes d'onde à
+   front raide), en float64 il doit rester au niveau de l'arrondi. Vérifie aussi OutputStage (au plus un pas de quantification en int16).
+   Le script se termine avec le code 1 si un écart dépasse sa tolérance (mêmes vérifications, boucle par boucle : tests/test_kernels.py).
+2) Temps : temps médian de rendu d'un bloc (VoiceAllocator, enveloppe comprise, puis OutputStage) pour --voices voix,
+   avec chaque backend, et accélération de numba.
+
+Nécessite Numba (pip install numba). La première exécution compile les boucles (cache disque) : elle est plus lente.
+
+Utilisation : python benchmarks/bench_kernels.py [--voices 1 8 32 128] [--block 256] [--wave "Dents de scie (polyBLEP)"] [--channels 2 --unison 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Modules du synthé à la racine du dépôt
+from synth import kernels  # noqa: E402
+from synth.generator import WAVE_TYPES, SignalGenerator  # noqa: E402
+from synth.output_stage import OutputStage  # noqa: E402
+from synth.voices import VoiceAllocator  # noqa: E402
+
+TOLERANCE = {np.float64: 1e-9, np.float32: 2e-4} # Écart maximal accepté entre les deux backends
+
+
+def play(gen, voices, block, blocks, wave, dtype=np.float32, channels=1, unison=1):
+    """Joue voices notes (la moitié relâchées au quart du rendu) avec le backend de gen
+    output: (signal rendu, temps de rendu de chaque bloc)
+    """
+    pool = VoiceAllocator(gen.make_bank(max_voices=voices, max_frames=block, dtype=dtype, channels=channels, unison=unison, detune=10.0,
+                                        spread=0.7), release=0.02)
+    for k in range(voices):
+        pool.note_on(k, 55.0 * 2 ** (k * 7 % 60 / 12), 0.8, pan=(k % 5 - 2) / 2)
+    out = np.zeros((block, channels) if channels > 1 else block, dtype=dtype)
+    sig = np.zeros((blocks,) + out.shape, dtype=dtype)
+    times = np.zeros(blocks)
+    for b in range(blocks):
+        if b == blocks // 4:
+            for k in range(0, voices, 2):
+                pool.note_off(k)
+        start = time.perf_counter()
+        pool.render(out, wave)
+        times[b] = time.perf_counter() - start
+        sig[b] = out
+    return sig, times
+
+
+def parity(gens, block):
+    """Écart maximal entre les backends pour chaque forme d'onde, type et configuration de canaux
+    output: True si tous les écarts sont dans la tolérance
+    """
+    ok = True
+    print(f"{'forme d’onde':<26}{'type':>9}{'canaux':>8}{'unisson':>9}{'écart max':>12}")
+    for wave in WAVE_TYPES:
+        for dtype in (np.float64, np.float32):
+            for channels, unison in ((1, 1), (2, 3)):
+                sig = [play(gen, 12, block, 40, wave, dtype, channels, unison)[0] for gen in gens]
+                diff = float(np.abs(sig[0].astype(np.float64) - sig[1]).max())
+                ok &= diff <= TOLERANCE[dtype]
+                print(f"{wave:<26}{np.dtype(dtype).name:>9}{channels:>8}{unison:>9}{diff:>12.2e}{'' if diff <= TOLERANCE[dtype] else '  ÉCHEC'}")
+    mix = (np.random.default_rng(0).standard_normal((block, 2)) * 0.8).astype(np.float32)
+    for fmt in ("float32", "int16"):
+        for soft_clip in (True, False):
+            out = [OutputStage(block, channels=2, fmt=fmt, soft_clip=soft_clip, backend=b).process(mix).astype(np.float64) for b in kernels.BACKENDS]
+            diff = float(np.abs(out[0] - out[1]).max())
+            tolerance = 1.0 if fmt == "int16" else 1e-6 # Arrondi d'un échantillon à la limite de deux pas
+            ok &= diff <= tolerance
+            print(f"{'OutputStage ' + ('douce' if soft_clip else 'écrêtage'):<26}{fmt:>9}{2:>8}{'-':>9}{diff:>12.2e}{'' if diff <= tolerance else '  ÉCHEC'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--voices", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--block", type=int, default=256)
+    parser.add_argument("--blocks", type=int, default=200, help="Nombre de blocs rendus par mesure")
+    parser.add_argument("--wave", default="Dents de scie (polyBLEP)")
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--unison", type=int, default=1)
+    args = parser.parse_args()
+
+    if not kernels.available():
+        sys.exit("Ce banc d'essai nécessite Numba (pip install numba)")
+    start = time.perf_counter()
+    gens = [SignalGenerator(args.fs, backend=b) for b in kernels.BACKENDS]
+    OutputStage(args.block, channels=args.channels, backend="numba")
+    print(f"Compilation ou chargement des boucles : {time.perf_counter() - start:.2f} s\n")
+    # 1)
+    ok = parity(gens, args.block)
+    # 2)
+    block_seconds = args.block / args.fs
+    print(f"\nfs = {args.fs} Hz, blocs de {args.block} trames ({block_seconds * 1e6:.0f} µs), {args.wave}, {args.channels} canal(aux), unisson {args.unison}")
+    print(f"{'voix':>6}{'numpy (µs)':>13}{'numba (µs)':>13}{'accélération':>14}{'charge numba':>14}")
+    stages = [OutputStage(args.block, channels=args.channels, backend=b) for b in kernels.BACKENDS]
+    for voices in args.voices:
+        medians = []
+        for gen, stage in zip(gens, stages):
+            sig, times = play(gen, voices, args.block, args.blocks, args.wave, channels=args.channels, unison=args.unison)
+            start = time.perf_counter()
+            for block in sig:
+                stage.process(block)
+            medians.append(np.median(times) + (time.perf_counter() - start) / len(sig))
+        print(f"{voices:>6}{medians[0] * 1e6:>13.1f}{medians[1] * 1e6:>13.1f}{medians[0] / medians[1]:>13.1f}×"
+              f"{medians[1] / block_seconds:>13.1%}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
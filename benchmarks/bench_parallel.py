@@ -0,0 +1,72 @@
+"""Banc d'essai du rendu des voix réparti sur plusieurs processus (parallel.ParallelVoices)
+
+Rend un accord dense (voix réparties sur plusieurs octaves, désaccordées deux à deux comme une pile "detune")
+avec 0 (rendu dans le processus courant), 2, 4, ... workers, et affiche pour chaque configuration :
+- le temps médian de rendu d'un bloc (en µs)
+- le facteur temps réel (temps de rendu / durée audio du bloc, < 1 : plus rapide que le temps réel)
+- l'écart maximal avec le rendu dans le processus courant (doit rester de l'ordre de la précision du float32)
+
+Utilisation : python benchmarks/bench_parallel.py [--voices 128] [--block 512] [--workers 2 4 8] [--wave "Dents de scie (polyBLEP)"]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Modules du synthé à la racine du dépôt
+from synth.generator import SignalGenerator  # noqa: E402
+from synth.parallel import make_voices  # noqa: E402
+
+
+def chord(voices):
+    """Fréquences d'un accord dense : notes réparties sur trois octaves, chacune doublée à +7 cents"""
+    base = [110.0 * 2 ** ((i * 7 % 36) / 12) for i in range(voices // 2 + voices % 2)]
+    return [f * d for f in base for d in (1.0, 2 ** (7 / 1200))][:voices]
+
+
+def render(gen, workers, voices, block, wave, blocks):
+    """Rend blocks blocs et retourne (temps de chaque bloc, signal rendu)"""
+    pool = make_voices(gen, max_voices=voices, max_frames=block, workers=workers, release=0.05, timeout=5.0) # Blocs jamais sautés : écart comparable
+    try:
+        for i, f in enumerate(chord(voices)):
+            pool.note_on(i, f, 0.5)
+        out = np.zeros(block, dtype=pool.dtype)
+        sig = np.zeros(blocks * block, dtype=np.float32)
+        times = np.zeros(blocks)
+        for b in range(blocks):
+            start = time.perf_counter()
+            pool.render(out, wave)
+            times[b] = time.perf_counter() - start
+            sig[b * block:(b + 1) * block] = out
+    finally:
+        pool.close()
+    return times, sig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--voices", type=int, default=128)
+    parser.add_argument("--block", type=int, default=512)
+    parser.add_argument("--blocks", type=int, default=200, help="Nombre de blocs rendus par configuration")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    parser.add_argument("--wave", default="Dents de scie (polyBLEP)")
+    args = parser.parse_args()
+
+    gen = SignalGenerator(args.fs)
+    block_seconds = args.block / args.fs
+    print(f"fs = {args.fs} Hz, {args.voices} voix, blocs de {args.block} trames, {args.wave}, {os.cpu_count()} cœurs")
+    print(f"{'workers':>8}{'médiane (µs)':>15}{'rtf':>10}{'écart max':>12}")
+    reference = None
+    for workers in [0] + sorted(set(w for w in args.workers if w > 1)):
+        times, sig = render(gen, workers, args.voices, args.block, args.wave, args.blocks)
+        if reference is None:
+            reference = sig
+        median = np.median(times[1:]) # Le premier bloc inclut l'échauffement
+        print(f"{workers:>8}{median * 1e6:>15.1f}{median / block_seconds:>10.4f}{np.abs(sig - reference).max():>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Banc d'essai du cache de périodes (period_cache.py) : accord tenu rendu avec et sans cache
+
+Joue --voices notes tenues (hauteurs aléatoires sur quatre octaves, attaques étalées sur les premiers blocs : phases toutes différentes),
+avec chaque backend disponible, sans cache puis avec un PeriodCache, et affiche :
+    - le temps médian de rendu d'un bloc (VoiceAllocator, enveloppe comprise) une fois les notes stables, et l'accélération
+    - les lectures servies par le cache, les boucles calculées, la mémoire occupée
+    - l'écart maximal avec le rendu des mêmes notes (accord arrondi à max_cents près) calculées à chaque bloc : arrondi de la phase
+      à la grille du cache et calcul des boucles en float64; les formes d'onde naïves "Carré" et "Dents de scie" peuvent avancer
+      un front d'une trame (écart de l'ordre de 1 sur une trame)
+
+Utilisation : python benchmarks/bench_period_cache.py [--voices 8 32 128] [--block 256] [--wave "Dents de scie (polyBLEP)"] [--cache-mb 32]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Modules du synthé à la racine du dépôt
+from synth import kernels  # noqa: E402
+from synth.generator import SignalGenerator  # noqa: E402
+from synth.period_cache import PeriodCache  # noqa: E402
+from synth.voices import VoiceAllocator  # noqa: E402
+
+
+def play(gen, voices, block, blocks, wave, channels=1, unison=1, seed=0):
+    """Joue un accord de voices notes tenues, attaquées une par bloc au début du rendu
+    output: (signal rendu, temps de rendu de chaque bloc)
+    """
+    rng = np.random.default_rng(seed)
+    freqs = 55.0 * 2 ** rng.uniform(0, 4, voices)
+    pool = VoiceAllocator(gen.make_bank(max_voices=voices, max_frames=block, channels=channels, unison=unison, detune=10.0, spread=0.7),
+                          attack=0.005, release=0.05)
+    out = np.zeros((block, channels) if channels > 1 else block, dtype=np.float32)
+    sig = np.zeros((blocks,) + out.shape, dtype=np.float32)
+    times = np.zeros(blocks)
+    for b in range(blocks):
+        if b < voices:
+            pool.note_on(b, float(freqs[b]), 0.5 / np.sqrt(voices), pan=(b % 5 - 2) / 2)
+        start = time.perf_counter()
+        pool.render(out, wave)
+        times[b] = time.perf_counter() - start
+        sig[b] = out
+    return sig, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--voices", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--block", type=int, default=256)
+    parser.add_argument("--blocks", type=int, default=200, help="Nombre de blocs mesurés après l'attaque de la dernière note")
+    parser.add_argument("--wave", default="Dents de scie (polyBLEP)")
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--unison", type=int, default=1)
+    parser.add_argument("--cache-mb", type=float, default=32.0, help="Mémoire maximale du cache (Mo)")
+    args = parser.parse_args()
+
+    backends = [b for b in kernels.BACKENDS if b == "numpy" or kernels.available()]
+    block_seconds = args.block / args.fs
+    print(f"fs = {args.fs} Hz, blocs de {args.block} trames ({block_seconds * 1e6:.0f} µs), {args.wave}, {args.channels} canal(aux), "
+          f"unisson {args.unison}, cache de {args.cache_mb:g} Mo")
+    print(f"{'backend':>8}{'voix':>6}{'sans (µs)':>11}{'avec (µs)':>11}{'accélération':>14}{'lectures':>10}{'boucles':>9}"
+          f"{'mémoire (Mo)':>14}{'écart max':>12}")
+    for backend in backends:
+        for voices in args.voices:
+            blocks = voices + 20 + args.blocks # Attaques, stabilisation, puis mesure
+            cache = PeriodCache(args.cache_mb * 2**20, max_frames=args.block)
+            reference = PeriodCache(0, max_frames=args.block, settle=blocks) # Mêmes notes arrondies, jamais lues dans une boucle
+            runs = [play(SignalGenerator(args.fs, backend=backend, period_cache=c), voices, args.block, blocks, args.wave,
+                         args.channels, args.unison) for c in (None, reference, cache)]
+            medians = [np.median(runs[k][1][-args.blocks:]) for k in (0, 2)]
+            diff = float(np.abs(runs[1][0] - runs[2][0]).max())
+            s = cache.stats()
+            print(f"{backend:>8}{voices:>6}{medians[0] * 1e6:>11.1f}{medians[1] * 1e6:>11.1f}{medians[0] / medians[1]:>13.1f}×"
+                  f"{s['hits']:>10}{s['misses']:>9}{s['bytes'] / 2**20:>14.1f}{diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Banc d'essai de l'échantillonneur (sampler.py) : chargement de la bibliothèque et défauts de page pendant le rendu
+
+1) Chargement : crée des bibliothèques de taille croissante (fichiers WAV int16 de --seconds secondes) et mesure pour chacune
+   le temps de SampleLibrary.load et la mémoire résidente ajoutée. Les fichiers sont projetés en mémoire, seuls leurs en-têtes
+   sont lus : le temps par fichier et la mémoire doivent rester constants, quelle que soit la durée des échantillons.
+2) Rendu : vide le cache du système pour ces fichiers (posix_fadvise DONTNEED), puis joue --voices notes sur des échantillons
+   différents, sans puis avec le thread de préchargement (Prefetcher, dont on attend le préchargement des débuts d'échantillons).
+   Affiche les défauts de page majeurs (lectures disque) subis par le thread de rendu et le temps de rendu du pire bloc.
+   Sur un système de fichiers en mémoire (tmpfs), le cache ne peut pas être vidé : utiliser --dir sur un disque.
+
+Utilisation : python benchmarks/bench_sampler.py [--files 8 64 256] [--seconds 10] [--voices 16] [--block 256] [--dir /var/tmp]
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Modules du synthé à la racine du dépôt
+from synth.sampler import Prefetcher, SampleLibrary, SamplerBank  # noqa: E402
+from synth.voices import VoiceAllocator  # noqa: E402
+from synth.wav_writer import WavWriter  # noqa: E402
+
+RUSAGE = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF) # Défauts de page du seul thread appelant (Linux)
+
+
+def rss_kib():
+    """Mémoire résidente courante du processus (en Kio), 0 si /proc n'est pas disponible"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return 0
+
+
+def make_library(folder, files, seconds, fs):
+    """Écrit files fichiers WAV int16 mono (notes racines consécutives à partir de 36), par blocs d'une seconde"""
+    t = np.arange(fs) / fs
+    for k in range(files):
+        root = 36 + k % 60
+        freq = 440.0 * 2 ** ((root - 69) / 12)
+        with WavWriter(os.path.join(folder, f"s{k:04d}_{root:03d}.wav"), fs=fs, fmt="int16") as writer:
+            for s in range(int(seconds)):
+                writer.write(np.round(16000 * np.sin(2 * np.pi * freq * (t + s))).astype(np.int16))
+
+
+def evict(library):
+    """Retire les fichiers de la bibliothèque du cache du système (le prochain accès lit le disque)"""
+    for s in library.samples:
+        fd = os.open(s.path, os.O_RDONLY)
+        try:
+            os.fsync(fd) # Les pages non encore écrites sur le disque ne peuvent pas être retirées
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def render(library, fs, voices, block, blocks, prefetch):
+    """Joue voices notes (une par échantillon) pendant blocks blocs
+    output: (défauts de page majeurs pendant le rendu, pire temps de rendu d'un bloc en µs)
+    """
+    pool = VoiceAllocator(SamplerBank(library, fs, max_voices=voices, max_frames=block), release=0.05)
+    prefetcher = None
+    if prefetch:
+        prefetcher = Prefetcher(pool.bank)
+        prefetcher.start()
+        prefetcher.ready.wait()
+    out = np.zeros(block, dtype=pool.dtype)
+    roots = sorted({s.root for s in library.samples})[:voices]
+    faults = resource.getrusage(RUSAGE).ru_majflt
+    worst = 0.0
+    try:
+        for note in roots:
+            pool.note_on(note, 440.0 * 2 ** ((note - 69) / 12), 0.5)
+        for _ in range(blocks):
+            start = time.perf_counter()
+            pool.render(out, None)
+            worst = max(worst, time.perf_counter() - start)
+        faults = resource.getrusage(RUSAGE).ru_majflt - faults
+    finally:
+        if prefetcher is not None:
+            prefetcher.stop()
+    return faults, worst * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--files", type=int, nargs="+", default=[8, 64, 256], help="Tailles de bibliothèque essayées (nombre de fichiers)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Durée de chaque échantillon (s)")
+    parser.add_argument("--voices", type=int, default=16)
+    parser.add_argument("--block", type=int, default=256)
+    parser.add_argument("--blocks", type=int, default=200, help="Nombre de blocs rendus par essai")
+    parser.add_argument("--dir", default=None, help="Dossier où créer les fichiers temporaires (par défaut celui du système)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as folder:
+        # 1)
+        print(f"{'fichiers':>9}{'Mo':>9}{'chargement (ms)':>17}{'µs / fichier':>14}{'RSS ajoutée (Kio)':>19}")
+        sizes = sorted(args.files)
+        make_library(folder, sizes[-1], args.seconds, args.fs)
+        names = sorted(n for n in os.listdir(folder) if n.endswith(".wav"))
+        for files in sizes:
+            index = os.path.join(folder, f"lib{files}.json") # Les files premiers fichiers (format JSON de SampleLibrary.load)
+            with open(index, "w") as f:
+                json.dump([{"file": name} for name in names[:files]], f)
+            size = sum(os.path.getsize(os.path.join(folder, n)) for n in names[:files]) / 2 ** 20
+            rss = rss_kib()
+            start = time.perf_counter()
+            library = SampleLibrary.load(index)
+            elapsed = time.perf_counter() - start
+            print(f"{files:>9}{size:>9.0f}{elapsed * 1000:>17.2f}{elapsed / files * 1e6:>14.1f}{rss_kib() - rss:>19}")
+        # 2)
+        print(f"\n{args.voices} voix, blocs de {args.block} trames ({args.block / args.fs * 1e6:.0f} µs)")
+        print(f"{'préchargement':>14}{'défauts majeurs':>17}{'pire bloc (µs)':>16}")
+        for prefetch in (False, True):
+            evict(library)
+            faults, worst = render(library, args.fs, args.voices, args.block, args.blocks, prefetch)
+            print(f"{'oui' if prefetch else 'non':>14}{faults:>17}{worst:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Banc d'essai du démarrage : temps d'import des modules et temps jusqu'au premier bloc rendu, dans des processus neufs
+
+Chaque scénario est lancé --repeat fois dans un nouvel interpréteur (python -X importtime) et donne :
+    - le temps médian du processus complet (lancement de l'interpréteur compris)
+    - le temps cumulé de l'import de premier niveau mesuré par -X importtime
+    - les --top modules les plus coûteux (temps propre, hors sous-modules) du dernier lancement
+Scénarios : import du paquet synth, de synth.generator, de offline.py et scheduler.py (hors carte son), et démarrage à froid jusqu'au
+premier bloc rendu (SignalGenerator + VoiceAllocator, une note) avec chaque backend. L'import de main.py et d'interface.py
+(PyQt5, pyqtgraph) n'est mesuré que si PyQt5 est installé, celui d'audio_engine.py que si sounddevice l'est.
+
+Utilisation : python benchmarks/bench_startup.py [--repeat 5] [--top 8]
+"""
+import argparse
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Démarrage à froid : imports, construction du générateur et d'un pool de voix, une note, un bloc
+FIRST_BLOCK = """
+import numpy as np
+from synth.generator import SignalGenerator
+from synth.voices import VoiceAllocator
+gen = SignalGenerator(44100, backend={backend!r})
+pool = VoiceAllocator(gen.make_bank(max_voices=32, max_frames=256))
+pool.note_on(69, 440.0)
+pool.render(np.zeros(256, dtype=np.float32), "Dents de scie (polyBLEP)")
+"""
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def scenarios():
+    """Liste (nom, code exécuté) des scénarios réalisables avec les modules installés"""
+    result = [("import synth", "import synth"),
+              ("import synth.generator", "import synth.generator"),
+              ("import offline", "import offline"),
+              ("import scheduler", "import scheduler")]
+    for backend in ("numpy", "auto"):
+        result.append((f"1er bloc ({backend})", FIRST_BLOCK.format(backend=backend)))
+    if importlib.util.find_spec("sounddevice") is not None:
+        result.append(("import audio_engine", "import audio_engine"))
+    if importlib.util.find_spec("PyQt5") is not None:
+        result.append(("import main", "import main"))
+        result.append(("import interface", "import interface"))
+    return result
+
+
+def parse_importtime(stderr):
+    """Lignes de -X importtime → (temps cumulé des imports de premier niveau en s, liste (temps propre en s, module))"""
+    total = 0.0
+    modules = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((int(self_us) * 1e-6, name))
+        if len(indent) == 1: # Import de premier niveau (les sous-imports sont indentés) : son temps cumulé inclut ses dépendances
+            total += int(cumulative_us) * 1e-6
+    return total, modules
+
+
+def run(code, repeat):
+    """Lance code repeat fois dans un interpréteur neuf
+    output: (temps des processus en s, temps d'import en s, modules du dernier lancement)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    walls = np.zeros(repeat)
+    imports = np.zeros(repeat)
+    for r in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+        walls[r] = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        imports[r], modules = parse_importtime(proc.stderr)
+    return walls, imports, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Lancements par scénario (médiane)")
+    parser.add_argument("--top", type=int, default=8, help="Modules les plus coûteux affichés par scénario")
+    args = parser.parse_args()
+
+    walls, baseline, _ = run("pass", args.repeat) # Interpréteur seul et ses propres imports (site, encodings...), retranchés des scénarios
+    print(f"Python {sys.version.split()[0]} : interpréteur seul {np.median(walls) * 1e3:.0f} ms (dont {np.median(baseline) * 1e3:.0f} ms d'imports)")
+    print(f"{'scénario':<26}{'processus (ms)':>16}{'imports (ms)':>14}  modules les plus coûteux (temps propre)")
+    for name, code in scenarios():
+        try:
+            walls, imports, modules = run(code, args.repeat)
+        except RuntimeError as e:
+            print(f"{name:<26}  échec : {e}")
+            continue
+        top = ", ".join(f"{module} {seconds * 1e3:.0f}" for seconds, module in sorted(modules, reverse=True)[:args.top])
+        print(f"{name:<26}{np.median(walls) * 1e3:>16.0f}{np.median(imports - baseline) * 1e3:>14.0f}  {top}")
+
+
+if __name__ == "__main__":
+    main()
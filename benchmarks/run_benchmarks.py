@@ -0,0 +1,213 @@
+"""Suite de bancs d'essai des chemins critiques (génération, mixage, conversion, affichage)
+
+Mesure, sans carte son ni fenêtre :
+- generator.get_block : SignalGenerator.get_block (sans état) par nombre de voix, taille de bloc, forme d'onde et fréquence d'échantillonnage
+- voices.render : rendu temps réel (VoiceAllocator + OscillatorBank, buffers préalloués) sur la même grille
+- voices.unison : rendu stéréo de 16 voix avec unisson (1 à 7 copies par voix, panoramique à puissance constante) par forme d'onde et taille de bloc
+- output.float32 / output.int16 : étage de sortie (OutputStage.process : limitation douce, dither TPDF pour l'int16, conversion) par taille de bloc
+- effects.filter / effects.delay / effects.reverb : chaque effet de la chaîne (effects.py, paramètres par défaut) par taille de bloc
+- display.scope : dépôt d'un bloc dans l'historique de l'oscilloscope (thread de rendu) et calcul d'une image (App.end_timer_callback)
+
+Chaque mesure donne le temps moyen et médian par bloc, et le facteur temps réel ("rtf") :
+temps de calcul médian / durée audio du bloc (< 1 : plus rapide que le temps réel; 0.01 = 1 % d'un cœur).
+
+Utilisation :
+    python benchmarks/run_benchmarks.py -o resultats.json
+    python benchmarks/run_benchmarks.py --quick -o nouveau.json --compare ancien.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT) # Modules du synthé à la racine du dépôt
+from scope import Scope  # noqa: E402
+from synth import kernels  # noqa: E402
+from synth.effects import EFFECTS  # noqa: E402
+from synth.generator import WAVE_TYPES, SignalGenerator  # noqa: E402
+from synth.output_stage import OutputStage  # noqa: E402
+from synth.voices import VoiceAllocator  # noqa: E402
+
+VOICES = [1, 4, 16, 64]
+UNISON = [1, 3, 7]
+BLOCKS = [64, 256, 1024, 4410]
+RATES = [44100, 48000]
+QUICK = {"voices": [1, 16], "blocks": [256, 1024], "rates": [44100], "waves": ["Sinus", "Carré", "Carré (polyBLEP)"]}
+
+
+def measure(func, block_frames, fs, min_time=0.05, min_reps=5):
+    """Appelle func() de façon répétée et retourne les statistiques de temps par appel (un appel = un bloc)"""
+    func() # Échauffement (caches, allocations paresseuses)
+    times = []
+    total = 0.0
+    while total < min_time or len(times) < min_reps:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    times = np.array(times)
+    block_seconds = block_frames / fs
+    return {
+        "reps": len(times),
+        "mean_us": float(times.mean() * 1e6),
+        "median_us": float(np.median(times) * 1e6),
+        "rtf": float(np.median(times) / block_seconds), # Médiane : moins sensible aux interruptions du système
+        "rtf_mean": float(times.mean() / block_seconds),
+    }
+
+
+def voice_freqs(n):
+    """n fréquences réparties sur trois octaves à partir du Do4"""
+    return [261.63 * 2 ** ((i * 5 % 36) / 12) for i in range(n)]
+
+
+def bench_get_block(gen, voices, block, wave):
+    freqs = voice_freqs(voices)
+    phases = {f: 0.0 for f in freqs}
+    duration = block / gen.fs
+    return measure(lambda: gen.get_block(freqs, phases, duration, wave), block, gen.fs)
+
+
+def bench_voices(gen, voices, block, wave):
+    alloc = VoiceAllocator(gen.make_bank(max_voices=voices, max_frames=block), release=0.05)
+    for i, f in enumerate(voice_freqs(voices)):
+        alloc.note_on(i, f)
+    out = np.zeros(block, dtype=alloc.bank.dtype)
+    return measure(lambda: alloc.render(out, wave), block, gen.fs)
+
+
+def bench_unison(gen, unison, block, wave, voices=16, channels=2):
+    """Rendu multicanal : toutes les copies de toutes les voix en une opération, mixées par un produit matriciel avec les gains"""
+    alloc = VoiceAllocator(gen.make_bank(max_voices=voices, max_frames=block, channels=channels, unison=unison, detune=12.0, spread=0.8),
+                           release=0.05)
+    for i, f in enumerate(voice_freqs(voices)):
+        alloc.note_on(i, f, pan=(i % 5 - 2) / 2)
+    out = np.zeros((block, channels), dtype=alloc.bank.dtype)
+    return measure(lambda: alloc.render(out, wave), block, gen.fs)
+
+
+def bench_output(block, fs, fmt):
+    """Étage de sortie de RenderScheduler (float32, carte son) ou d'un fichier int16 (avec dither)"""
+    mix = np.random.default_rng(0).uniform(-1.2, 1.2, block).astype(np.float32)
+    stage = OutputStage(block, fmt=fmt, dither=fmt == "int16")
+    return measure(lambda: stage.process(mix), block, fs)
+
+
+def bench_effect(name, block, fs):
+    """Un effet de la chaîne, traité en place comme dans RenderScheduler (l'état évolue d'un bloc à l'autre)"""
+    buf = np.random.default_rng(0).uniform(-0.5, 0.5, block).astype(np.float32)
+    fx = EFFECTS[name](fs=fs, max_frames=block)
+    return measure(lambda: fx.process(buf, buf), block, fs)
+
+
+def bench_scope(block, fs, width=800):
+    """Reproduit le chemin de l'oscilloscope : Scope.push (RenderScheduler._render_one) puis Scope.frame (App.end_timer_callback)"""
+    audio_data = np.sin(np.arange(block) * 0.05).astype(np.float32)
+    scope = Scope(fs, window=0.03, width=width)
+    while scope.frame() is None: # Historique rempli avant la mesure
+        scope.push(audio_data)
+
+    def update():
+        scope.push(audio_data)
+        return scope.frame()
+    return measure(update, block, fs)
+
+
+def metadata():
+    """Informations permettant de comparer des résultats entre commits et machines"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": kernels.numba.__version__ if kernels.available() else None,
+        "kernels": kernels.resolve_backend(), # Backend de calcul mesuré (auto)
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor(),
+    }
+
+
+def run(voices_list, blocks, rates, waves, log=print):
+    """Exécute toute la grille et retourne la liste des résultats"""
+    results = []
+
+    def record(name, params, stats):
+        results.append({"bench": name, **params, **stats})
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        log(f"{name:<22}{label:<55}{stats['median_us']:>12.1f} µs  rtf={stats['rtf']:.4f}")
+
+    for fs in rates:
+        gen = SignalGenerator(fs)
+        for wave in waves:
+            for voices in voices_list:
+                for block in blocks:
+                    params = {"fs": fs, "wave": wave, "voices": voices, "block": block}
+                    record("generator.get_block", params, bench_get_block(gen, voices, block, wave))
+                    record("voices.render", params, bench_voices(gen, voices, block, wave))
+            for unison in UNISON:
+                for block in blocks:
+                    params = {"fs": fs, "wave": wave, "voices": 16, "block": block, "channels": 2, "unison": unison}
+                    record("voices.unison", params, bench_unison(gen, unison, block, wave))
+        for block in blocks:
+            for fmt in ("float32", "int16"):
+                record(f"output.{fmt}", {"fs": fs, "block": block}, bench_output(block, fs, fmt))
+            for name in EFFECTS:
+                record(f"effects.{name}", {"fs": fs, "block": block}, bench_effect(name, block, fs))
+            record("display.scope", {"fs": fs, "block": block}, bench_scope(block, fs))
+    return results
+
+
+def _key(result):
+    """Paramètres identifiant une mesure (indépendamment de ses résultats)"""
+    return tuple((k, result[k]) for k in ("bench", "fs", "wave", "voices", "block", "channels", "unison") if k in result)
+
+
+def compare(results, reference_path, log=print):
+    """Affiche le rapport de facteur temps réel entre les résultats courants et un fichier de référence"""
+    with open(reference_path) as f:
+        reference = json.load(f)
+    ref = {_key(r): r for r in reference["results"]}
+    log(f"\nComparaison avec {reference_path} (commit {reference['meta'].get('commit', '?')}) : ratio rtf nouveau / ancien")
+    for r in results:
+        old = ref.get(_key(r))
+        if old and old["rtf"] > 0:
+            ratio = r["rtf"] / old["rtf"]
+            flag = "  <-- régression" if ratio > 1.2 else ""
+            label = " ".join(f"{k}={v}" for k, v in _key(r)[1:])
+            log(f"{r['bench']:<22}{label:<55}{ratio:>7.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bancs d'essai des chemins critiques du synthétiseur")
+    parser.add_argument("-o", "--output", help="Fichier JSON de résultats")
+    parser.add_argument("--quick", action="store_true", help="Grille réduite (quelques secondes)")
+    parser.add_argument("--voices", type=int, nargs="+", help=f"Nombres de voix (défaut {VOICES})")
+    parser.add_argument("--blocks", type=int, nargs="+", help=f"Tailles de bloc en trames (défaut {BLOCKS})")
+    parser.add_argument("--rates", type=int, nargs="+", help=f"Fréquences d'échantillonnage (défaut {RATES})")
+    parser.add_argument("--waves", nargs="+", help="Formes d'onde (défaut : toutes)")
+    parser.add_argument("--compare", help="Fichier JSON de référence (ex: résultats d'un commit précédent)")
+    args = parser.parse_args()
+
+    grid = QUICK if args.quick else {"voices": VOICES, "blocks": BLOCKS, "rates": RATES, "waves": WAVE_TYPES}
+    results = run(args.voices or grid["voices"], args.blocks or grid["blocks"], args.rates or grid["rates"], args.waves or grid["waves"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=1, ensure_ascii=False)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
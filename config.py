@@ -0,0 +1,267 @@
+"""Configuration du synthétiseur : fichier JSON, options de ligne de commande, sondage du périphérique et calibration
+
+Priorité : valeurs par défaut < fichier de configuration < options de la ligne de commande.
+
+Utilisation en ligne de commande :
+    python config.py                                   (affiche le périphérique de sortie : fréquences acceptées, latences annoncées)
+    python config.py --calibrate -o synth.json         (choisit la plus petite taille de bloc sans décrochage et l'enregistre)
+    python main.py --config synth.json --device 3 --latency low
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Valeurs par défaut (et liste des clés acceptées dans un fichier de configuration)
+DEFAULTS = {
+    "fs": 44100, # Fréquence d'échantillonnage (Hz)
+    "block_size": 256, # Trames par bloc rendu
+    "buffer": 0.1, # Profondeur du buffer circulaire (s) : latence ajoutée par le synthé, marge contre les décrochages
+    "device": None, # Périphérique de sortie (index ou nom), None : périphérique par défaut
+    "channels": 1, # Canaux de sortie (rendu natif sur tous les canaux, voir OscillatorBank)
+    "latency": None, # Latence demandée au pilote : "low", "high" ou en secondes (None : défaut de sounddevice)
+    "fps": 30, # Images par seconde de l'oscilloscope
+    "workers": 0, # Processus de rendu des voix
+    "kernels": "auto", # Backend de calcul : "auto" (numba si installé), "numpy" ou "numba" (voir kernels.py)
+    "period_cache": 32.0, # Mémoire du cache de périodes des notes tenues (Mo, 0 : pas de cache, voir period_cache.py)
+    "effects": [], # Chaîne d'effets (noms, voir effects.EFFECTS)
+    "unison": 1, # Copies désaccordées de chaque voix
+    "detune": 12.0, # Écart (cents) entre la copie la plus grave et la plus aiguë de l'unisson
+    "spread": 0.8, # Largeur stéréo de l'unisson (0 à 1)
+    "samples": None, # Bibliothèque d'échantillons (dossier de WAV ou fichier JSON, voir sampler.SampleLibrary.load)
+    "midi": None, # Port d'entrée MIDI ("virtual", début de nom), None : pas d'entrée MIDI
+    "a4": 440.0, # Fréquence du La4 (Hz)
+    "scl": None, # Échelle Scala (.scl)
+    "metrics": None, # Fichier d'export de l'instrumentation (.json ou .csv)
+    "record_dir": ".", # Dossier des enregistrements (bouton « Enregistrer »)
+    "record_format": "wav", # Format des enregistrements : "wav", "flac" ou "raw"
+}
+
+DEFAULT_PATH = "synth.json" # Fichier lu s'il existe dans le répertoire courant et qu'aucun --config n'est donné
+COMMON_RATES = (22050, 32000, 44100, 48000, 88200, 96000, 192000)
+BLOCK_SIZES = (32, 64, 128, 256, 512, 1024)
+RECORD_FORMATS = ("wav", "flac", "raw") # Clés de synth.recorder.RECORD_FORMATS (non importé ici : l'enregistreur n'est chargé que s'il sert)
+
+
+def parse_latency(value):
+    """Latence du pilote : "low", "high" ou un nombre de secondes"""
+    if value is None or value in ("low", "high"):
+        return value
+    return float(value)
+
+
+def parse_device(value):
+    """Périphérique : index entier ou nom (ou début de nom)"""
+    if value is None or isinstance(value, int):
+        return value
+    return int(value) if str(value).isdigit() else value
+
+
+def validate(config):
+    """Vérifie et normalise une configuration complète (ValueError si une valeur est invalide)"""
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Clé(s) de configuration inconnue(s) : {', '.join(sorted(unknown))}")
+    config["fs"] = int(config["fs"])
+    config["block_size"] = int(config["block_size"])
+    config["channels"] = int(config["channels"])
+    config["unison"] = int(config["unison"])
+    config["fps"] = int(config["fps"])
+    config["workers"] = int(config["workers"])
+    config["detune"] = float(config["detune"])
+    config["spread"] = float(config["spread"])
+    config["buffer"] = float(config["buffer"])
+    config["period_cache"] = float(config["period_cache"])
+    config["device"] = parse_device(config["device"])
+    config["latency"] = parse_latency(config["latency"])
+    if config["fs"] <= 0 or config["block_size"] <= 0 or config["channels"] <= 0 or config["unison"] <= 0:
+        raise ValueError("fs, block_size, channels et unison doivent être strictement positifs")
+    if config["fps"] <= 0:
+        raise ValueError("fps doit être strictement positif (images par seconde de l'oscilloscope)")
+    if config["workers"] < 0:
+        raise ValueError("workers doit être positif ou nul (0 : rendu dans le thread de rendu)")
+    if config["record_format"] not in RECORD_FORMATS:
+        raise ValueError(f"Format d'enregistrement inconnu : {config['record_format']!r} (attendu : {', '.join(RECORD_FORMATS)})")
+    if config["kernels"] not in ("auto", "numpy", "numba"):
+        raise ValueError(f"Backend de calcul inconnu : {config['kernels']!r} (attendu : auto, numpy, numba)")
+    if config["period_cache"] < 0:
+        raise ValueError("period_cache doit être positif ou nul (0 : pas de cache)")
+    if config["block_size"] > config["buffer"] * config["fs"]:
+        raise ValueError(f"Le buffer ({config['buffer']} s) doit contenir au moins un bloc de {config['block_size']} trames")
+    return config
+
+
+def load_config(path):
+    """Lit un fichier de configuration JSON (objet dont les clés sont celles de DEFAULTS, toutes optionnelles)"""
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} doit contenir un objet JSON")
+    return data
+
+
+def save_config(config, path):
+    """Enregistre la configuration (seules les valeurs différentes des valeurs par défaut)"""
+    data = {k: v for k, v in config.items() if v != DEFAULTS[k]}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def build_parser(description="Synthétiseur temps réel"):
+    """Options de ligne de commande. Leur valeur par défaut est None : seules les options données remplacent le fichier"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--config", default=None, help=f"Fichier de configuration JSON (par défaut {DEFAULT_PATH} s'il existe)")
+    parser.add_argument("--fs", type=int, help="Fréquence d'échantillonnage (Hz)")
+    parser.add_argument("--block-size", dest="block_size", type=int, help="Trames par bloc rendu")
+    parser.add_argument("--buffer", type=float, help="Profondeur du buffer circulaire (s)")
+    parser.add_argument("--device", help="Périphérique de sortie (index ou nom)")
+    parser.add_argument("--channels", type=int, help="Nombre de canaux de sortie")
+    parser.add_argument("--latency", help="Latence du pilote : low, high ou en secondes")
+    parser.add_argument("--fps", type=int, help="Images par seconde de l'oscilloscope")
+    parser.add_argument("--workers", type=int, help="Processus de rendu des voix")
+    parser.add_argument("--kernels", choices=("auto", "numpy", "numba"), help="Backend de calcul (auto : numba si installé)")
+    parser.add_argument("--period-cache", dest="period_cache", type=float, help="Mémoire du cache de périodes des notes tenues (Mo, 0 : pas de cache)")
+    parser.add_argument("--effects", type=lambda s: [name for name in s.split(",") if name], help="Chaîne d'effets (ex: filter,delay,reverb)")
+    parser.add_argument("--unison", type=int, help="Copies désaccordées de chaque voix")
+    parser.add_argument("--detune", type=float, help="Désaccord de l'unisson (cents entre les copies extrêmes)")
+    parser.add_argument("--spread", type=float, help="Largeur stéréo de l'unisson (0 à 1)")
+    parser.add_argument("--samples", help="Bibliothèque d'échantillons : dossier de fichiers WAV ou fichier JSON")
+    parser.add_argument("--midi", nargs="?", const="virtual", help="Entrée MIDI : sans valeur, port virtuel; sinon début du nom du port")
+    parser.add_argument("--a4", type=float, help="Fréquence du La4 (Hz)")
+    parser.add_argument("--scl", help="Échelle Scala (.scl)")
+    parser.add_argument("--metrics", help="Fichier d'export de l'instrumentation (.json ou .csv)")
+    parser.add_argument("--record-dir", dest="record_dir", help="Dossier des enregistrements")
+    parser.add_argument("--record-format", dest="record_format", choices=RECORD_FORMATS, help="Format des enregistrements")
+    parser.add_argument("--calibrate", action="store_true", help="Choisit la taille de bloc par une calibration au démarrage")
+    parser.add_argument("--save-config", dest="save_config", default=None, help="Enregistre la configuration obtenue dans ce fichier")
+    return parser
+
+
+def resolve(args):
+    """Configuration complète à partir des options analysées : valeurs par défaut, puis fichier, puis options données"""
+    config = dict(DEFAULTS)
+    path = args.config if args.config is not None else (DEFAULT_PATH if os.path.exists(DEFAULT_PATH) else None)
+    if path is not None:
+        config.update(load_config(path))
+    for key in DEFAULTS:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return validate(config)
+
+
+def parse_args(argv=None, description="Synthétiseur temps réel"):
+    """Analyse la ligne de commande
+    output: (config, args) : configuration complète et options brutes (pour --calibrate et --save-config)
+    """
+    args = build_parser(description).parse_args(argv)
+    return resolve(args), args
+
+
+def probe_device(device=None, channels=1, rates=COMMON_RATES):
+    """Interroge le périphérique de sortie
+    output: Dictionnaire : nom, nombre maximal de canaux, fréquence par défaut, fréquences acceptées (parmi rates)
+            et latences annoncées par le pilote (en secondes) pour les modes "low" et "high"
+    """
+    import sounddevice as sd # Import local : la lecture de la configuration n'a pas besoin de sounddevice
+
+    info = sd.query_devices(device, "output")
+    supported = []
+    for rate in rates:
+        try:
+            sd.check_output_settings(device=device, samplerate=rate, channels=channels)
+            supported.append(rate)
+        except Exception:
+            pass
+    return {
+        "name": info["name"],
+        "max_channels": info["max_output_channels"],
+        "default_rate": info["default_samplerate"],
+        "rates": supported,
+        "latency_low": info["default_low_output_latency"],
+        "latency_high": info["default_high_output_latency"],
+    }
+
+
+def calibrate(config, sizes=BLOCK_SIZES, duration=1.0, voices=16, wave="Dents de scie (polyBLEP)", log=print):
+    """Choisit la plus petite taille de bloc rendue sans décrochage sur ce poste
+    input:  - config: Configuration (fréquence, périphérique, canaux, latence, effets, unisson, workers)
+            - sizes: Tailles de bloc essayées, par ordre croissant
+            - duration: Durée de chaque essai (en secondes)
+            - voices: Nombre de notes tenues pendant l'essai (accord dense)
+            - wave: Forme d'onde de l'essai (polyBLEP : la plus coûteuse)
+    output: Taille de bloc retenue (la plus grande essayée si aucune ne passe)
+
+    Pour chaque taille, ouvre le flux avec un buffer circulaire de deux blocs seulement (le rendu de chaque bloc doit tenir
+    dans la durée d'un bloc), joue l'accord pendant duration secondes et compte les décrochages : buffer vide,
+    drapeaux "output_underflow" du pilote et blocs rendus en retard. La première taille sans décrochage est retenue.
+    Le générateur est créé sans cache de périodes (même si config["period_cache"] est activé) : l'accord tenu de l'essai serait
+    lu dans des boucles précalculées après quelques blocs, et le coût mesuré ne serait pas celui de notes qui changent (attaques,
+    pitch bend, réaccord), que la taille de bloc retenue doit tenir.
+    """
+    from audio_engine import AudioEngine
+    from metrics import Metrics
+    from scheduler import RenderScheduler
+    from synth.effects import EffectsChain
+    from synth.generator import SignalGenerator
+
+    fs = config["fs"]
+    gen = SignalGenerator(fs, backend=config["kernels"]) # Pas de cache de périodes : pire cas, chaque bloc calculé
+    for size in sizes:
+        metrics = Metrics(fs)
+        audio = AudioEngine(fs, latency=2 * size / fs, metrics=metrics, device=config["device"], channels=config["channels"],
+                            device_latency=config["latency"])
+        if audio.stream is None:
+            audio.terminate() # Arrête les nouvelles tentatives d'ouverture du thread de surveillance
+            raise RuntimeError("le flux audio n'a pas pu être ouvert")
+        effects = EffectsChain.from_names(config["effects"], fs=fs, max_frames=size, channels=config["channels"]) if config["effects"] else None
+        renderer = RenderScheduler(gen, audio, block_size=size, wave_type=wave, max_voices=voices, workers=config["workers"], effects=effects,
+                                   unison=config["unison"], detune=config["detune"], spread=config["spread"])
+        try:
+            renderer.start()
+            for i in range(voices):
+                renderer.note_on(48 + (i * 7) % 36, 0.5)
+            time.sleep(duration)
+        finally:
+            renderer.stop()
+            audio.terminate()
+        xruns = audio.underruns + metrics.status_counts["output_underflow"]
+        stats = renderer.stats()
+        log(f"bloc {size:>5} trames ({size / fs * 1000:6.2f} ms) : {xruns} décrochage(s), {stats['late_blocks']} bloc(s) en retard, "
+            f"rendu moyen {stats['mean_ms']:.3f} ms")
+        if xruns == 0 and stats["late_blocks"] == 0:
+            return size
+    return sizes[-1]
+
+
+def main(argv=None):
+    """Sondage du périphérique et calibration en ligne de commande"""
+    parser = build_parser("Sondage du périphérique de sortie et calibration de la taille de bloc")
+    parser.add_argument("-o", "--output", default=None, help="Fichier où enregistrer la configuration (avec la taille de bloc calibrée)")
+    args = parser.parse_args(argv)
+    config = resolve(args)
+    try:
+        probe = probe_device(config["device"], config["channels"])
+    except Exception as e:
+        print(f"Erreur lors de l'interrogation du périphérique : {e}")
+        return 1
+    print(f"Périphérique : {probe['name']} ({probe['max_channels']} canaux max)")
+    print(f"Fréquences acceptées : {', '.join(str(r) for r in probe['rates']) or 'aucune'} (par défaut {probe['default_rate']:.0f} Hz)")
+    print(f"Latence annoncée : {probe['latency_low'] * 1000:.1f} ms (low), {probe['latency_high'] * 1000:.1f} ms (high)")
+    if probe["rates"] and config["fs"] not in probe["rates"]:
+        print(f"Attention : {config['fs']} Hz n'est pas accepté par ce périphérique")
+    if args.calibrate:
+        config["block_size"] = calibrate(config)
+        config["buffer"] = max(config["buffer"], 2 * config["block_size"] / config["fs"])
+        print(f"Taille de bloc retenue : {config['block_size']} trames")
+    output = args.output or args.save_config
+    if output:
+        save_config(config, output)
+        print(f"Configuration enregistrée dans {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
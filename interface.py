@@ -1,17 +1,19 @@
 from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QComboBox, QPushButton
 from PyQt5.QtCore import Qt, pyqtSignal
 import pyqtgraph as pg
+from synth.generator import WAVE_TYPES
 
 class SynthInterface(QMainWindow):
     """Interface graphique du synthétiseur
     - Affiche un oscilloscope temps réel du signal généré
     - Affiche un clavier visuel qui s'illumine quand on appuie sur les touches
-    - Permet de choisir la forme d'onde (sinus, carré, dents de scie)
+    - Permet de choisir la forme d'onde (sinus, carré, dents de scie, et carré / dents de scie anti-repliement par table d'onde ou polyBLEP)
     
     Initialisation de pyqtSignal pour les événements de touche et de fermeture de la fenêtre
     """
     key_pressed = pyqtSignal(int)
     key_released = pyqtSignal(int)
+    record_toggled = pyqtSignal(bool)
     close_signal = pyqtSignal()
 
     def __init__(self):
@@ -31,6 +33,9 @@ class SynthInterface(QMainWindow):
         - self.white_keys : Liste des touches blanches du clavier
         - self.black_keys : Liste des touches noires du clavier
         - self.keyboard : Référence à self pour l'accès simple aux méthodes de mise à jour du clavier
+        - self.metrics_panel : QLabel du panneau de statistiques temps réel (masqué par défaut)
+        - self.record_button : Bouton (à bascule) de démarrage et d'arrêt de l'enregistrement, émet record_toggled
+        - self.record_status : QLabel de l'état de l'enregistrement (durée, blocs perdus)
 
         """
         # 1)
@@ -49,6 +54,9 @@ class SynthInterface(QMainWindow):
         self.oscilloscope = None        # Widget graphique pour l'affichage du signal (oscilloscope)
         self.oscilloscope_screen = None # Plot pyqtgraph pour dessiner le signal
         self.signal = None              # Courbe du signal
+        self.metrics_panel = None       # Panneau de statistiques temps réel
+        self.record_button = None       # Bouton d'enregistrement
+        self.record_status = None       # État de l'enregistrement
         # Clavier MIDI
         self.white_keys = ["Q", "Z", "S", "E", "D", "F", "T", "G", "Y", "H", "U", "J", "K", "O", "L", "P"]
         self.black_keys = ["Z", "E", "T", "Y", "U", "O", "P"]
@@ -60,10 +68,11 @@ class SynthInterface(QMainWindow):
         """Initialise les éléments de l'interface utilisateur
         1. Crée un widget central et le définit comme widget principal de la fenêtre
         2. Crée un agencement vertical pour organiser les éléments
-        3. Crée des boutons pour choisir la forme d'onde et les ajoute à l'agencement
+        3. Crée des boutons pour choisir la forme d'onde et les ajoute à l'agencement, avec le bouton d'enregistrement
         4. Crée un widget graphique pour l'affichage du signal (oscilloscope) et l'ajoute à l'agencement
         5. Crée un signal jaune pour l'affichage du signal dans l'oscilloscopes sur l'oscilloscope_screen
         6. Crée un widget clavier pour afficher les touches actives et l'ajoute à l'agencement
+        7. Crée le panneau de statistiques temps réel (masqué tant que l'instrumentation n'est pas activée)
         """
         # 1) Widget central
         central_widget = QWidget()
@@ -74,10 +83,21 @@ class SynthInterface(QMainWindow):
 
         # 3) Choix de la forme d'onde
         self.mode_selection = QComboBox() # Création d'un menu déroulant pour choisir la forme d'onde
-        self.mode_selection.addItems(["Sinus", "Carré", "Dents de scie"]) # Ajout des options de forme d'onde
+        self.mode_selection.addItems(WAVE_TYPES) # Ajout des options de forme d'onde ("(table)" : tables d'onde à bande limitée, "(polyBLEP)" : correction des discontinuités, sans repliement)
         self.mode_selection.setFocusPolicy(Qt.NoFocus) # Pour que le clavier puisse être utilisé pour jouer du piano sans que le menu prenne le focus
         main_layout.addWidget(QLabel("Forme d'onde :")) # Ajout d'un label pour indiquer la fonction du menu déroulant
         main_layout.addWidget(self.mode_selection) # Ajout du menu déroulant à l'agencement principal
+        # Enregistrement : bouton à bascule et état (durée enregistrée, blocs perdus), mis à jour par le main
+        record_layout = QHBoxLayout()
+        self.record_button = QPushButton("● Enregistrer") # Enregistre la sortie jouée dans un fichier (voir recorder.py)
+        self.record_button.setCheckable(True)
+        self.record_button.setFocusPolicy(Qt.NoFocus) # Le clavier reste au piano
+        self.record_button.toggled.connect(self.record_toggled.emit) # Relaie l'état du bouton (True : démarrer, False : arrêter)
+        self.record_status = QLabel()
+        self.record_status.setStyleSheet("font-family: monospace;")
+        record_layout.addWidget(self.record_button)
+        record_layout.addWidget(self.record_status, 1)
+        main_layout.addLayout(record_layout)
 
         # 4) Oscilloscope
         self.oscilloscope = pg.GraphicsLayoutWidget() # Widget pour contenir l'affichage de l'oscilloscope
@@ -89,7 +109,7 @@ class SynthInterface(QMainWindow):
         self.signal = self.oscilloscope_screen.plot(pen='y') # Créer une courbe jaune pour l'affichage du signal dans l'oscilloscope_screen
         # On fixe l'échelle verticale pour éviter que ça déborde de trop
         # Amplitude originale * facteur d'échelle pour avoir de l'espace autour du signal
-        amplitude = 32767  # Amplitude max pour un signal int16
+        amplitude = 1.0  # Pleine échelle du signal float32
         scale_factor = 1.2  # 20% d'espace supplémentaire
         self.oscilloscope_screen.setYRange(-amplitude * scale_factor, amplitude * scale_factor) # Fixer les limites de l'amplitude du signal dans l'affichage de l'oscilloscope
 
@@ -117,6 +137,25 @@ class SynthInterface(QMainWindow):
         
         main_layout.addLayout(keys_layout) # On ajoute l'agencement des touches à l'agencement principal
 
+        # 7) Panneau de statistiques
+        self.metrics_panel = QLabel() # Texte multi-lignes mis à jour par le main
+        self.metrics_panel.setStyleSheet("font-family: monospace; font-size: 11px;")
+        self.metrics_panel.setVisible(False)
+        main_layout.addWidget(self.metrics_panel)
+
+    def show_metrics(self, visible):
+        """Affiche ou masque le panneau de statistiques temps réel"""
+        self.metrics_panel.setVisible(visible)
+
+    def set_metrics_text(self, text):
+        """Met à jour le texte du panneau de statistiques"""
+        self.metrics_panel.setText(text)
+
+    def set_record_status(self, text, recording=True):
+        """Met à jour l'état de l'enregistrement (texte, et bouton rouge pendant l'enregistrement)"""
+        self.record_status.setText(text)
+        self.record_button.setStyleSheet("background-color: red; color: white; font-weight: bold;" if recording else "")
+
     def get_wave_type(self):
         """Méthode pour que le 'Main' puisse savoir quelle onde est choisie"""
         return self.mode_selection.currentText()
@@ -174,9 +213,14 @@ class SynthInterface(QMainWindow):
             self.update_visual_key(event.key(), False)  # 2) L'argument pressed=False pour indiquer que la touche est relâchée
             self.key_released.emit(event.key()) # 3
 
+    def scope_width(self):
+        """Largeur de l'écran de l'oscilloscope en pixels (nombre de colonnes min/max à calculer)"""
+        return int(self.oscilloscope_screen.vb.width()) or self.oscilloscope.width()
+
     def update_display(self, t, data):
         """
         1. Met à jour la courbe affichée avec les données temporelles t et les valeurs data en appelant self.signal.setData(t, data)
+           (data : minimum et maximum de chaque colonne de pixels, voir scope.py)
         """
         self.signal.setData(t, data) # 1)
 
@@ -0,0 +1,204 @@
+import bisect
+import csv
+import json
+import time
+
+
+class Histogram:
+    """Histogramme à nombre de cases fixe, sans allocation à l'ajout d'une valeur
+
+    Les bornes sont calculées une seule fois; add() ne fait qu'une recherche dichotomique et quelques opérations sur des entiers.
+    La première et la dernière case reçoivent les valeurs hors bornes.
+    """
+
+    def __init__(self, name, edges, unit=""):
+        """
+        input:  - name: Nom de la grandeur mesurée
+                - edges: Bornes croissantes des cases (len(edges) + 1 cases, dont deux cases hors bornes)
+                - unit: Unité des valeurs (pour l'export)
+        """
+        self.name = name
+        self.unit = unit
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.reset()
+
+    @classmethod
+    def linear(cls, name, low, high, bins, unit=""):
+        """Histogramme à cases de même largeur entre low et high"""
+        step = (high - low) / bins
+        return cls(name, [low + i * step for i in range(bins + 1)], unit)
+
+    @classmethod
+    def log(cls, name, low, high, bins, unit=""):
+        """Histogramme à cases de largeur logarithmique entre low et high (low > 0)"""
+        ratio = (high / low) ** (1 / bins)
+        return cls(name, [low * ratio ** i for i in range(bins + 1)], unit)
+
+    def reset(self):
+        """Remet l'histogramme à zéro"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.n = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.last = 0.0
+
+    def add(self, value):
+        """Ajoute une valeur"""
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        self.n += 1
+        self.total += value
+        self.last = value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def percentile(self, p):
+        """Percentile approché (borne haute de la case qui contient le p-ième pourcentage des valeurs)"""
+        if not self.n:
+            return 0.0
+        target = p / 100 * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.edges[min(i, len(self.edges) - 1)]
+        return self.max
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "unit": self.unit,
+            "n": self.n,
+            "mean": self.mean(),
+            "min": self.min if self.n else 0.0,
+            "max": self.max if self.n else 0.0,
+            "p99": self.percentile(99),
+            "edges": self.edges,
+            "counts": list(self.counts),
+        }
+
+
+class Metrics:
+    """Instrumentation temps réel du moteur audio et du thread de rendu
+
+    - render_ms : durée de rendu de chaque bloc
+    - load : durée de rendu / durée audio du bloc (au-delà de 1, le bloc est en retard)
+    - jitter_ms : écart entre l'intervalle mesuré entre deux callbacks audio et l'intervalle attendu (trames / fs)
+    - fill : taux de remplissage du buffer circulaire à chaque bloc rendu
+    - voices : nombre de voix actives à chaque bloc rendu
+    - compteurs des drapeaux d'état transmis par PortAudio au callback (output_underflow, output_overflow, priming_output)
+
+    Quand l'instrumentation est désactivée, le moteur et le thread de rendu ont metrics = None et ne font qu'un test d'attribut.
+    """
+
+    STATUS_FLAGS = ("output_underflow", "output_overflow", "priming_output")
+
+    def __init__(self, fs=44100, max_voices=64):
+        self.fs = fs
+        self.histograms = {
+            "render_ms": Histogram.log("render_ms", 0.01, 100.0, 40, "ms"),
+            "load": Histogram.linear("load", 0.0, 2.0, 40),
+            "jitter_ms": Histogram.linear("jitter_ms", -20.0, 20.0, 40, "ms"),
+            "fill": Histogram.linear("fill", 0.0, 1.0, 20),
+            "voices": Histogram.linear("voices", 0, max_voices, min(max_voices, 64)),
+        }
+        self.status_counts = dict.fromkeys(self.STATUS_FLAGS, 0)
+        self.callbacks = 0
+        self._last_callback = None
+        self.started = time.time()
+
+    def record_callback(self, frames, status):
+        """Appelé par le callback audio : jitter de l'horloge de la carte son et drapeaux d'état"""
+        now = time.perf_counter()
+        self.callbacks += 1
+        if self._last_callback is not None:
+            self.histograms["jitter_ms"].add((now - self._last_callback - frames / self.fs) * 1000)
+        self._last_callback = now
+        if status:
+            for flag in self.STATUS_FLAGS:
+                if getattr(status, flag, False):
+                    self.status_counts[flag] += 1
+
+    def record_block(self, elapsed, block_duration, voices, fill):
+        """Appelé par le thread de rendu après chaque bloc"""
+        h = self.histograms
+        h["render_ms"].add(elapsed * 1000)
+        h["load"].add(elapsed / block_duration)
+        h["voices"].add(voices)
+        h["fill"].add(fill)
+
+    def reset(self):
+        for hist in self.histograms.values():
+            hist.reset()
+        self.status_counts = dict.fromkeys(self.STATUS_FLAGS, 0)
+        self.callbacks = 0
+        self._last_callback = None
+
+    def snapshot(self, engine=None):
+        """Résumé courant (pour l'affichage) : dernière valeur, moyenne et maximum de chaque grandeur et compteurs"""
+        snap = {name: {"last": h.last, "mean": h.mean(), "max": h.max if h.n else 0.0} for name, h in self.histograms.items()}
+        snap["status"] = dict(self.status_counts)
+        snap["callbacks"] = self.callbacks
+        if engine is not None:
+            snap["ring_underruns"] = engine.underruns
+            snap["ring_underrun_frames"] = engine.underrun_frames
+            snap["stream"] = engine.stream_stats()
+        return snap
+
+    def hud_text(self, engine=None):
+        """Texte court pour le panneau de statistiques de l'interface"""
+        s = self.snapshot(engine)
+        lines = [
+            f"rendu : {s['render_ms']['last']:.2f} ms (moy. {s['render_ms']['mean']:.2f}, max {s['render_ms']['max']:.2f})",
+            f"charge : {s['load']['last'] * 100:.0f} % (max {s['load']['max'] * 100:.0f} %)",
+            f"jitter callback : max {s['jitter_ms']['max']:.2f} ms",
+            f"buffer : {s['fill']['last'] * 100:.0f} %   voix : {s['voices']['last']:.0f}",
+            f"underflows : {s['status']['output_underflow']}   overflows : {s['status']['output_overflow']}",
+        ]
+        if engine is not None:
+            lines.append(f"buffer vide : {s['ring_underruns']} fois ({s['ring_underrun_frames']} trames)")
+            st = s["stream"]
+            if st["faults"]:
+                lines.append(f"flux rouvert : {st['reopens']}/{st['faults']} fois (max {st['reopen_ms_max']:.0f} ms, {st['dropped_frames']} trames perdues)")
+        return "\n".join(lines)
+
+    def to_json(self, path, engine=None):
+        """Exporte les histogrammes complets et les compteurs en JSON"""
+        data = {
+            "started": self.started,
+            "duration_s": time.time() - self.started,
+            "fs": self.fs,
+            "callbacks": self.callbacks,
+            "status": dict(self.status_counts),
+            "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+        if engine is not None:
+            data["ring_underruns"] = engine.underruns
+            data["ring_underrun_frames"] = engine.underrun_frames
+            data["stream"] = engine.stream_stats()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    def to_csv(self, path):
+        """Exporte les histogrammes en CSV (une ligne par case : grandeur, borne basse, borne haute, effectif)"""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["metric", "low", "high", "count"])
+            for name, h in self.histograms.items():
+                bounds = [float("-inf")] + h.edges + [float("inf")]
+                for i, count in enumerate(h.counts):
+                    writer.writerow([name, bounds[i], bounds[i + 1], count])
+
+    def export(self, path, engine=None):
+        """Exporte en CSV si path se termine par .csv, sinon en JSON"""
+        if path.lower().endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path, engine)
@@ -0,0 +1,100 @@
+import time
+
+try:
+    import mido # Dépendance optionnelle (avec le backend python-rtmidi) : pip install mido python-rtmidi
+except ImportError:
+    mido = None
+
+
+class MidiInput:
+    """Entrée MIDI horodatée : transmet les notes reçues sur un port au thread de rendu
+
+    Les messages sont reçus sur le thread du backend MIDI (rtmidi), qui appelle _on_message dès leur arrivée :
+    chaque événement est horodaté à ce moment (time.perf_counter) puis déposé dans la file du RenderScheduler, qui le joue
+    à l'échantillon près, avec une latence constante (voir RenderScheduler.event_delay). Aucun calcul audio n'est fait ici.
+
+    Les notes sont identifiées par leur numéro et leur canal : deux canaux peuvent jouer la même note indépendamment.
+    Le panoramique (CC 10) est propre à chaque canal.
+    """
+
+    VIRTUAL_NAME = "SynthM2"
+
+    def __init__(self, renderer, port="", channels=None):
+        """
+        input:  - renderer: RenderScheduler (ou tout objet ayant note_on, note_off, pitch_bend, set_pan et all_notes_off)
+                - port: Nom du port d'entrée ("" : premier port disponible, "virtual" : port virtuel auquel un séquenceur
+                  ou un script peut se connecter, sous le nom VIRTUAL_NAME; un début de nom suffit)
+                - channels: Canaux acceptés (0 à 15), None : tous
+
+        1) Vérifie que mido est installé et choisit le port
+        2) Ouvre le port en mode callback : les messages sont traités dès leur réception, sans thread de scrutation
+        """
+        # 1)
+        if mido is None:
+            raise RuntimeError("l'entrée MIDI nécessite mido et python-rtmidi (pip install mido python-rtmidi)")
+        self.renderer = renderer
+        self.channels = None if channels is None else frozenset(channels)
+        self.received = 0 # Messages de notes reçus
+        # 2)
+        if port == "virtual":
+            self.port = mido.open_input(self.VIRTUAL_NAME, virtual=True, callback=self._on_message)
+        else:
+            self.port = mido.open_input(self._find_port(port), callback=self._on_message)
+        self.name = self.port.name
+
+    @staticmethod
+    def list_ports():
+        """Noms des ports d'entrée MIDI disponibles (liste vide si mido n'est pas installé)"""
+        return mido.get_input_names() if mido is not None else []
+
+    @classmethod
+    def _find_port(cls, port):
+        """Nom complet du premier port dont le nom commence par port"""
+        names = cls.list_ports()
+        for name in names:
+            if name.startswith(port):
+                return name
+        raise ValueError(f"Port MIDI introuvable : {port!r} (disponibles : {', '.join(names) or 'aucun'})")
+
+    @classmethod
+    def open(cls, renderer, port="", channels=None):
+        """Ouvre l'entrée MIDI, ou retourne None (avec un message) si mido ou le port ne sont pas disponibles :
+        le clavier de l'interface reste utilisable"""
+        try:
+            midi = cls(renderer, port, channels)
+        except Exception as e:
+            print(f"Erreur lors de l'ouverture de l'entrée MIDI : {e}")
+            return None
+        print(f"Entrée MIDI : {midi.name}")
+        return midi
+
+    def _on_message(self, msg):
+        """Callback du backend MIDI
+        1) Horodate le message dès sa réception
+        2) Transmet les appuis et relâchements de notes (un note_on de vélocité nulle est un relâchement), le pitch bend
+           (mido le donne entre -8192 et 8191), le panoramique (CC 10 : 0 à gauche, 64 au centre, 127 à droite)
+           ainsi que les messages "All Sound Off" (CC 120) et "All Notes Off" (CC 123), qui ne relâchent que les notes de leur canal
+        """
+        # 1)
+        now = time.perf_counter()
+        # 2)
+        channel = getattr(msg, "channel", None)
+        if channel is None or (self.channels is not None and channel not in self.channels):
+            return
+        if msg.type == "note_on" and msg.velocity > 0:
+            self.received += 1
+            self.renderer.note_on(msg.note, msg.velocity / 127, channel, now)
+        elif msg.type in ("note_off", "note_on"):
+            self.received += 1
+            self.renderer.note_off(msg.note, channel, now)
+        elif msg.type == "pitchwheel":
+            self.renderer.pitch_bend(msg.pitch + 8192, channel, now)
+        elif msg.type == "control_change" and msg.control == 10:
+            self.renderer.set_pan(max(msg.value - 64, -63) / 63, channel, now)
+        elif msg.type == "control_change" and msg.control in (120, 123):
+            self.renderer.all_notes_off(channel, now)
+
+    def close(self):
+        """Ferme le port et relâche les notes encore tenues"""
+        self.port.close()
+        self.renderer.all_notes_off()
@@ -0,0 +1,285 @@
+"""Rendu hors ligne (sans carte son ni fenêtre), plus rapide que le temps réel
+
+Utilisation en ligne de commande :
+    python offline.py notes.json -o sortie.wav
+    python offline.py morceau.mid -o sortie.wav --format float32 --wave "Dents de scie (polyBLEP)"
+    python offline.py notes.json -o - | aplay -f S16_LE -r 44100     (échantillons bruts sur la sortie standard)
+    python offline.py notes.json -o sortie.wav --dither               (dither TPDF avant la quantification en int16)
+    python offline.py notes.json -o sortie.wav --effects filter reverb --tail 1.5   (chaîne d'effets, voir effects.py)
+    python offline.py notes.json -o sortie.wav --scl just.scl --a4 432                (échelle Scala, La4 = 432 Hz)
+    python offline.py notes.json -o sortie.wav --channels 2 --unison 7 --detune 20    (stéréo, 7 copies désaccordées par voix)
+    python offline.py notes.json -o sortie.wav --samples piano/                       (échantillonneur, voir sampler.SampleLibrary)
+    python offline.py notes.json -o sortie.wav --kernels numpy                        (backend numpy de référence, voir kernels.py)
+    python offline.py notes.json -o sortie.wav --period-cache 32                      (notes tenues lues dans des boucles, voir period_cache.py)
+
+Format de la liste d'événements (JSON) : une liste d'événements, chacun étant soit un objet
+{"time": 0.5, "type": "on", "note": 60, "velocity": 0.8}, soit une liste [0.5, "on", 60, 0.8].
+"time" est en secondes, "note" est un numéro de note MIDI (69 = La4 = 440 Hz), "type" vaut "on" ou "off".
+"""
+import argparse
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+
+from synth.generator import SignalGenerator
+from synth.output_stage import OutputStage
+from synth.tuning import Tuning
+from synth.voices import VoiceAllocator
+from synth.wav_writer import RawWriter, WavWriter
+
+
+def normalize_events(events):
+    """Convertit une liste d'événements (objets ou listes) en liste triée de tuples (time, is_on, note, velocity)
+    Le type peut être "on" / "off" ou directement un booléen is_on (liste déjà normalisée, ex: sortie de read_midi).
+    """
+    out = []
+    for ev in events:
+        if isinstance(ev, dict):
+            t, kind, note, vel = ev["time"], ev["type"], ev["note"], ev.get("velocity", 1.0)
+        else:
+            t, kind, note = ev[:3]
+            vel = ev[3] if len(ev) > 3 else 1.0
+        if isinstance(kind, bool):
+            kind = "on" if kind else "off"
+        if kind not in ("on", "off"):
+            raise ValueError(f"Type d'événement inconnu : {kind!r} (attendu : 'on' ou 'off')")
+        is_on = kind == "on" and vel > 0 # Un note-on de vélocité nulle est un note-off (convention MIDI)
+        out.append((float(t), is_on, int(note), float(vel)))
+    out.sort(key=lambda ev: (ev[0], ev[1])) # À temps égal, les note-off passent avant les note-on
+    return out
+
+
+def _read_varlen(data, pos):
+    """Lit un entier de longueur variable (format MIDI, 7 bits par octet)"""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_midi(path):
+    """Lit les notes d'un fichier MIDI standard (formats 0 et 1), sans dépendance externe
+    input:  - path: Chemin du fichier .mid
+    output: Liste triée de tuples (time, is_on, note, velocity), time en secondes
+
+    1) Lit l'en-tête (nombre de pistes, résolution en ticks par noire)
+    2) Parcourt chaque piste : notes (tous canaux confondus) et changements de tempo, avec leur position en ticks
+    3) Convertit les ticks en secondes à l'aide de la carte des tempos (500000 µs par noire par défaut)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    # 1)
+    if data[:4] != b"MThd":
+        raise ValueError(f"{path} n'est pas un fichier MIDI standard")
+    header_len, _fmt, n_tracks, division = struct.unpack(">IHHH", data[4:14])
+    if division & 0x8000:
+        raise ValueError("Les fichiers MIDI en temps SMPTE ne sont pas pris en charge")
+    pos = 8 + header_len
+    notes, tempos = [], [(0, 500000)]
+    # 2)
+    for _ in range(n_tracks):
+        chunk, length = struct.unpack(">4sI", data[pos:pos + 8])
+        pos += 8
+        end = pos + length
+        if chunk != b"MTrk":
+            pos = end
+            continue
+        tick, status = 0, 0
+        while pos < end:
+            delta, pos = _read_varlen(data, pos)
+            tick += delta
+            if data[pos] & 0x80: # Sinon : "running status", on garde le statut précédent
+                status = data[pos]
+                pos += 1
+            if status == 0xFF: # Méta-événement
+                meta = data[pos]
+                length, pos = _read_varlen(data, pos + 1)
+                if meta == 0x51: # Changement de tempo (µs par noire)
+                    tempos.append((tick, int.from_bytes(data[pos:pos + 3], "big")))
+                pos += length
+            elif status in (0xF0, 0xF7): # SysEx : ignoré
+                length, pos = _read_varlen(data, pos)
+                pos += length
+            else:
+                kind = status & 0xF0
+                n_data = 1 if kind in (0xC0, 0xD0) else 2
+                if kind in (0x80, 0x90):
+                    note, vel = data[pos], data[pos + 1]
+                    notes.append((tick, kind == 0x90 and vel > 0, note, vel / 127))
+                pos += n_data
+        pos = end
+    # 3)
+    tempos.sort()
+    events = []
+    for tick, is_on, note, vel in notes:
+        seconds, last_tick, tempo = 0.0, 0, 500000
+        for t_tick, t_tempo in tempos:
+            if t_tick > tick:
+                break
+            seconds += (t_tick - last_tick) * tempo / division / 1e6
+            last_tick, tempo = t_tick, t_tempo
+        seconds += (tick - last_tick) * tempo / division / 1e6
+        events.append((seconds, is_on, note, vel))
+    events.sort(key=lambda ev: (ev[0], ev[1]))
+    return events
+
+
+def load_events(path):
+    """Charge une liste d'événements depuis un fichier .json ou .mid/.midi"""
+    if path.lower().endswith((".mid", ".midi")):
+        return read_midi(path)
+    with open(path) as f:
+        return normalize_events(json.load(f))
+
+
+def render_offline(events, writer, fs=44100, block_size=1024, wave_type="Sinus", max_voices=32, release=0.05, tail=None, gen=None,
+                   soft_clip=True, dither=False, workers=0, effects=None, tuning=None, channels=1, unison=1, detune=12.0, spread=0.8,
+                   samples=None):
+    """Rend une liste d'événements de notes aussi vite que le processeur le permet, bloc par bloc, dans writer
+    input:  - events: Liste d'événements (voir normalize_events), ou déjà normalisée
+            - writer: Objet ayant une méthode write(samples) et un attribut fmt (ex: WavWriter, RawWriter), ouvert pour channels canaux
+            - fs: Fréquence d'échantillonnage (en Hz)
+            - block_size: Nombre de trames rendues par bloc
+            - wave_type: Forme d'onde
+            - max_voices: Polyphonie maximale
+            - release: Durée du relâchement des notes (en secondes)
+            - tail: Durée rendue après le dernier événement (par défaut : la durée du relâchement)
+            - gen: SignalGenerator à utiliser (créé si None)
+            - soft_clip, dither: Options de l'étage de sortie (limitation douce, dither TPDF), voir OutputStage
+            - workers: Nombre de processus de rendu des voix (0 ou 1 : rendu dans le processus courant), voir parallel.ParallelVoices
+            - effects: EffectsChain (pour channels canaux) appliquée à chaque bloc avant l'étage de sortie (None : pas d'effets)
+            - tuning: Tuning donnant la fréquence de chaque note (None : tempérament égal, La4 = 440 Hz)
+            - channels: Nombre de canaux rendus
+            - unison, detune, spread: Copies de chaque voix, leur désaccord (en cents) et leur largeur stéréo, voir OscillatorBank
+            - samples: SampleLibrary jouant les notes à la place des oscillateurs (None : oscillateurs; wave_type est alors ignoré)
+    output: Dictionnaire de statistiques (trames, durée audio, temps de calcul, facteur temps réel)
+
+    1) Prépare le générateur, le pool de voix et les buffers d'un bloc (réutilisés d'un bloc à l'autre)
+    2) Pour chaque bloc, applique chaque événement à son échantillon exact en découpant le bloc aux instants des événements
+    3) Applique la chaîne d'effets, convertit le bloc au format de sortie (une seule conversion, dans OutputStage) et l'écrit : seul un bloc est en mémoire à la fois
+    """
+    # 1)
+    events = normalize_events(events)
+    gen = gen if gen is not None else SignalGenerator(fs)
+    freqs = (tuning if tuning is not None else Tuning(fs)).freqs
+    # L'échantillonneur et les workers ne sont importés que s'ils sont utilisés
+    if samples is not None:
+        from synth.sampler import SamplerBank
+        voices = VoiceAllocator(SamplerBank(samples, fs, max_voices=max_voices, max_frames=block_size, channels=channels), release=release)
+    else:
+        from synth.parallel import make_voices
+        voices = make_voices(gen, max_voices=max_voices, max_frames=block_size, workers=workers, channels=channels, unison=unison,
+                             detune=detune, spread=spread, release=release, timeout=5.0) # Hors temps réel : on attend les workers
+    mix = np.zeros((block_size, channels) if channels > 1 else block_size, dtype=voices.dtype)
+    output = OutputStage(block_size, channels=channels, fmt=writer.fmt, soft_clip=soft_clip, dither=dither, backend=gen.backend)
+    tail = release if tail is None else tail
+    end_time = (events[-1][0] if events else 0.0) + tail
+    total = int(round(end_time * fs))
+    frames = [int(round(ev[0] * fs)) for ev in events] # Échantillon de chaque événement
+    split = getattr(voices, "split", None) # Workers : un seul ordre de rendu par bloc, découpé par les workers (voir ParallelVoices.split)
+    start_clock = time.perf_counter()
+    pos, k = 0, 0
+    try:
+        while pos < total:
+            n = min(block_size, total - pos)
+            # 2)
+            start = 0
+            while start < n:
+                if start and split is not None:
+                    split(start)
+                while k < len(events) and frames[k] <= pos + start:
+                    _, is_on, note, vel = events[k]
+                    if is_on:
+                        voices.note_on(note, freqs[note], vel)
+                    else:
+                        voices.note_off(note)
+                    k += 1
+                stop = n if k == len(events) else min(n, frames[k] - pos)
+                if split is None:
+                    voices.render(mix[start:stop], wave_type)
+                start = stop
+            if split is not None:
+                voices.render(mix[:n], wave_type)
+            # 3)
+            if effects is not None:
+                effects.process(mix[:n], mix[:n])
+            writer.write(output.process(mix[:n]))
+            pos += n
+    finally:
+        voices.close() # Arrête les éventuels processus de rendu
+    elapsed = time.perf_counter() - start_clock
+    return {
+        "frames": pos,
+        "audio_seconds": pos / fs,
+        "render_seconds": elapsed,
+        "realtime_factor": elapsed / (pos / fs) if pos else 0.0, # Temps de calcul / durée audio (< 1 : plus rapide que le temps réel)
+    }
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Rendu hors ligne du synthétiseur vers un fichier WAV ou la sortie standard")
+    parser.add_argument("events", help="Liste d'événements (.json) ou fichier MIDI (.mid)")
+    parser.add_argument("-o", "--output", required=True, help="Fichier WAV de sortie, ou '-' pour des échantillons bruts sur la sortie standard")
+    parser.add_argument("--format", choices=("int16", "float32"), default="int16", help="Format des échantillons")
+    parser.add_argument("--fs", type=int, default=44100, help="Fréquence d'échantillonnage (Hz)")
+    parser.add_argument("--block", type=int, default=1024, help="Taille des blocs rendus (trames)")
+    parser.add_argument("--wave", default="Sinus", help="Forme d'onde (ex: 'Carré (polyBLEP)')")
+    parser.add_argument("--voices", type=int, default=32, help="Polyphonie maximale")
+    parser.add_argument("--release", type=float, default=0.05, help="Durée du relâchement (s)")
+    parser.add_argument("--tail", type=float, default=None, help="Durée rendue après le dernier événement (s)")
+    parser.add_argument("--dither", action="store_true", help="Dither TPDF avant la quantification")
+    parser.add_argument("--hard-clip", action="store_true", help="Écrêtage à [-1, 1] au lieu de la limitation douce")
+    parser.add_argument("--workers", type=int, default=0, help="Processus de rendu des voix (0 : rendu dans le processus courant)")
+    parser.add_argument("--a4", type=float, default=440.0, help="Fréquence du La4 (Hz)")
+    parser.add_argument("--scl", default=None, help="Échelle Scala (.scl), degré 0 sur le Do4 (note 60)")
+    parser.add_argument("--effects", nargs="+", default=[], help="Chaîne d'effets, dans l'ordre (paramètres par défaut) : filter, delay, reverb")
+    parser.add_argument("--channels", type=int, default=1, help="Nombre de canaux")
+    parser.add_argument("--unison", type=int, default=1, help="Copies désaccordées de chaque voix")
+    parser.add_argument("--detune", type=float, default=12.0, help="Désaccord de l'unisson (cents entre les copies extrêmes)")
+    parser.add_argument("--spread", type=float, default=0.8, help="Largeur stéréo de l'unisson (0 à 1)")
+    parser.add_argument("--samples", default=None, help="Bibliothèque d'échantillons (dossier de WAV ou fichier JSON) jouée à la place des oscillateurs")
+    parser.add_argument("--kernels", choices=("auto", "numpy", "numba"), default="auto", help="Backend de calcul (auto : numba si installé)")
+    parser.add_argument("--period-cache", type=float, default=0.0,
+                        help="Mémoire du cache de périodes des notes tenues (Mo, 0 : pas de cache, rendu de référence)")
+    args = parser.parse_args(argv)
+
+    events = load_events(args.events)
+    tuning = Tuning.from_scl(args.scl, fs=args.fs, a4=args.a4) if args.scl else Tuning(args.fs, a4=args.a4)
+    effects = samples = cache = None
+    if args.effects:
+        from synth.effects import EffectsChain
+        try:
+            effects = EffectsChain.from_names(args.effects, fs=args.fs, max_frames=args.block, channels=args.channels)
+        except ValueError as e: # Nom d'effet inconnu : message d'argparse, comme un choix invalide
+            parser.error(str(e))
+    if args.samples:
+        from synth.sampler import SampleLibrary
+        samples = SampleLibrary.load(args.samples)
+    if args.period_cache > 0:
+        from synth.period_cache import PeriodCache
+        cache = PeriodCache(args.period_cache * 2**20, max_frames=args.block)
+    if args.output == "-":
+        writer = RawWriter(channels=args.channels, fmt=args.format)
+    else:
+        writer = WavWriter(args.output, fs=args.fs, channels=args.channels, fmt=args.format)
+    with writer:
+        stats = render_offline(events, writer, fs=args.fs, block_size=args.block, wave_type=args.wave,
+                               max_voices=args.voices, release=args.release, tail=args.tail,
+                               soft_clip=not args.hard_clip, dither=args.dither, workers=args.workers, effects=effects, tuning=tuning,
+                               channels=args.channels, unison=args.unison, detune=args.detune, spread=args.spread,
+                               samples=samples, gen=SignalGenerator(args.fs, backend=args.kernels, period_cache=cache))
+    print(f"{stats['audio_seconds']:.2f} s rendues en {stats['render_seconds']:.3f} s "
+          f"(facteur temps réel {stats['realtime_factor']:.4f})", file=sys.stderr) # Sur stderr pour ne pas polluer la sortie brute
+    if cache is not None and not args.workers:
+        print(cache.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
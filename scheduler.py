@@ -0,0 +1,342 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+import numpy as np
+
+from synth.output_stage import OutputStage
+from synth.parallel import make_voices
+from synth.generator import SAMPLER_WAVE
+from synth.tuning import BEND_CENTER, Tuning
+from synth.voices import VoiceAllocator
+
+
+class RenderScheduler(threading.Thread):
+    """Thread de rendu temps réel cadencé par la carte son
+
+    Remplace le QTimer de 25 ms : au lieu de produire des blocs au rythme (imprécis) de la boucle Qt,
+    le thread attend que le callback audio ait consommé des trames, puis rend exactement autant de trames
+    que la carte son en a joué, par blocs de block_size trames.
+    Les événements de notes arrivent par une file thread-safe (note_on / note_off) alimentée par l'interface et l'entrée MIDI.
+
+    Le rendu est fait directement sur les canaux de la carte son (audio.channels) : chaque voix est placée dans l'espace stéréo par
+    le panoramique de son canal MIDI (CC 10) et peut être jouée en unisson (copies désaccordées et étalées), voir OscillatorBank.
+
+    Les notes sont identifiées par leur numéro de note MIDI et leur canal. Un événement horodaté (heure perf_counter de sa réception)
+    est joué à l'échantillon près, event_delay trames après l'instant de sa réception sur l'horloge de la carte son
+    (AudioEngine.frame_at) : le bloc est découpé aux instants des événements, comme dans offline.render_offline.
+    La latence est ainsi constante, au lieu de dépendre du moment où l'événement tombe par rapport au rendu des blocs.
+
+    Avec une bibliothèque d'échantillons, un second pool de voix (SamplerBank) joue les notes appuyées quand la forme d'onde
+    sélectionnée est SAMPLER_WAVE; les deux pools sont rendus dans le même bloc et sonnent ensemble pendant les relâchements.
+    """
+
+    def __init__(self, gen, audio, block_size=256, release_time=0.05, wave_type="Sinus", max_voices=32, steal="oldest", metrics=None, scope=None,
+                 soft_clip=True, dither=False, workers=0, effects=None, event_delay=None, tuning=None, unison=1, detune=12.0, spread=0.8,
+                 samples=None):
+        """
+        input:  - gen: instance de SignalGenerator utilisée pour rendre les blocs
+                - audio: instance de AudioEngine dont le buffer circulaire est alimenté
+                - block_size: nombre de trames par bloc rendu (typiquement 64 à 1024)
+                - release_time: durée (en secondes) du relâchement de l'enveloppe ADSR de chaque note
+                - wave_type: forme d'onde initiale ("Sinus", "Carré", "Dents de scie")
+                - max_voices: taille du pool de voix (polyphonie maximale)
+                - steal: politique de vol de voix quand le pool est plein ("oldest" ou "quietest")
+                - metrics: instance de Metrics recevant la durée de rendu, le remplissage du buffer et le nombre de voix de chaque bloc (None : désactivée)
+                - scope: instance de Scope recevant une copie de chaque bloc rendu pour l'oscilloscope (None : pas d'affichage)
+                - soft_clip, dither: options de l'étage de sortie (limitation douce, dither TPDF), voir OutputStage
+                - workers: nombre de processus de rendu des voix (0 ou 1 : rendu dans ce thread), voir parallel.ParallelVoices
+                - effects: instance de EffectsChain appliquée au mix avant l'étage de sortie (None : pas d'effets), construite pour audio.channels canaux
+                - tuning: instance de Tuning (tables de fréquences des notes MIDI et du pitch bend). None : tempérament égal, La4 = 440 Hz
+                - event_delay: retard (en trames) entre la réception d'un événement horodaté et sa lecture. Par défaut la taille
+                  du buffer circulaire, que le thread de rendu maintient plein : les événements arrivent alors avant le rendu de leur bloc
+                - unison: nombre de copies de chaque voix; detune : écart (en cents) entre la plus grave et la plus aiguë;
+                  spread : largeur stéréo de l'unisson (0 à 1), voir OscillatorBank
+                - samples: instance de SampleLibrary jouée par la forme d'onde SAMPLER_WAVE (None : pas d'échantillonneur)
+
+        1) Vérifie que la taille de bloc tient dans le buffer circulaire du moteur audio
+        2) Initialise la file d'événements, l'échéancier des événements horodatés et le gestionnaire de voix (propre au thread de rendu)
+        3) Préalloue le buffer de mix (float32, comme les voix, de forme (trames, canaux) sur plusieurs canaux) et l'étage de sortie
+           au format de la carte son, réutilisés à chaque bloc
+        4) Initialise les statistiques de temps de rendu par bloc
+
+        Attributs :
+        - events : file thread-safe des événements de notes envoyés par l'interface et l'entrée MIDI
+        - position : index de la première trame du prochain bloc rendu (même origine que AudioEngine.frame_at)
+        - voices : VoiceAllocator (pool de voix à taille fixe, enveloppes ADSR) construit sur un OscillatorBank,
+                   ou ParallelVoices (même interface) si le rendu est réparti sur plusieurs processus
+        - sampler : VoiceAllocator construit sur un SamplerBank (None sans bibliothèque), rendu dans ce thread;
+                    prefetcher : thread qui précharge les échantillons (les défauts de page n'ont pas lieu pendant le rendu)
+        - effects : EffectsChain (filtre, écho, réverbération), dont l'état est conservé d'un bloc à l'autre
+        - recorder : DiskRecorder recevant une copie de chaque bloc de sortie (None : pas d'enregistrement), voir set_recorder
+        - output : OutputStage, seule conversion de la chaîne (limitation, dither, format de la carte son)
+        - last_block : dernier bloc rendu
+        """
+        super().__init__(name="RenderScheduler", daemon=True)
+        # 1)
+        if not 0 < block_size <= audio.ring.capacity:
+            raise ValueError(f"block_size doit être compris entre 1 et {audio.ring.capacity} trames")
+        self.gen = gen
+        self.audio = audio
+        self.block_size = int(block_size)
+        self.block_duration = self.block_size / gen.fs # Durée d'un bloc : c'est l'échéance de rendu de chaque bloc
+        # 2)
+        self.events = queue.SimpleQueue()
+        self.event_delay = audio.ring.capacity if event_delay is None else int(event_delay)
+        self._scheduled = [] # Tas (trame, numéro d'ordre, événement) des événements à appliquer
+        self._seq = itertools.count() # Départage les événements d'une même trame dans leur ordre d'arrivée
+        self.position = 0
+        self.tuning = tuning if tuning is not None else Tuning(gen.fs)
+        self.bend = [BEND_CENTER] * 16 # Pitch bend courant de chaque canal MIDI
+        self.pan = [0.0] * 16 # Panoramique courant de chaque canal MIDI (-1 : gauche, 1 : droite)
+        self.wave_type = wave_type
+        self.channels = audio.channels
+        self.voices = make_voices(gen, max_voices=max_voices, max_frames=self.block_size, workers=workers, channels=self.channels,
+                                  unison=unison, detune=detune, spread=spread, release=release_time, steal=steal)
+        self.sampler = None
+        self.prefetcher = None
+        self.sampling = False # Les notes appuyées sont jouées par l'échantillonneur (forme d'onde SAMPLER_WAVE)
+        if samples is not None:
+            from synth.sampler import Prefetcher, SamplerBank # Importé seulement si l'échantillonneur est utilisé
+            bank = SamplerBank(samples, gen.fs, max_voices=max_voices, max_frames=self.block_size, channels=self.channels)
+            self.sampler = VoiceAllocator(bank, release=release_time, steal=steal)
+            self.prefetcher = Prefetcher(bank)
+        self._running = threading.Event()
+        # 3)
+        shape = (self.block_size, self.channels) if self.channels > 1 else (self.block_size,)
+        self.mix = np.zeros(shape, dtype=self.voices.dtype) # Somme des voix
+        self.sampler_mix = np.zeros(shape, dtype=self.voices.dtype) if samples is not None else None # Voix de l'échantillonneur
+        self.effects = effects
+        self.output = OutputStage(self.block_size, channels=self.channels, fmt=audio.fmt, soft_clip=soft_clip, dither=dither,
+                                   backend=gen.backend)
+        self.last_block = self.output.out # Bloc au format de la carte son, déposé dans le buffer circulaire
+        self.metrics = metrics
+        self.scope = scope
+        self.recorder = None
+        # 4)
+        self.blocks_rendered = 0
+        self.render_time_total = 0.0 # Somme des temps de rendu (s)
+        self.render_time_last = 0.0
+        self.render_time_max = 0.0
+        self.late_blocks = 0 # Blocs dont le rendu a dépassé leur propre durée audio
+        self.late_events = 0 # Événements horodatés arrivés après le rendu de leur trame (joués au début du bloc suivant)
+
+    ## Interface appelée depuis le thread de l'interface graphique (ne bloque jamais)
+
+    def note_on(self, note, velocity=1.0, channel=0, timestamp=None):
+        """Envoie un événement d'appui de note au thread de rendu
+        input:  - note: Numéro de note MIDI (69 = La4)
+                - velocity: Vélocité (entre 0 et 1)
+                - channel: Canal MIDI (0 à 15)
+                - timestamp: Heure de réception (time.perf_counter()). None : appliqué au début du prochain bloc
+        """
+        self.events.put(("note_on", (note, channel, velocity), timestamp))
+
+    def note_off(self, note, channel=0, timestamp=None):
+        """Envoie un événement de relâchement de note au thread de rendu"""
+        self.events.put(("note_off", (note, channel), timestamp))
+
+    def all_notes_off(self, channel=None, timestamp=None):
+        """Relâche les notes du canal (messages MIDI "All Sound Off" et "All Notes Off"), ou toutes si channel est None (fermeture d'un port)"""
+        self.events.put(("all_notes_off", channel, timestamp))
+
+    def pitch_bend(self, value, channel=0, timestamp=None):
+        """Envoie un pitch bend (valeur MIDI sur 14 bits, 0 à 16383, 8192 au repos) : réaccorde les notes du canal"""
+        self.events.put(("bend", (channel, value), timestamp))
+
+    def set_pan(self, value, channel=0, timestamp=None):
+        """Envoie un panoramique (-1 : gauche, 0 : centre, 1 : droite) : déplace les notes du canal et celles qui suivront"""
+        self.events.put(("pan", (channel, value), timestamp))
+
+    def set_unison(self, detune=None, spread=None):
+        """Envoie un changement de désaccord (en cents) ou de largeur stéréo de l'unisson, appliqué aussi aux notes en cours"""
+        self.events.put(("unison", (detune, spread), None))
+
+    def set_wave_type(self, wave_type):
+        """Envoie un changement de forme d'onde au thread de rendu"""
+        self.events.put(("wave", wave_type, None))
+
+    def set_recorder(self, recorder):
+        """Démarre (DiskRecorder) ou arrête (None) l'enregistrement de la sortie, à partir du prochain bloc.
+        Après un arrêt, l'appelant ferme l'enregistreur (DiskRecorder.close) : les blocs qu'il reçoit encore sont ignorés"""
+        self.events.put(("recorder", recorder, None))
+
+    def set_tuning(self, tuning):
+        """Change d'accordage (tables construites par l'appelant, hors du thread de rendu), appliqué aux notes suivantes"""
+        self.events.put(("tuning", tuning, None))
+
+    def stop(self):
+        """Demande l'arrêt du thread, attend sa fin et arrête les éventuels processus de rendu et le préchargement des échantillons"""
+        self._running.clear()
+        self.audio.consumed.set() # Réveille le thread s'il attend la carte son
+        if self.is_alive():
+            self.join(timeout=1.0)
+        self.voices.close()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+
+    def stats(self):
+        """Retourne les statistiques de temps de rendu par bloc (en millisecondes)"""
+        n = max(self.blocks_rendered, 1)
+        return {
+            "block_size": self.block_size,
+            "block_ms": self.block_duration * 1000,
+            "blocks": self.blocks_rendered,
+            "last_ms": self.render_time_last * 1000,
+            "mean_ms": self.render_time_total / n * 1000,
+            "max_ms": self.render_time_max * 1000,
+            "late_blocks": self.late_blocks,
+            "late_events": self.late_events,
+            "underruns": self.audio.underruns,
+        }
+
+    ## Boucle du thread de rendu
+
+    def run(self):
+        """
+        1) Applique tous les événements de notes en attente
+        2) Tant que le buffer circulaire a la place d'un bloc, rend un bloc et le dépose
+        3) Attend que le callback audio consomme des trames (ou un timeout d'un bloc) puis recommence
+        """
+        self._running.set()
+        if self.prefetcher is not None:
+            self.prefetcher.start() # Précharge le début de chaque échantillon pendant que le buffer se remplit
+        while self._running.is_set():
+            # 1)
+            self._drain_events()
+            # 2)
+            while self.audio.free_frames() >= self.block_size:
+                self._render_one()
+                self._drain_events() # Prend en compte les notes arrivées pendant le rendu dès le bloc suivant
+            # 3)
+            self.audio.consumed.wait(self.block_duration)
+            self.audio.consumed.clear()
+
+    def _drain_events(self):
+        """Vide la file d'événements : les changements de forme d'onde sont appliqués tout de suite,
+        les événements de notes sont rangés dans l'échéancier à la trame où ils doivent être joués
+        (trame du prochain bloc s'ils ne sont pas horodatés, ou si l'horloge de la carte son n'a pas encore démarré)
+        """
+        while True:
+            try:
+                kind, value, timestamp = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "wave":
+                self.sampling = value == SAMPLER_WAVE and self.sampler is not None
+                if value != SAMPLER_WAVE:
+                    self.wave_type = value # Les oscillateurs en relâchement gardent leur forme d'onde pendant que l'échantillonneur joue
+                continue
+            if kind == "tuning":
+                self.tuning = value
+                continue
+            if kind == "unison":
+                self.voices.set_unison(*value)
+                continue
+            if kind == "recorder":
+                self.recorder = value
+                continue
+            frame = self.audio.frame_at(timestamp) if timestamp is not None else None
+            if frame is None:
+                frame = self.position
+            else:
+                frame = int(frame) + self.event_delay
+                if frame < self.position:
+                    self.late_events += 1
+                    frame = self.position
+            heapq.heappush(self._scheduled, (frame, next(self._seq), kind, value))
+
+    def _apply(self, kind, value):
+        """Applique un événement de note au gestionnaire de voix (fréquences lues dans les tables de l'accordage).
+        Les appuis vont au pool de la forme d'onde courante, les autres événements aux deux pools"""
+        pools = (self.voices,) if self.sampler is None else (self.voices, self.sampler)
+        if kind == "note_on":
+            note, channel, velocity = value
+            pool = self.sampler if self.sampling else self.voices
+            pool.note_on(self._voice_id(note, channel), self.tuning.freq(note, self.bend[channel]), velocity, self.pan[channel])
+        elif kind == "note_off":
+            for pool in pools:
+                pool.note_off(self._voice_id(*value))
+        elif kind == "bend":
+            channel, bend = value
+            self.bend[channel] = bend
+            for pool in pools:
+                pool.retune(channel * 128, channel * 128 + 128, self.tuning.inc, self.tuning.bend_ratio[bend])
+        elif kind == "pan":
+            channel, pan = value
+            self.pan[channel] = pan
+            for pool in pools:
+                pool.set_pan(channel * 128, channel * 128 + 128, pan)
+        elif kind == "all_notes_off":
+            lo, hi = (0, None) if value is None else (value * 128, value * 128 + 128)
+            for pool in pools:
+                pool.all_notes_off(lo, hi)
+
+    @staticmethod
+    def _voice_id(note, channel=0):
+        """Identifiant entier d'une voix : canal et numéro de note MIDI"""
+        return channel * 128 + note
+
+    def _render_one(self):
+        """Rend un bloc de block_size trames, le dépose dans le buffer circulaire et met à jour les statistiques
+
+        1) Rend toutes les voix (avec leur enveloppe) dans le buffer de mix, en découpant le bloc aux trames des événements de l'échéancier
+           (chaque événement est appliqué à son échantillon exact), y ajoute les voix de l'échantillonneur s'il en joue,
+           puis applique la chaîne d'effets au mix (en place). Avec des workers (voir parallel.ParallelVoices.split), les découpes
+           sont seulement marquées et le bloc entier est rendu en un seul ordre : un aller-retour par bloc, et non par tranche
+        2) Étage de sortie : limitation (pas de repliement d'entier), dither éventuel et conversion au format de la carte son, dans un buffer réutilisé
+        3) Dépose le bloc dans le buffer circulaire, et sa copie dans l'historique de l'oscilloscope (premier canal, vue sans copie)
+           et dans le buffer de l'enregistreur (écrit sur le disque par son propre thread)
+        """
+        start = time.perf_counter()
+        # 1)
+        n, pos, scheduled = self.block_size, self.position, self._scheduled
+        split = getattr(self.voices, "split", None) # ParallelVoices : les workers découpent eux-mêmes le bloc
+        sampled = False
+        offset = 0
+        while offset < n:
+            if offset and split is not None:
+                split(offset)
+            while scheduled and scheduled[0][0] <= pos + offset:
+                _, _, kind, value = heapq.heappop(scheduled)
+                self._apply(kind, value)
+            stop = min(n, scheduled[0][0] - pos) if scheduled else n
+            if split is None:
+                self.voices.render(self.mix[offset:stop], self.wave_type)
+            if self.sampler is not None and (self.sampler.n_voices or sampled):
+                part = self.sampler.render(self.sampler_mix[offset:stop], None)
+                if split is None:
+                    np.add(self.mix[offset:stop], part, out=self.mix[offset:stop])
+                elif not sampled: # Tranches précédentes du bloc sans échantillonneur : silence
+                    self.sampler_mix[:offset] = 0
+                    sampled = True
+            offset = stop
+        if split is not None:
+            self.voices.render(self.mix, self.wave_type)
+            if sampled:
+                np.add(self.mix, self.sampler_mix, out=self.mix)
+        self.position += n
+        if self.effects is not None:
+            self.effects.process(self.mix, self.mix)
+        # 2)
+        block = self.output.process(self.mix)
+        # 3)
+        self.audio.play(block)
+        if self.scope is not None:
+            self.scope.push(block if block.ndim == 1 else block[:, 0])
+        if self.recorder is not None:
+            self.recorder.push(block)
+
+        elapsed = time.perf_counter() - start
+        self.blocks_rendered += 1
+        self.render_time_total += elapsed
+        self.render_time_last = elapsed
+        if elapsed > self.render_time_max:
+            self.render_time_max = elapsed
+        if elapsed > self.block_duration:
+            self.late_blocks += 1
+        if self.metrics is not None:
+            n_voices = self.voices.n_voices + (self.sampler.n_voices if self.sampler is not None else 0)
+            self.metrics.record_block(elapsed, self.block_duration, n_voices, self.audio.fill_level())
@@ -0,0 +1,147 @@
+import numpy as np
+
+
+class Scope:
+    """Oscilloscope : historique circulaire préalloué, déclenchement sur front montant et décimation min/max
+
+    Le thread de rendu dépose chaque bloc avec push() (une copie dans un tableau préalloué, sans allocation).
+    L'interface appelle frame() au rythme de l'écran (30 ou 60 images par seconde), indépendamment du rythme des blocs audio.
+
+    L'historique est stocké deux fois de suite (tableau "miroir" de 2 × capacity échantillons) :
+    n'importe quelle fenêtre de l'historique est alors une vue contiguë, sans recopie pour gérer le retour au début du tableau.
+
+    La fenêtre affichée est réduite à la largeur du widget en pixels : pour chaque colonne on garde le minimum et le maximum
+    des échantillons qu'elle couvre (2 points par colonne). Le nombre de points dessinés ne dépend donc que de la largeur,
+    et le nombre d'échantillons lus par colonne est plafonné (max_per_pixel) : le coût d'une image ne croît pas avec fs.
+    """
+
+    def __init__(self, fs=44100, window=0.03, history=0.2, width=800, level=0.0, max_per_pixel=16, search_points=512):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - window: Durée affichée (en secondes)
+                - history: Durée de l'historique conservé (en secondes), au moins deux fenêtres
+                - width: Largeur de l'affichage en pixels (nombre de colonnes min/max)
+                - level: Niveau de déclenchement (front montant)
+                - max_per_pixel: Nombre maximal d'échantillons lus par colonne (au-delà, lecture avec un pas)
+                - search_points: Nombre de points examinés pour la recherche grossière du déclenchement
+
+        1) Préalloue l'historique miroir et initialise le compteur d'échantillons écrits
+        2) Calcule la taille de la fenêtre et de la zone de recherche du déclenchement
+        3) Préalloue les tableaux de sortie (abscisses et ordonnées min/max) pour la largeur donnée
+        """
+        # 1)
+        self.fs = fs
+        self.capacity = int(history * fs)
+        self._buf = np.zeros(2 * self.capacity, dtype=np.float32) # Historique écrit deux fois (miroir)
+        self._pos = 0 # Nombre total d'échantillons écrits (modifié uniquement par le thread de rendu)
+        self.level = level
+        self.max_per_pixel = max_per_pixel
+        self.search_points = search_points
+        self.triggered = False # Vrai si la dernière image est alignée sur un front montant
+        # 2)
+        self.set_window(window)
+        # 3)
+        self.width = 0
+        self.set_width(width)
+
+    def set_window(self, window):
+        """Modifie la durée affichée. La zone de recherche du déclenchement couvre une période à 40 Hz"""
+        self.n_window = max(int(window * self.fs), 2)
+        self.n_search = int(self.fs / 40)
+        if self.n_window + self.n_search > self.capacity:
+            raise ValueError(f"La fenêtre ({window} s) ne tient pas dans l'historique de l'oscilloscope")
+        self._search_step = max(1, -(-self.n_search // self.search_points)) # Pas de la recherche grossière
+        size = max(self.n_search // self._search_step + 1, self._search_step + 1)
+        self._below = np.empty(size, dtype=bool)
+        self._cross = np.empty(size, dtype=bool)
+        self.width = 0 # Force le recalcul des abscisses au prochain set_width
+
+    def set_width(self, width):
+        """Adapte les tableaux de sortie à la largeur de l'affichage (ne fait rien si elle n'a pas changé)"""
+        width = max(1, min(int(width), self.n_window))
+        if width == self.width:
+            return
+        self.width = width
+        self._per_col = self.n_window // width # Échantillons couverts par une colonne
+        self._step = max(1, -(-self._per_col // self.max_per_pixel)) # Pas de lecture dans une colonne
+        self._lo = np.empty(width, dtype=np.float32)
+        self._hi = np.empty(width, dtype=np.float32)
+        self.x = np.repeat(np.arange(width) * (self._per_col / self.fs * 1000), 2) # Abscisses en ms, deux points par colonne
+        self.y = np.empty(2 * width, dtype=np.float32)
+
+    def push(self, block):
+        """Ajoute un bloc d'échantillons (appelé par le thread de rendu, sans allocation)
+
+        1) Ne garde que la fin du bloc s'il est plus long que l'historique
+        2) Copie en une ou deux parties, chacune aux deux emplacements du miroir
+        3) Publie les nouveaux échantillons en avançant le compteur en dernier
+        """
+        # 1)
+        cap = self.capacity
+        if len(block) > cap:
+            self._pos += len(block) - cap
+            block = block[-cap:]
+        n = len(block)
+        # 2)
+        start = self._pos % cap
+        first = min(n, cap - start)
+        self._buf[start:start + first] = block[:first]
+        self._buf[start + cap:start + cap + first] = block[:first]
+        if n > first:
+            self._buf[:n - first] = block[first:]
+            self._buf[cap:cap + n - first] = block[first:]
+        # 3)
+        self._pos += n
+
+    def _trigger(self, seg):
+        """Index du dernier front montant (passage de level par valeurs croissantes) dans seg, ou -1"""
+        n = len(seg) - 1
+        below, cross = self._below[:n], self._cross[:n]
+        np.less(seg[:-1], self.level, out=below)
+        np.greater_equal(seg[1:], self.level, out=cross)
+        np.logical_and(below, cross, out=cross)
+        idx = np.flatnonzero(cross)
+        return int(idx[-1]) + 1 if len(idx) else -1
+
+    def _find_trigger(self, seg):
+        """Dernier front montant dans seg, en deux passes de coût borné :
+        recherche grossière sur un échantillon sur _search_step, puis recherche exacte entre les deux points grossiers encadrant le front
+        """
+        step = self._search_step
+        t = self._trigger(seg[::step])
+        if t < 0 or step == 1:
+            return t * step if t >= 0 else -1
+        lo = (t - 1) * step
+        fine = self._trigger(seg[lo:t * step + 1])
+        return lo + fine if fine >= 0 else t * step
+
+    def frame(self):
+        """Calcule l'image courante
+        output: (x, y) tableaux préalloués (réutilisés à l'image suivante), ou None si l'historique ne couvre pas encore une fenêtre
+
+        1) Cherche le dernier front montant dans la zone qui précède la fenêtre la plus récente
+           (sans front : affichage libre de la fenêtre la plus récente)
+        2) Découpe la fenêtre en colonnes (vue 2-D, sans copie), lues avec un pas si elles couvrent trop d'échantillons
+        3) Minimum et maximum de chaque colonne (au plus max_per_pixel opérations sur des vecteurs de la largeur de l'écran), entrelacés dans y
+        """
+        pos = self._pos
+        n_win, n_search = self.n_window, self.n_search
+        if pos < n_win + n_search:
+            return None
+        # 1)
+        start = (pos - n_win - n_search) % self.capacity
+        seg = self._buf[start:start + n_search + n_win]
+        t = self._find_trigger(seg[:n_search + 1])
+        self.triggered = t >= 0
+        win = seg[t:t + n_win] if self.triggered else seg[n_search:]
+        # 2)
+        cols = win[:self._per_col * self.width].reshape(self.width, self._per_col)[:, ::self._step]
+        # 3)
+        np.copyto(self._lo, cols[:, 0])
+        np.copyto(self._hi, cols[:, 0])
+        for j in range(1, cols.shape[1]):
+            np.minimum(self._lo, cols[:, j], out=self._lo)
+            np.maximum(self._hi, cols[:, j], out=self._hi)
+        self.y[0::2] = self._lo
+        self.y[1::2] = self._hi
+        return self.x, self.y
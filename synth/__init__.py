@@ -0,0 +1,55 @@
+"""Cœur du synthétiseur, sans interface graphique ni carte son : oscillateurs, voix, accordage, effets, étage de sortie,
+échantillonneur, écriture de fichiers et rendu parallèle
+
+S'importe sans PyQt5, pyqtgraph, sounddevice ni périphérique audio (scripts, tests, rendu hors ligne : voir offline.py).
+Les sous-modules ne sont importés qu'à la première lecture d'un de leurs noms : import synth ne charge que ce fichier,
+synth.SignalGenerator importe synth.generator (et numpy). Numba n'est importé que si le backend numba est choisi (voir kernels.available).
+
+Utilisation :
+    import numpy as np
+    from synth import SignalGenerator, VoiceAllocator
+    gen = SignalGenerator(44100, backend="numpy")
+    voices = VoiceAllocator(gen.make_bank(max_voices=8, max_frames=256))
+    voices.note_on(69, 440.0)
+    block = voices.render(np.zeros(256, dtype=np.float32), "Sinus")
+"""
+import importlib
+
+# Nom public → sous-module qui le définit (importé à la première lecture, voir __getattr__)
+_EXPORTS = {
+    "SignalGenerator": "generator",
+    "OscillatorBank": "generator",
+    "WAVE_TYPES": "generator",
+    "WavetableSet": "wavetable",
+    "PeriodCache": "period_cache",
+    "VoiceAllocator": "voices",
+    "Tuning": "tuning",
+    "EffectsChain": "effects",
+    "EFFECTS": "effects",
+    "OutputStage": "output_stage",
+    "SampleLibrary": "sampler",
+    "SamplerBank": "sampler",
+    "SAMPLER_WAVE": "generator",
+    "WavWriter": "wav_writer",
+    "RawWriter": "wav_writer",
+    "FlacWriter": "wav_writer",
+    "ParallelVoices": "parallel",
+    "make_voices": "parallel",
+    "RingBuffer": "ringbuffer",
+    "DiskRecorder": "recorder",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Importe le sous-module qui définit name à la première lecture de synth.name (PEP 562)"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value # Les lectures suivantes ne passent plus par __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
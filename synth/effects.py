@@ -0,0 +1,480 @@
+import time
+
+import numpy as np
+
+# numpy ≥ 2.0 : les FFT acceptent un tableau de sortie (sinon le résultat est alloué puis copié)
+_FFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+BIQUAD_KINDS = ("lowpass", "highpass", "bandpass", "notch", "peak", "lowshelf", "highshelf")
+
+
+def _rfft(x, out):
+    if _FFT_OUT:
+        return np.fft.rfft(x, axis=0, out=out)
+    out[:] = np.fft.rfft(x, axis=0)
+    return out
+
+
+def _irfft(x, n, out):
+    if _FFT_OUT:
+        return np.fft.irfft(x, n, axis=0, out=out)
+    out[:] = np.fft.irfft(x, n, axis=0)
+    return out
+
+
+class Effect:
+    """Base des effets : nom, contournement (bypass) et temps de calcul mesuré par la chaîne
+
+    Chaque effet implémente process(in_buf, out_buf) sur des blocs float32 contigus de même forme : 1-D en mono, (trames, canaux)
+    sinon (in_buf et out_buf peuvent être le même tableau). Les canaux sont traités ensemble, chacun avec son propre état (colonne),
+    par les mêmes opérations que le mono. L'état (mémoire des filtres, lignes à retard) est conservé d'un bloc à l'autre et
+    tous les tableaux sont préalloués à la construction : process() n'alloue pas de tableau.
+    """
+
+    name = "effect"
+
+    def __init__(self, fs, max_frames, channels=1):
+        self.fs = fs
+        self.max_frames = int(max_frames)
+        self.channels = int(channels)
+        self.bypass = False
+        self.calls = 0
+        self.time_total = 0.0 # Temps de calcul cumulé (s)
+        self.time_last = 0.0
+        self.time_max = 0.0
+
+    def process(self, in_buf, out_buf):
+        """Traite un bloc : in_buf → out_buf (tableaux de même forme, éventuellement le même tableau)"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Efface l'état (mémoire des filtres, lignes à retard) sans réallouer"""
+
+
+class Biquad(Effect):
+    """Filtre biquad (formules du "Audio EQ Cookbook" de R. Bristow-Johnson), vectorisé par sous-blocs
+
+    La récurrence d'un filtre IIR ne se vectorise pas échantillon par échantillon. Sur un sous-bloc de m échantillons, la sortie
+    est pourtant exactement :
+        y = T · x + G · z
+    où T est la matrice de Toeplitz triangulaire des m premiers échantillons de la réponse impulsionnelle, z l'état du filtre
+    (forme directe II transposée, deux valeurs) au début du sous-bloc et G la réponse libre du filtre à chaque composante de l'état.
+    T et G sont calculées une seule fois (à chaque changement de paramètres) ; le rendu ne fait que deux produits matrice-vecteur
+    par sous-bloc (matrice-matrice sur plusieurs canaux), et le nouvel état se déduit des deux derniers échantillons d'entrée et de sortie.
+    Équivalent sans dépendance de scipy.signal.lfilter avec un état zi conservé d'un bloc à l'autre.
+    """
+
+    name = "filter"
+
+    def __init__(self, fs=44100, kind="lowpass", freq=1000.0, q=0.707, gain_db=0.0, max_frames=4096, chunk=64, channels=1):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - kind: Type de filtre (voir BIQUAD_KINDS)
+                - freq: Fréquence de coupure ou centrale (en Hz)
+                - q: Facteur de qualité
+                - gain_db: Gain (en dB) des filtres "peak", "lowshelf" et "highshelf"
+                - max_frames: Nombre maximal de trames par bloc
+                - chunk: Taille des sous-blocs (taille de la matrice de Toeplitz) : m opérations par échantillon
+                - channels: Nombre de canaux (un état par canal)
+
+        1) Préalloue l'état, les matrices T et G et les tableaux de travail
+        2) Calcule les coefficients et les matrices pour les paramètres donnés
+        """
+        super().__init__(fs, max_frames, channels)
+        # 1)
+        self.chunk = int(chunk)
+        C = self.channels
+        self.z = np.zeros((2, C)) # État (forme directe II transposée) de chaque canal, en float64
+        self._z32 = np.zeros((2, C), dtype=np.float32)
+        self._T = np.zeros((self.chunk, self.chunk), dtype=np.float32)
+        self._G = np.zeros((self.chunk, 2), dtype=np.float32)
+        self._free = np.empty((self.chunk, C), dtype=np.float32) # Réponse libre d'un sous-bloc
+        self._x = np.empty((self.chunk, C), dtype=np.float32) # Copie de l'entrée (si in_buf et out_buf sont le même tableau)
+        self._tail = np.zeros((4, C)) # Deux derniers échantillons d'entrée et de sortie d'un sous-bloc, en float64
+        self._t = np.empty(C)
+        # 2)
+        self.set_params(kind, freq, q, gain_db)
+
+    def set_params(self, kind=None, freq=None, q=None, gain_db=None):
+        """Modifie les paramètres du filtre (l'état est conservé : pas de clic)
+
+        1) Coefficients normalisés (a0 = 1) b0, b1, b2, a1, a2
+        2) Réponse impulsionnelle h sur chunk échantillons → matrice de Toeplitz T[i, j] = h[i - j]
+        3) Réponse libre à un état unitaire (1, 0) puis (0, 1) → colonnes de G
+        """
+        kind = self.kind if kind is None else kind
+        if kind not in BIQUAD_KINDS:
+            raise ValueError(f"Type de filtre inconnu : {kind!r} (attendu : {', '.join(BIQUAD_KINDS)})")
+        self.kind = kind
+        self.freq = self.freq if freq is None else float(np.clip(freq, 1.0, self.fs * 0.49))
+        self.q = self.q if q is None else max(float(q), 1e-3)
+        self.gain_db = self.gain_db if gain_db is None else float(gain_db)
+        # 1)
+        w0 = 2 * np.pi * self.freq / self.fs
+        cos, alpha = np.cos(w0), np.sin(w0) / (2 * self.q)
+        A = 10 ** (self.gain_db / 40)
+        if kind == "lowpass":
+            b, a = [(1 - cos) / 2, 1 - cos, (1 - cos) / 2], [1 + alpha, -2 * cos, 1 - alpha]
+        elif kind == "highpass":
+            b, a = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2], [1 + alpha, -2 * cos, 1 - alpha]
+        elif kind == "bandpass":
+            b, a = [alpha, 0.0, -alpha], [1 + alpha, -2 * cos, 1 - alpha]
+        elif kind == "notch":
+            b, a = [1.0, -2 * cos, 1.0], [1 + alpha, -2 * cos, 1 - alpha]
+        elif kind == "peak":
+            b, a = [1 + alpha * A, -2 * cos, 1 - alpha * A], [1 + alpha / A, -2 * cos, 1 - alpha / A]
+        else: # Plateaux (shelving)
+            sq = 2 * np.sqrt(A) * alpha
+            sign = 1 if kind == "lowshelf" else -1
+            b = [A * ((A + 1) - sign * (A - 1) * cos + sq), sign * 2 * A * ((A - 1) - sign * (A + 1) * cos), A * ((A + 1) - sign * (A - 1) * cos - sq)]
+            a = [(A + 1) + sign * (A - 1) * cos + sq, -sign * 2 * ((A - 1) + sign * (A + 1) * cos), (A + 1) + sign * (A - 1) * cos - sq]
+        self.b = [c / a[0] for c in b]
+        self.a = [1.0, a[1] / a[0], a[2] / a[0]]
+        # 2)
+        h = self._run(np.eye(1, self.chunk).ravel(), 0.0, 0.0)
+        for i in range(self.chunk):
+            self._T[i, :i + 1] = h[i::-1]
+        # 3)
+        zeros = np.zeros(self.chunk)
+        self._G[:, 0] = self._run(zeros, 1.0, 0.0)
+        self._G[:, 1] = self._run(zeros, 0.0, 1.0)
+
+    def _run(self, x, z1, z2):
+        """Récurrence échantillon par échantillon (forme directe II transposée), utilisée seulement pour calculer T et G"""
+        b0, b1, b2 = self.b
+        _, a1, a2 = self.a
+        y = np.empty(len(x))
+        for n, xn in enumerate(x):
+            y[n] = b0 * xn + z1
+            z1 = b1 * xn - a1 * y[n] + z2
+            z2 = b2 * xn - a2 * y[n]
+        return y
+
+    def process(self, in_buf, out_buf):
+        """Filtre un bloc, sous-bloc par sous-bloc (tous les canaux à la fois : un bloc mono est vu en (trames, 1), sans copie)
+        1) Copie l'entrée du sous-bloc (in_buf et out_buf peuvent être le même tableau)
+        2) y = T · x + G · z
+        3) Nouvel état (en float64) à partir des deux derniers échantillons d'entrée et de sortie :
+           z1 = b1·x[-1] - a1·y[-1] + b2·x[-2] - a2·y[-2] (ou + z2 si le sous-bloc n'a qu'un échantillon), z2 = b2·x[-1] - a2·y[-1]
+        """
+        b0, b1, b2 = self.b
+        _, a1, a2 = self.a
+        n = len(in_buf)
+        in_buf, out = in_buf.reshape(n, -1), out_buf.reshape(n, -1)
+        z, t = self.z, self._t
+        x1, y1, x2, y2 = self._tail
+        for start in range(0, n, self.chunk):
+            m = min(self.chunk, n - start)
+            # 1)
+            x = self._x[:m]
+            np.copyto(x, in_buf[start:start + m])
+            y = out[start:start + m]
+            # 2)
+            np.copyto(self._z32, z)
+            np.dot(self._T[:m, :m], x, out=y)
+            np.dot(self._G[:m], self._z32, out=self._free[:m])
+            np.add(y, self._free[:m], out=y)
+            # 3)
+            np.copyto(x1, x[-1])
+            np.copyto(y1, y[-1])
+            if m > 1:
+                np.copyto(x2, x[-2])
+                np.copyto(y2, y[-2])
+                np.multiply(x2, b2, out=z[0])
+                np.multiply(y2, a2, out=t)
+                np.subtract(z[0], t, out=z[0])
+            else:
+                np.copyto(z[0], z[1])
+            np.multiply(x1, b1, out=t)
+            np.add(z[0], t, out=z[0])
+            np.multiply(y1, a1, out=t)
+            np.subtract(z[0], t, out=z[0])
+            np.multiply(x1, b2, out=z[1])
+            np.multiply(y1, a2, out=t)
+            np.subtract(z[1], t, out=z[1])
+        return out_buf
+
+    def reset(self):
+        self.z[:] = 0.0
+
+
+class FeedbackDelay(Effect):
+    """Écho à réinjection sur une ligne à retard circulaire préallouée
+
+        s[n] = x[n] + feedback · s[n - D]        (contenu de la ligne à retard)
+        y[n] = (1 - mix) · x[n] + mix · s[n - D]
+
+    Tant que le bloc ne dépasse pas le retard D, tout le bloc se calcule en une fois (il ne lit que des échantillons déjà écrits) ;
+    un bloc plus long que D est traité par tranches de D échantillons.
+    """
+
+    name = "delay"
+
+    def __init__(self, fs=44100, delay=0.3, feedback=0.4, mix=0.3, max_delay=2.0, max_frames=4096, channels=1):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - delay: Retard (en secondes)
+                - feedback: Gain de réinjection (|feedback| < 1)
+                - mix: Proportion de signal retardé dans la sortie (0 : signal direct seul)
+                - max_delay: Retard maximal (en secondes), fixe la taille de la ligne à retard
+                - max_frames: Nombre maximal de trames par bloc
+                - channels: Nombre de canaux (une ligne à retard par canal, colonnes d'un même tableau)
+        """
+        super().__init__(fs, max_frames, channels)
+        self.size = int(max_delay * fs) + 1
+        self.line = np.zeros((self.size, self.channels), dtype=np.float32) # Ligne à retard circulaire
+        self.pos = 0 # Position d'écriture
+        self._delayed = np.empty((self.max_frames, self.channels), dtype=np.float32)
+        self._tmp = np.empty((self.max_frames, self.channels), dtype=np.float32)
+        self.set_params(delay, feedback, mix)
+
+    def set_params(self, delay=None, feedback=None, mix=None):
+        if delay is not None:
+            self.delay = int(np.clip(round(delay * self.fs), 1, self.size - 1)) # Retard en échantillons
+        if feedback is not None:
+            if not -1 < feedback < 1:
+                raise ValueError("Le gain de réinjection doit être compris entre -1 et 1 (exclus)")
+            self.feedback = float(feedback)
+        if mix is not None:
+            self.mix = float(np.clip(mix, 0.0, 1.0))
+
+    def _read(self, start, out):
+        """Copie len(out) échantillons de la ligne à partir de start (modulo sa taille)"""
+        start %= self.size
+        first = min(len(out), self.size - start)
+        out[:first] = self.line[start:start + first]
+        out[first:] = self.line[:len(out) - first]
+
+    def _write(self, start, data):
+        start %= self.size
+        first = min(len(data), self.size - start)
+        self.line[start:start + first] = data[:first]
+        self.line[:len(data) - first] = data[first:]
+
+    def process(self, in_buf, out_buf):
+        """
+        1) Lit les échantillons retardés de la tranche
+        2) Écrit dans la ligne l'entrée plus la réinjection
+        3) Mélange signal direct et signal retardé dans out_buf (après l'écriture : in_buf peut être out_buf)
+        """
+        n = len(in_buf)
+        in_buf, out = in_buf.reshape(n, -1), out_buf.reshape(n, -1) # Mono vu en (trames, 1), sans copie
+        start = 0
+        while start < n:
+            m = min(n - start, self.delay)
+            x = in_buf[start:start + m]
+            d = self._delayed[:m]
+            s = self._tmp[:m]
+            # 1)
+            self._read(self.pos - self.delay, d)
+            # 2)
+            np.multiply(d, self.feedback, out=s)
+            np.add(s, x, out=s)
+            self._write(self.pos, s)
+            # 3)
+            y = out[start:start + m]
+            np.multiply(d, self.mix, out=d)
+            np.multiply(x, 1 - self.mix, out=y)
+            np.add(y, d, out=y)
+            self.pos = (self.pos + m) % self.size
+            start += m
+        return out_buf
+
+    def reset(self):
+        self.line.fill(0)
+
+
+def synthetic_ir(fs=44100, rt60=1.5, seed=0):
+    """Réponse impulsionnelle de réverbération synthétique : bruit blanc à décroissance exponentielle
+    input:  - rt60: Temps (en secondes) pour que le niveau baisse de 60 dB
+    output: Tableau float32 de durée rt60, d'énergie unitaire
+    """
+    n = int(rt60 * fs)
+    ir = np.random.default_rng(seed).standard_normal(n) * 10 ** (-3 * np.arange(n) / n) # -60 dB à la fin
+    return (ir / np.sqrt(np.sum(ir ** 2))).astype(np.float32)
+
+
+class ConvolutionReverb(Effect):
+    """Réverbération par convolution, partitionnée uniformément dans le domaine fréquentiel (overlap-save)
+
+    La réponse impulsionnelle est découpée en K partitions de P échantillons (P = taille de bloc), dont les spectres H[k]
+    (FFT sur 2P points) sont calculés à la construction. À chaque bloc :
+        - le spectre X des 2P derniers échantillons d'entrée est rangé dans une ligne à retard fréquentielle (K spectres)
+        - Y = Σ_k X[bloc - k] · H[k] (produits complexes vectorisés sur toutes les partitions)
+        - la sortie est la seconde moitié de la FFT inverse de Y
+    Coût par bloc : une FFT directe, une FFT inverse et K·(P+1) multiplications complexes, sans latence ajoutée.
+    """
+
+    name = "reverb"
+
+    def __init__(self, fs=44100, ir=None, mix=0.25, max_frames=256, channels=1):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - ir: Réponse impulsionnelle (None : synthetic_ir(fs))
+                - mix: Proportion de signal réverbéré dans la sortie
+                - max_frames: Taille de bloc P (taille des partitions). Les blocs doivent faire P trames, sauf le dernier
+                  d'un rendu (complété par des zéros)
+                - channels: Nombre de canaux (même réponse impulsionnelle, une ligne à retard fréquentielle par canal)
+
+        1) Découpe la réponse impulsionnelle en partitions et calcule leurs spectres
+        2) Préalloue la ligne à retard fréquentielle, le buffer d'entrée (2P) et les tableaux de travail, avec un axe des canaux :
+           FFT, produits et sommes traitent tous les canaux en une opération
+        """
+        super().__init__(fs, max_frames, channels)
+        ir = synthetic_ir(fs) if ir is None else np.asarray(ir, dtype=np.float32)
+        self.mix = float(np.clip(mix, 0.0, 1.0))
+        P = self.max_frames
+        # 1)
+        self.K = max(1, -(-len(ir) // P))
+        padded = np.zeros((self.K, 2 * P), dtype=np.float32)
+        for k in range(self.K):
+            part = ir[k * P:(k + 1) * P]
+            padded[k, :len(part)] = part
+        H = np.fft.rfft(padded, axis=1).astype(np.complex64)
+        # Spectres rangés pour que le produit avec la ligne à retard (rangée circulairement) soit une tranche contiguë :
+        # _H2[t] = H[(-t) mod K], et la partition k s'applique au spectre d'entrée d'indice (head - k) mod K
+        self._H2 = H[(-np.arange(2 * self.K)) % self.K][:, :, None] # Axe des canaux (diffusé)
+        # 2)
+        C = self.channels
+        self.fdl = np.zeros((self.K, P + 1, C), dtype=np.complex64) # Ligne à retard fréquentielle
+        self.head = 0 # Case du spectre le plus récent
+        self._in = np.zeros((2 * P, C), dtype=np.float32) # Bloc précédent + bloc courant
+        self._prod = np.empty((self.K, P + 1, C), dtype=np.complex64)
+        self._acc = np.empty((P + 1, C), dtype=np.complex64)
+        self._wet = np.empty((2 * P, C), dtype=np.float32)
+
+    def process(self, in_buf, out_buf):
+        """
+        1) Décale le buffer d'entrée et y copie le bloc (complété par des zéros s'il est plus court que P)
+        2) FFT du buffer d'entrée dans la case la plus récente de la ligne à retard fréquentielle
+        3) Somme des produits de chaque spectre retardé par la partition correspondante
+        4) FFT inverse ; les P derniers échantillons sont la sortie réverbérée (overlap-save)
+        5) Mélange signal direct et signal réverbéré
+        """
+        P = self.max_frames
+        n = len(in_buf)
+        if n > P:
+            raise ValueError(f"Bloc de {n} trames plus long que la partition de la réverbération ({P})")
+        in_buf, out = in_buf.reshape(n, -1), out_buf.reshape(n, -1) # Mono vu en (trames, 1), sans copie
+        # 1)
+        self._in[:P] = self._in[P:]
+        self._in[P:P + n] = in_buf
+        self._in[P + n:] = 0
+        # 2)
+        self.head = (self.head + 1) % self.K
+        _rfft(self._in, self.fdl[self.head])
+        # 3)
+        np.multiply(self.fdl, self._H2[self.K - self.head:2 * self.K - self.head], out=self._prod)
+        np.add.reduce(self._prod, axis=0, out=self._acc)
+        # 4)
+        _irfft(self._acc, 2 * P, self._wet)
+        wet = self._wet[P:P + n]
+        # 5)
+        np.multiply(wet, self.mix, out=wet)
+        np.multiply(in_buf, 1 - self.mix, out=out)
+        np.add(out, wet, out=out)
+        return out_buf
+
+    def reset(self):
+        self.fdl.fill(0)
+        self._in.fill(0)
+
+
+# Effets disponibles par nom (option --effects de main.py et offline.py)
+EFFECTS = {"filter": Biquad, "delay": FeedbackDelay, "reverb": ConvolutionReverb}
+
+
+class EffectsChain:
+    """Chaîne d'effets appliqués en série, avec mesure du temps de calcul de chaque effet
+
+    Les effets travaillent en alternance entre deux buffers préalloués (de la forme des blocs : 1-D en mono, (trames, canaux) sinon) ;
+    le résultat est copié dans out_buf.
+    stats() donne le temps de calcul de chaque effet et sa part de l'échéance d'un bloc, pour vérifier qu'une chaîne tient
+    dans le temps réel.
+    La liste des effets actifs (non contournés) est tenue à jour par add, remove et set_bypass, et non recalculée à chaque bloc :
+    le contournement d'un effet de la chaîne se change par set_bypass. Chaque mise à jour remplace la liste en une seule affectation,
+    process (thread de rendu) voit donc l'ancienne ou la nouvelle liste, jamais un état intermédiaire.
+    """
+
+    def __init__(self, max_frames, effects=(), channels=1):
+        self.max_frames = int(max_frames)
+        self.channels = int(channels)
+        self.effects = list(effects)
+        self.active = [fx for fx in self.effects if not fx.bypass] # Effets appliqués par process, dans l'ordre de la chaîne
+        shape = (self.max_frames, self.channels) if self.channels > 1 else (self.max_frames,)
+        self._bufs = (np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.float32))
+
+    @classmethod
+    def from_names(cls, names, fs=44100, max_frames=256, channels=1):
+        """Construit une chaîne à partir de noms d'effets (ex: ["filter", "delay", "reverb"]) avec leurs paramètres par défaut"""
+        unknown = [name for name in names if name not in EFFECTS]
+        if unknown:
+            raise ValueError(f"Effet inconnu : {', '.join(unknown)} (attendu : {', '.join(EFFECTS)})")
+        return cls(max_frames, [EFFECTS[name](fs=fs, max_frames=max_frames, channels=channels) for name in names], channels)
+
+    def add(self, effect):
+        self.effects.append(effect)
+        self._update_active()
+        return effect
+
+    def remove(self, effect):
+        self.effects.remove(effect)
+        self._update_active()
+
+    def set_bypass(self, effect, bypass=True):
+        """Contourne (bypass=True) ou réactive un effet de la chaîne"""
+        effect.bypass = bool(bypass)
+        self._update_active()
+
+    def _update_active(self):
+        self.active = [fx for fx in self.effects if not fx.bypass]
+
+    def process(self, in_buf, out_buf):
+        """Applique les effets actifs en série
+        1) Copie l'entrée dans le premier buffer de travail
+        2) Chaque effet lit un buffer et écrit dans l'autre, son temps de calcul est mesuré
+        3) Copie le résultat dans out_buf
+        """
+        active = self.active
+        if not active:
+            if out_buf is not in_buf:
+                np.copyto(out_buf, in_buf)
+            return out_buf
+        n = len(in_buf)
+        # 1)
+        src, dst = self._bufs[0][:n], self._bufs[1][:n]
+        np.copyto(src, in_buf)
+        # 2)
+        for fx in active:
+            start = time.perf_counter()
+            fx.process(src, dst)
+            elapsed = time.perf_counter() - start
+            fx.calls += 1
+            fx.time_total += elapsed
+            fx.time_last = elapsed
+            if elapsed > fx.time_max:
+                fx.time_max = elapsed
+            src, dst = dst, src
+        # 3)
+        np.copyto(out_buf, src)
+        return out_buf
+
+    def reset(self):
+        for fx in self.effects:
+            fx.reset()
+
+    def stats(self, block_duration=None):
+        """Temps de calcul de chaque effet (en ms) et, si block_duration est donnée, sa part de l'échéance du bloc"""
+        out = []
+        for fx in self.effects:
+            mean = fx.time_total / fx.calls if fx.calls else 0.0
+            entry = {"name": fx.name, "bypass": fx.bypass, "last_ms": fx.time_last * 1000, "mean_ms": mean * 1000, "max_ms": fx.time_max * 1000}
+            if block_duration:
+                entry["load"] = mean / block_duration
+            out.append(entry)
+        return out
+
+    def report(self, block_duration):
+        """Texte court (une ligne par effet) pour le panneau de statistiques"""
+        return "\n".join(f"{s['name']:<8}: {s['mean_ms']:.3f} ms (max {s['max_ms']:.3f}), {s['load'] * 100:.1f} % du bloc"
+                         for s in self.stats(block_duration))
@@ -0,0 +1,627 @@
+import numpy as np
+
+from . import kernels
+from .wavetable import TABLE_WAVES, WavetableSet
+
+# Formes d'onde anti-repliement par correction polyBLEP et forme d'onde de base correspondante
+POLYBLEP_WAVES = {"Carré (polyBLEP)": "Carré", "Dents de scie (polyBLEP)": "Dents de scie"}
+# Toutes les formes d'onde disponibles, dans l'ordre du sélecteur de l'interface
+WAVE_TYPES = ["Sinus", "Carré", "Dents de scie", *TABLE_WAVES, *POLYBLEP_WAVES]
+SAMPLER_WAVE = "Échantillons" # Entrée du sélecteur de forme d'onde : les notes suivantes sont jouées par l'échantillonneur (synth.sampler)
+
+
+def polyblep(t, dt, out, scratch):
+    """Correction polyBLEP (Band-Limited stEP polynomiale) autour d'une discontinuité placée en t = 0, en place
+    input:  - t: Tableau de phases en cycles, dans [0, 1)
+            - dt: Incrément de phase par échantillon (freq / fs), diffusable sur t (ex: colonne (voix, 1))
+            - out: Tableau de même forme que t qui reçoit la correction
+            - scratch: Tableau de travail de même forme que t (peut être t lui-même, qui est alors écrasé)
+    output: out
+
+    La correction polynomiale d'ordre 2 vaut -(1 - t/dt)² juste après la discontinuité (t < dt)
+    et (1 - (1 - t)/dt)² juste avant (t > 1 - dt), 0 ailleurs. Les deux zones sont calculées sans masque :
+    max(1 - t/dt, 0)² et max(1 - (1 - t)/dt, 0)² sont nuls en dehors de leur zone.
+    """
+    np.divide(t, dt, out=out)
+    np.subtract(1.0, out, out=out)
+    np.maximum(out, 0.0, out=out)
+    np.multiply(out, out, out=out) # (1 - t/dt)² juste après la discontinuité
+    np.subtract(1.0, t, out=scratch)
+    np.divide(scratch, dt, out=scratch)
+    np.subtract(1.0, scratch, out=scratch)
+    np.maximum(scratch, 0.0, out=scratch)
+    np.multiply(scratch, scratch, out=scratch) # (1 - (1 - t)/dt)² juste avant la discontinuité
+    np.subtract(scratch, out, out=out)
+    return out
+
+
+def naive_to_polyblep(wave, frac, dt, s0, s1, s2):
+    """Applique en place la forme d'onde corrigée par polyBLEP à un tableau de phases
+    input:  - wave: "Carré" ou "Dents de scie"
+            - frac: Tableau de phases en cycles, dans [0, 1); remplacé par les échantillons
+            - dt: Incrément de phase par échantillon, diffusable sur frac
+            - s0, s1, s2: Tableaux de travail de même forme que frac
+    output: frac
+
+    - Dents de scie : 2t - 1, discontinuité descendante en t = 0 → on retranche la correction
+    - Carré : +1 puis -1, discontinuité montante en t = 0 (on ajoute la correction) et descendante en t = 0.5 (on la retranche)
+    """
+    polyblep(frac, dt, s0, s1)
+    if wave == "Dents de scie":
+        np.multiply(frac, 2.0, out=frac)
+        np.subtract(frac, 1.0, out=frac)
+        np.subtract(frac, s0, out=frac)
+    else:
+        np.add(frac, 0.5, out=s2)
+        np.remainder(s2, 1.0, out=s2)
+        polyblep(s2, dt, s1, s2) # Correction de la discontinuité en t = 0.5 (s2 sert aussi de tableau de travail)
+        np.multiply(frac, 2.0, out=frac)
+        np.floor(frac, out=frac)
+        np.multiply(frac, -2.0, out=frac)
+        np.add(frac, 1.0, out=frac)
+        np.add(frac, s0, out=frac)
+        np.subtract(frac, s1, out=frac)
+    return frac
+
+def pan_gains(pos, channels):
+    """Gains d'un panoramique à puissance constante sur channels canaux
+    input:  - pos: Position ou tableau de positions, de -1 (premier canal) à 1 (dernier canal), limitée à [-1, 1]
+            - channels: Nombre de canaux
+    output: Tableau (..., channels) des gains
+
+    La position tombe entre deux canaux voisins k et k + 1, qui reçoivent cos(x · π/2) et sin(x · π/2), x étant la position
+    entre les deux (la somme des carrés vaut 1). En stéréo : gauche = cos((p + 1) · π/4), droite = sin((p + 1) · π/4). En mono : 1.
+    """
+    pos = np.clip(np.asarray(pos, dtype=np.float64), -1.0, 1.0)
+    if channels == 1:
+        return np.ones(pos.shape + (1,))
+    x = (pos + 1) / 2 * (channels - 1)
+    k = np.minimum(np.floor(x), channels - 2).astype(np.int64)[..., None]
+    x = (x - k[..., 0]) * (np.pi / 2)
+    gain = np.zeros(pos.shape + (channels,))
+    np.put_along_axis(gain, k, np.cos(x)[..., None], axis=-1)
+    np.put_along_axis(gain, k + 1, np.sin(x)[..., None], axis=-1)
+    return gain
+
+
+class SignalGenerator:
+    def __init__(self, fs=44100, use_wavetables=True, interp="linear", backend="auto", period_cache=None):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz) pour la génération du signal audio (par défaut 44100 Hz)
+                - use_wavetables: Si vrai, précalcule (ou charge depuis le cache disque) les tables d'onde à bande limitée
+                - interp: Interpolation de lecture des tables d'onde ("linear" ou "cubic")
+                - backend: Backend de calcul des oscillateurs ("auto", "numpy" ou "numba", voir kernels.resolve_backend)
+                - period_cache: PeriodCache partagé par les bancs d'oscillateurs (boucles des notes tenues), None : pas de cache
+        1. Initialise la fréquence d'échantillonnage (self.fs) avec la valeur fournie
+        2. Précalcule les tables d'onde une seule fois, au démarrage
+        """
+        self.fs = fs # Fréquence d'échantillonnage standard pour l'audio (44.1 kHz)
+        self.interp = interp
+        self.backend = kernels.resolve_backend(backend) # "numpy" ou "numba" (transmis aux bancs d'oscillateurs)
+        self.period_cache = period_cache
+        self.wavetables = WavetableSet.load_or_build(fs) if use_wavetables else None # Tables d'onde par octave (None si désactivées)
+
+    def make_bank(self, max_voices=64, max_frames=4096, dtype=np.float32, channels=1, unison=1, detune=0.0, spread=0.0):
+        """Crée un OscillatorBank à la fréquence d'échantillonnage du générateur, partageant ses tables d'onde
+        Calcul en float32 par défaut : toute la chaîne (oscillateurs, enveloppes, mix, carte son) reste en float32.
+        """
+        return OscillatorBank(self.fs, max_voices=max_voices, max_frames=max_frames, dtype=dtype, wavetables=self.wavetables, interp=self.interp,
+                              channels=channels, unison=unison, detune=detune, spread=spread, backend=self.backend,
+                              cache=self.period_cache)
+
+    def get_block(self, freqs, phases, duration, wave_type):
+        """
+        iput:  - freqs: Liste des fréquences à générer (en Hz)
+                - phases: Dictionnaire associant chaque fréquence à une phase (en radians)
+                - duration: float Durée du signal à générer (en secondes)
+                - wave_type: str Type d'onde à générer ("Sinus", "Carré", "Dents de scie", ainsi que leurs variantes "(table)" et "(polyBLEP)")
+       
+        output: Tuple (t, sig) où t est un tableau de temps et sig est le signal audio correspondant, normalisé, en float32 (la conversion vers le format
+                de la carte son ou du fichier est faite une seule fois, par OutputStage)
+         
+         1. Génère un signal audio de la durée spécifiée (duration) en combinant les fréquences (freqs) et les phases (phases) selon le type d'onde (wave_type).
+            Toutes les fréquences sont calculées en une seule opération (fréquences × temps), sans boucle Python par fréquence.
+            Avec le backend numba, les formes d'onde et le mix sont calculés en un seul passage par kernels.render_bank (sans tableau fréquences × temps).
+         2. Retourne un tuple (t, sig)
+
+        Méthode sans état, pratique pour un rendu ponctuel. Pour le rendu temps réel par blocs, utiliser OscillatorBank
+        qui garde la phase de chaque voix et n'alloue pas de mémoire à chaque bloc.
+        """
+        # 1)
+        t = np.linspace(0, duration, int(round(duration * self.fs)), endpoint=False) # Génère un tableau de temps de 0 à duration avec un nombre d'échantillons égal à duration * fs
+        if not freqs: # Aucune fréquence : silence
+            return t, np.zeros(len(t), dtype=np.float32)
+        f = np.asarray(freqs, dtype=np.float64)[:, None] # Fréquences en colonne (une ligne par fréquence)
+        ph = np.array([phases[freq] for freq in freqs])[:, None] # Phase de chaque fréquence en colonne
+        code = kernels.WAVE_CODES.get(wave_type, -1) if wave_type not in TABLE_WAVES or self.wavetables is not None else -1
+        if self.backend == "numba" and code >= 0: # Boucle compilée : phase, forme d'onde et mix en un passage
+            sig = np.empty((len(t), 1))
+            table, offsets, size = np.zeros(1), np.zeros(len(freqs), dtype=np.int64), 0
+            if code == kernels.TABLE:
+                table, offsets, size = self.wavetables.flat[TABLE_WAVES[wave_type]], self.wavetables.row_offsets(f[:, 0]), self.wavetables.size
+            kernels.render_bank(sig, code, (ph[:, 0] / (2 * np.pi)) % 1.0, f[:, 0] / self.fs, np.full((len(freqs), 1), 1 / len(freqs)),
+                                np.zeros((0, 0)), 1, table, offsets, size, self.interp == "cubic", table, np.full(len(freqs), -1))
+            return t, sig[:, 0].astype(np.float32)
+        if wave_type == "Sinus": # Si le type d'onde est "Sinus", sinusoïdes
+            waves = np.sin(2 * np.pi * f * t + ph)
+        elif wave_type == "Carré": # Si le type d'onde est "Carré", ondes carrées
+            waves = np.sign(np.sin(2 * np.pi * f * t + ph))
+        elif wave_type == "Dents de scie": # Si le type d'onde est "Dents de scie", ondes en dents de scie
+            waves = 2 * ((f * t + ph / (2 * np.pi)) % 1) - 1
+        elif wave_type in TABLE_WAVES and self.wavetables is not None: # Table d'onde à bande limitée de l'octave de chaque fréquence
+            waves = f * t + ph / (2 * np.pi) # Phase en cycles
+            offsets = np.array([self.wavetables.row_offset(freq) for freq in freqs])
+            taps = np.empty((5,) + waves.shape)
+            self.wavetables.read(TABLE_WAVES[wave_type], waves, offsets, np.empty(waves.shape, dtype=np.int64), taps, self.interp)
+        elif wave_type in POLYBLEP_WAVES: # Forme d'onde naïve corrigée par polyBLEP
+            waves = (f * t + ph / (2 * np.pi)) % 1
+            naive_to_polyblep(POLYBLEP_WAVES[wave_type], waves, f / self.fs, *np.empty((3,) + waves.shape))
+        else: # Si le type d'onde n'est pas reconnu, silence
+            waves = np.zeros((len(freqs), len(t)))
+        sig = waves.sum(axis=0) / len(freqs) # Mixage et normalisation pour éviter les dépassements d'amplitude
+        # 2)
+        return t, sig.astype(np.float32)
+
+class OscillatorBank:
+    """Banc d'oscillateurs vectorisé à état, mono ou multicanal, avec unisson
+
+    Chaque voix occupe une case de tableaux numpy contigus (identifiant, amplitude, panoramique). Avec l'unisson, une voix est jouée
+    par unison copies légèrement désaccordées et réparties dans l'espace stéréo : phase, incrément de phase et table lue sont
+    des tableaux (voix, copies), vus à plat comme les (voix · copies) lignes du tableau de travail.
+    Toutes les copies de toutes les voix sont calculées en une seule opération ((voix · copies) × trames) dans un tableau de travail
+    préalloué, puis mixées sur les canaux de sortie par un seul produit matriciel avec la matrice des gains (voix · copies, canaux) :
+    aucune boucle Python par voix, par copie ni par canal. Les gains (amplitude, panoramique, normalisation de l'unisson)
+    ne sont recalculés qu'au début d'une note ou à un changement de panoramique, pas à chaque bloc.
+    La phase est avancée en interne : aucun dictionnaire de phases et aucune allocation de tableau en régime permanent.
+    Les voix actives occupent toujours les cases 0 .. n_voices-1 (suppression par échange avec la dernière case).
+    Avec le backend numba, render calcule phase, forme d'onde, enveloppe et mix en une seule boucle compilée (kernels.render_bank) :
+    chaque échantillon est calculé puis ajouté aux canaux de sortie sans passer par le tableau de travail.
+    Avec un cache de périodes (PeriodCache), les copies des notes tenues sont lues dans des boucles précalculées au lieu d'être calculées.
+    """
+
+    def __init__(self, fs=44100, max_voices=64, max_frames=4096, dtype=np.float64, wavetables=None, interp="linear",
+                 channels=1, unison=1, detune=0.0, spread=0.0, backend="auto", cache=None):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - max_voices: Nombre maximal de voix simultanées
+                - max_frames: Nombre maximal de trames par bloc rendu
+                - dtype: Type des calculs (np.float64 ou np.float32)
+                - wavetables: WavetableSet pour les formes d'onde "(table)" (None : formes d'onde calculées uniquement)
+                - interp: Interpolation de lecture des tables ("linear" ou "cubic")
+                - channels: Nombre de canaux de sortie (1 : render remplit un tableau 1-D, sinon un tableau (trames, canaux))
+                - unison: Nombre de copies de chaque voix
+                - detune: Écart (en cents) entre la copie la plus grave et la plus aiguë
+                - spread: Largeur stéréo de l'unisson (0 : toutes les copies au panoramique de la voix, 1 : de la gauche à la droite)
+                - backend: Backend de calcul ("auto", "numpy" ou "numba", voir kernels.resolve_backend)
+                - cache: PeriodCache des boucles des notes tenues (None, ou cache d'un autre type que dtype : toutes les copies
+                  sont calculées à chaque bloc)
+
+        1) Préalloue les tableaux d'état par voix : identifiant, amplitude, panoramique, et par copie : phase (en cycles, entre 0 et 1),
+           incrément de phase par trame (la phase, ramenée dans [0, 1) à chaque bloc, reste précise en float32)
+        2) Prépare la position de chaque copie dans l'unisson (de -1 à 1) : son désaccord, sa phase initiale et son décalage stéréo
+        3) Préalloue la matrice des gains, le tableau de travail ((voix · copies) × trames), la rampe 0, 1, 2, ... utilisée pour dérouler
+           la phase et l'avance de phase par bloc
+        4) Si des tables d'onde sont fournies, préalloue les index de leur lecture et le décalage de table de chaque copie
+        5) Préalloue les tableaux de travail des formes d'onde par table et polyBLEP
+        6) Prépare l'état du cache de périodes de chaque copie : incrément arrondi m / n, grille de phase, stabilité, case de sa boucle
+        7) Avec le backend numba, compile la boucle de rendu (ou la charge depuis le cache disque) par un appel sur un bloc vide :
+           le premier bloc joué ne paie pas la compilation
+        """
+        # 1)
+        self.fs = fs
+        self.max_voices = int(max_voices)
+        self.max_frames = int(max_frames)
+        self.dtype = np.dtype(dtype)
+        self.channels = int(channels)
+        self.unison = int(unison)
+        if self.channels < 1 or self.unison < 1:
+            raise ValueError("channels et unison doivent être au moins égaux à 1")
+        rows = self.max_voices * self.unison # Lignes du tableau de travail : une par copie
+        self.n_voices = 0 # Nombre de voix actives
+        self.ids = np.full(self.max_voices, -1, dtype=np.int64) # Identifiant de chaque voix (choisi par l'appelant)
+        self.amp = np.zeros(self.max_voices, dtype=dtype) # Amplitude de chaque voix
+        self.pan = np.zeros(self.max_voices) # Panoramique de chaque voix (-1 : premier canal, 1 : dernier canal)
+        self.phase = np.zeros((self.max_voices, self.unison), dtype=dtype) # Phase en cycles (1 cycle = 2π radians)
+        self.inc = np.zeros((self.max_voices, self.unison), dtype=dtype) # Incrément de phase par trame : freq / fs
+        self._phase = self.phase.reshape(rows) # Vues à plat (voix · copies), sans copie
+        self._inc = self.inc.reshape(rows)
+        # 2)
+        self._offsets = np.linspace(-1.0, 1.0, self.unison) if self.unison > 1 else np.zeros(1) # Position de chaque copie
+        self._phase0 = np.arange(self.unison) / self.unison # Phases initiales décalées : pas de pic à l'attaque
+        self._norm = 1 / np.sqrt(self.unison) # Copies désaccordées, donc décorrélées : leurs puissances s'additionnent
+        self.detune = float(detune)
+        self.spread = float(spread)
+        self._ratio = 2.0 ** (self.detune / 2 * self._offsets / 1200) # Rapport de fréquence de chaque copie
+        # 3)
+        self.gain = np.zeros((self.max_voices, self.unison, self.channels), dtype=dtype) # Gain de chaque copie sur chaque canal
+        self._gain = self.gain.reshape(rows, self.channels)
+        self._work = np.empty(rows * self.max_frames, dtype=dtype) # Tableau de travail à plat, vu en (lignes, trames) contigu
+        self._ramp = np.arange(self.max_frames, dtype=dtype) # Indices des trames d'un bloc
+        self._step = np.empty(rows, dtype=dtype) # Avance de phase de chaque copie sur un bloc
+        # 4)
+        self.wavetables = wavetables
+        self.interp = interp
+        self.table_offset = np.zeros((self.max_voices, self.unison), dtype=np.int64) # Table (octave) lue par chaque copie
+        self._table_offset = self.table_offset.reshape(rows)
+        if wavetables is not None:
+            self._idx = np.empty(rows * self.max_frames, dtype=np.int64)
+        # 5)
+        self._scratch = [np.empty(rows * self.max_frames, dtype=dtype) for _ in range(5)] # Tableaux de travail (tables d'onde, polyBLEP)
+        # 6)
+        self.cache = cache if cache is not None and cache.dtype == self.dtype else None
+        self.loop_m = np.zeros((self.max_voices, self.unison), dtype=np.int64) # Incrément de phase arrondi à m / n (n = 0 : pas de boucle)
+        self.loop_n = np.zeros((self.max_voices, self.unison), dtype=np.int64)
+        self.loop_q = np.ones((self.max_voices, self.unison), dtype=np.int64) # Pas de la grille de phase par intervalle de 1 / n
+        self.loop_inv = np.zeros((self.max_voices, self.unison), dtype=np.int64) # Inverse de m modulo n (position de grille → trame de la boucle)
+        self.changed = np.zeros((self.max_voices, self.unison), dtype=np.int64) # Numéro du bloc du dernier changement de la copie
+        self.loop_slot = np.full((self.max_voices, self.unison), -1, dtype=np.int64) # Case de la boucle dans le cache (-1 : à chercher)
+        self.loop_gen = np.zeros((self.max_voices, self.unison), dtype=np.int64) # Génération de cette case quand la boucle y a été trouvée
+        self._loop_m, self._loop_n, self._loop_q = self.loop_m.reshape(rows), self.loop_n.reshape(rows), self.loop_q.reshape(rows)
+        self._loop_inv, self._changed = self.loop_inv.reshape(rows), self.changed.reshape(rows)
+        self._loop_slot, self._loop_gen = self.loop_slot.reshape(rows), self.loop_gen.reshape(rows)
+        self._loop_wave = None # Forme d'onde des boucles trouvées
+        self._loops = None # État des copies lues d'un bloc à l'autre (voir _read_loops), None : à recalculer
+        self._clock = 0 # Nombre de blocs rendus
+        self._loop_at = np.full(rows, -1, dtype=np.int64) # Position de départ de chaque copie dans cache.flat (backend numba, -1 : calculée)
+        with_cache = self.cache is not None
+        self._sub = np.empty(rows * self.max_frames if with_cache else 0, dtype=dtype) # Copies lues ou calculées à part
+        self._gather = np.empty(rows * self.max_frames if with_cache else 0, dtype=np.int64) # Index de lecture des boucles
+        self._ramp_idx = np.arange(self.max_frames, dtype=np.int64)
+        # 7)
+        self.backend = kernels.resolve_backend(backend)
+        self._no_env = np.zeros((0, 0), dtype=dtype) # Enveloppe absente (render_bank attend toujours un tableau)
+        self._no_table = np.zeros(1, dtype=dtype)
+        if self.backend == "numba":
+            empty = np.zeros((0, self.channels), dtype=dtype)
+            kernels.render_bank(empty, kernels.SINE, self._phase[:0], self._inc[:0], self._gain[:0], self._no_env, self.unison,
+                                self._no_table, self._table_offset[:0], 0, False, self._no_table, self._loop_at[:0])
+
+    def _slot(self, voice_id):
+        """Retourne la case occupée par la voix voice_id, ou -1 si elle n'existe pas"""
+        slots = np.flatnonzero(self.ids[:self.n_voices] == voice_id)
+        return int(slots[0]) if len(slots) else -1
+
+    def _slots(self, lo, hi):
+        """Cases des voix dont l'identifiant est dans [lo, hi)"""
+        ids = self.ids[:self.n_voices]
+        return np.flatnonzero((ids >= lo) & (ids < hi))
+
+    def add_voice(self, voice_id, freq, amp=1.0, phase=0.0, pan=0.0):
+        """Ajoute une voix (ou met à jour sa fréquence, son amplitude et son panoramique si elle existe déjà)
+        input:  - voice_id: Identifiant entier de la voix
+                - freq: Fréquence (en Hz)
+                - amp: Amplitude
+                - phase: Phase initiale (en radians)
+                - pan: Panoramique (-1 : gauche, 0 : centre, 1 : droite)
+        output: Case occupée par la voix
+        """
+        i = self._slot(voice_id)
+        if i < 0:
+            if self.n_voices >= self.max_voices:
+                raise ValueError(f"OscillatorBank plein ({self.max_voices} voix)")
+            i = self.n_voices
+            self.n_voices += 1
+            self.phase[i] = (phase / (2 * np.pi) + self._phase0) % 1.0
+        self.assign(i, voice_id, freq, amp, pan)
+        return i
+
+    def assign(self, i, voice_id, freq, amp=1.0, pan=0.0):
+        """Réaffecte la case i à une voix (identifiant, fréquence, amplitude, panoramique) en gardant sa phase courante, ce qui évite un saut de signal"""
+        self.ids[i] = voice_id
+        self.inc[i] = freq / self.fs * self._ratio
+        self.amp[i] = amp
+        self.pan[i] = pan
+        self._update_gain(slice(i, i + 1))
+        if self.cache is not None:
+            self._snap(slice(i, i + 1))
+        if self.wavetables is not None:
+            self.table_offset[i] = self.wavetables.row_offsets(self.inc[i] * self.fs) # Table de l'octave de la note : pas d'harmonique au-delà de Nyquist
+
+    def _update_gain(self, slots):
+        """Recalcule les gains des copies des cases données (tableau d'indices ou tranche) : amplitude, panoramique et normalisation de l'unisson
+        Chaque copie est placée à pan de la voix + spread · sa position dans l'unisson, à puissance constante (voir pan_gains).
+        """
+        level = self.amp[slots, None] * self._norm # (voix, copies)
+        pos = self.pan[slots, None] + self.spread * self._offsets
+        self.gain[slots] = pan_gains(pos, self.channels) * level[..., None]
+
+    def retune(self, lo, hi, inc, ratio=1.0):
+        """Réaccorde en une opération les voix dont l'identifiant est dans [lo, hi) (ex: les notes d'un canal MIDI, pour le pitch bend)
+        input:  - lo, hi: Bornes des identifiants
+                - inc: Table des incréments de phase indexée par identifiant - lo (ex: Tuning.inc)
+                - ratio: Rapport de fréquence appliqué (ex: Tuning.bend_ratio[valeur])
+        output: Nombre de voix réaccordées
+        Les phases sont conservées : pas de saut de signal.
+        """
+        slots = self._slots(lo, hi)
+        self.inc[slots] = (inc[self.ids[slots] - lo] * ratio)[:, None] * self._ratio
+        if self.cache is not None:
+            self._snap(slots)
+        if self.wavetables is not None:
+            self.table_offset[slots] = self.wavetables.row_offsets(self.inc[slots] * self.fs)
+        return len(slots)
+
+    def set_pan(self, lo, hi, pan):
+        """Change en une opération le panoramique des voix dont l'identifiant est dans [lo, hi) (ex: CC 10 d'un canal MIDI)
+        output: Nombre de voix modifiées
+        """
+        slots = self._slots(lo, hi)
+        self.pan[slots] = pan
+        self._update_gain(slots)
+        return len(slots)
+
+    def set_unison(self, detune=None, spread=None):
+        """Modifie le désaccord (en cents) et la largeur stéréo de l'unisson, y compris pour les voix en cours (phases conservées)"""
+        nv = self.n_voices
+        if detune is not None:
+            self.detune = float(detune)
+            ratio = 2.0 ** (self.detune / 2 * self._offsets / 1200)
+            self.inc[:nv] *= ratio / self._ratio
+            self._ratio = ratio
+            if self.cache is not None:
+                self._snap(slice(0, nv))
+            if self.wavetables is not None:
+                self.table_offset[:nv] = self.wavetables.row_offsets(self.inc[:nv] * self.fs)
+        if spread is not None:
+            self.spread = float(spread)
+            self._update_gain(slice(0, nv))
+
+    def remove_voice(self, voice_id):
+        """Supprime une voix en déplaçant la dernière voix active dans sa case (les voix restent contiguës)
+        output: Case libérée (qui contient maintenant l'ancienne dernière voix), ou -1 si la voix n'existe pas
+        """
+        i = self._slot(voice_id)
+        if i < 0:
+            return -1
+        last = self.n_voices - 1
+        for arr in (self.ids, self.amp, self.pan, self.phase, self.inc, self.gain, self.table_offset,
+                    self.loop_m, self.loop_n, self.loop_q, self.loop_inv, self.changed, self.loop_slot, self.loop_gen):
+            arr[i] = arr[last]
+        self._loops = None
+        self.ids[last] = -1
+        self.n_voices = last
+        return i
+
+    def clear(self):
+        """Supprime toutes les voix"""
+        self.ids[:self.n_voices] = -1
+        self.n_voices = 0
+        self._loops = None
+
+    def render(self, out, wave_type, env=None):
+        """Rend toutes les voix et les mixe dans out
+        input:  - out: Tableau numpy (de type dtype) à remplir, de longueur au plus max_frames : 1-D en mono, (trames, canaux) sinon
+                - wave_type: str Type d'onde à générer ("Sinus", "Carré", "Dents de scie", ainsi que leurs variantes "(table)" et "(polyBLEP)")
+                - env: Tableau (voix × trames) d'enveloppe échantillon par échantillon, dans l'ordre des cases (None : pas d'enveloppe)
+        output: out, contenant la somme des voix pondérées par leur amplitude (et leur enveloppe), réparties sur les canaux
+
+        Avec le backend numba, les étapes 1 à 4 sont faites en un seul passage par kernels.render_bank.
+        Avec un cache de périodes, les copies stables sont d'abord lues dans leurs boucles (voir _read_loops) : les étapes 1 et 2
+        ne portent que sur les autres copies.
+
+        1) Déroule la phase de toutes les copies sur le bloc : phase + inc * n (calcul ((voix · copies) × trames) en place)
+        2) Applique la forme d'onde en place sur tout le tableau de travail
+        3) Applique l'enveloppe éventuelle (la même pour toutes les copies d'une voix, diffusée sans copie), puis mixe en un seul
+           produit matriciel directement dans out : gains · tableau de travail en mono, (tableau de travail)ᵀ · gains sur plusieurs canaux
+        4) Avance la phase de chaque copie de la longueur du bloc (exactement, sur la grille du cache, pour les copies lues dans une boucle)
+        """
+        n = len(out)
+        nv = self.n_voices
+        if nv == 0:
+            out[:] = 0
+            return out
+        rows = nv * self.unison
+        work = self._work[:rows * n].reshape(rows, n) # Vue contiguë, pas de copie
+        phase, inc = self._phase[:rows], self._inc[:rows]
+        served = self._read_loops(wave_type, work) if self.cache is not None else None
+        if self.backend == "numba":
+            self._render_kernel(out, wave_type, env, rows)
+        else:
+            # 1) et 2)
+            if served is None:
+                self._oscillate(work, phase, inc, self._table_offset[:rows], wave_type)
+            else: # Copies non lues dans une boucle seulement, calculées dans un tableau compact puis recopiées
+                live = self._loops["live"]
+                if len(live):
+                    sub = self._sub[:len(live) * n].reshape(len(live), n)
+                    self._oscillate(sub, phase[live], inc[live], self._table_offset[live], wave_type)
+                    work[live] = sub
+            # 3)
+            if env is not None:
+                copies = work.reshape(nv, self.unison, n)
+                np.multiply(copies, env[:, None, :], out=copies)
+            gain = self._gain[:rows]
+            if out.ndim == 1:
+                np.dot(gain[:, 0], work, out=out)
+            else:
+                np.dot(work.T, gain, out=out)
+            # 4)
+            step = self._step[:rows]
+            np.multiply(inc, n, out=step)
+            np.add(phase, step, out=phase)
+            np.remainder(phase, 1.0, out=phase)
+        if served is not None:
+            phase[served[0]] = served[1]
+        return out
+
+    def _oscillate(self, work, phase, inc, offsets, wave_type):
+        """Étapes 1 et 2 de render : déroule la phase des lignes données sur le bloc, puis applique la forme d'onde en place
+        input:  - work: Tableau (lignes × trames) à remplir
+                - phase, inc, offsets: Phase, incrément de phase et décalage de table de chaque ligne
+        """
+        rows, n = work.shape
+        np.multiply(self._ramp[:n], inc[:, None], out=work)
+        np.add(work, phase[:, None], out=work)
+        taps = [tab[:rows * n].reshape(rows, n) for tab in self._scratch]
+        idx = self._idx[:rows * n].reshape(rows, n) if self.wavetables is not None else None
+        self._waveform(work, inc, offsets, wave_type, taps, idx)
+
+    def _waveform(self, work, inc, offsets, wave_type, taps, idx):
+        """Applique la forme d'onde en place sur un tableau (lignes × trames) de phases en cycles
+        input:  - work: Tableau des phases; remplacé par les échantillons
+                - inc, offsets: Incrément de phase (polyBLEP) et décalage de table (formes d'onde "(table)") de chaque ligne
+                - taps, idx: Tableaux de travail de même forme que work (cinq flottants, un entier)
+        """
+        if wave_type == "Sinus":
+            np.multiply(work, 2 * np.pi, out=work)
+            np.sin(work, out=work)
+        elif wave_type == "Carré": # +1 sur la première moitié de la période, -1 sur la seconde
+            np.remainder(work, 1.0, out=work)
+            np.multiply(work, 2.0, out=work)
+            np.floor(work, out=work)
+            np.multiply(work, -2.0, out=work)
+            np.add(work, 1.0, out=work)
+        elif wave_type == "Dents de scie": # Rampe de -1 à 1 sur chaque période
+            np.remainder(work, 1.0, out=work)
+            np.multiply(work, 2.0, out=work)
+            np.subtract(work, 1.0, out=work)
+        elif wave_type in TABLE_WAVES and self.wavetables is not None: # Lecture des tables à bande limitée (pas de sin par échantillon)
+            self.wavetables.read(TABLE_WAVES[wave_type], work, offsets, idx, taps, self.interp)
+        elif wave_type in POLYBLEP_WAVES: # Forme d'onde naïve corrigée par polyBLEP autour des discontinuités
+            np.remainder(work, 1.0, out=work)
+            naive_to_polyblep(POLYBLEP_WAVES[wave_type], work, inc[:, None], *taps[:3])
+        else: # Si le type d'onde n'est pas reconnu, silence
+            work.fill(0)
+
+    def _snap(self, slots):
+        """Avec un cache de périodes, arrondit l'incrément de phase des copies des cases données (tableau d'indices ou tranche)
+        à une fraction m / n (voir PeriodCache) et note le bloc de leur changement : elles seront lues dans une boucle
+        après cache.settle blocs sans changement"""
+        cache = self.cache
+        m, period, inv = cache.snap(self.inc[slots]) # Toutes les copies des cases en une fois
+        loop = period > 0
+        safe = np.maximum(period, 1)
+        self.inc[slots] = np.where(loop, m / safe, self.inc[slots])
+        self.loop_q[slots] = np.where(loop, -(-cache.resolution // safe), self.loop_q[slots]) # Positions de la grille de phase entre deux trames de la boucle
+        self.loop_inv[slots] = np.where(loop, inv, self.loop_inv[slots])
+        self.loop_m[slots], self.loop_n[slots] = m, period
+        self.changed[slots] = self._clock
+        self.loop_slot[slots] = -1
+        self._loops = None
+
+    def _read_loops(self, wave_type, work):
+        """Lit les copies stables dans leurs boucles du cache de périodes (voir PeriodCache)
+        input:  - work: Tableau de travail (lignes × trames) du bloc, dont les lignes lues sont remplies
+        output: None si aucune copie n'est lue, sinon (lignes lues, leur phase à la fin du bloc)
+
+        L'état des copies lues (case de leur boucle, position sur la grille de phase) est gardé d'un bloc à l'autre, et n'est recalculé
+        par _find_loops qu'après un changement (note, hauteur, unisson, forme d'onde, boucle remplacée dans le cache) ou quand
+        une copie devient stable. Un bloc ne coûte sinon que quelques opérations vectorielles, quel que soit le nombre de copies :
+        1) Trame de départ de chaque copie dans sa boucle : avec g = j · q + s sa position sur la grille de phase (n · q pas par cycle),
+           la copie est à la trame j · m⁻¹ mod n de la boucle de position s (la trame k de cette boucle est à la phase k · m / n + s / (n · q))
+        2) Lit toutes les copies servies en une seule lecture indexée (case · taille de case + départ + trame), directement dans work
+           si toutes les copies sont servies (backend numba : position de départ seulement, lue par kernels.render_bank),
+           et marque leurs cases comme lues
+        3) Avance la position de chaque copie, exacte sur la grille : (g + trames · m · q) mod (n · q)
+        """
+        cache = self.cache
+        rows, n = work.shape
+        self._clock += 1
+        if n > cache.max_frames:
+            self._loop_at[:rows] = -1
+            self._loops = None
+            return None
+        loops = self._loops
+        if loops is None or loops["state"] != (rows, wave_type, cache.epoch) or self._clock >= loops["until"]:
+            loops = self._loops = self._find_loops(wave_type, work)
+        hit = loops["rows"]
+        if not len(hit):
+            return None
+        g, grid = loops["g"], loops["grid"]
+        # 1)
+        start = g // loops["q"] * loops["inv"] % loops["period"] + loops["base"] # Position dans cache.flat
+        # 2)
+        if self.backend == "numba":
+            self._loop_at[hit] = start
+        else:
+            idx = self._gather[:len(hit) * n].reshape(len(hit), n)
+            np.add(start[:, None], self._ramp_idx[:n], out=idx)
+            if len(hit) == rows:
+                np.take(cache.flat, idx, out=work)
+            else:
+                sub = self._sub[:len(hit) * n].reshape(len(hit), n)
+                np.take(cache.flat, idx, out=sub)
+                work[hit] = sub
+        cache.use(loops["slot"])
+        # 3)
+        g += n * loops["mq"]
+        g %= grid
+        return hit, g / grid
+
+    def _find_loops(self, wave_type, work):
+        """Recherche complète des copies à lire dans le cache de périodes (voir _read_loops)
+        output: État des copies lues, valable jusqu'au bloc "until" (ou jusqu'au prochain changement)
+
+        1) Copies stables : incrément arrondi à une fraction m / n, sans changement depuis plus de cache.settle blocs
+           (une nouvelle forme d'onde invalide toutes les boucles)
+        2) Position g de chaque copie stable sur la grille de phase, et position s modulo 1 / n, qui choisit sa boucle
+        3) Cherche la boucle des copies stables sans case valide (nouvelles, ou dont la case a été réutilisée), et la calcule
+           si elle est absente (au plus cache.builds par bloc : les autres copies sont calculées normalement en attendant)
+        4) Bloc de la prochaine recherche : le suivant si des copies stables attendent leur boucle, sinon celui où la prochaine
+           copie devient stable
+        """
+        cache = self.cache
+        rows = len(work)
+        self._loop_at[:rows] = -1
+        # 1)
+        if wave_type != self._loop_wave:
+            self.loop_slot[:] = -1
+            self._loop_wave = wave_type
+        age = self._clock - self._changed[:rows]
+        cacheable = self._loop_n[:rows] > 0
+        stable = np.flatnonzero(cacheable & (age > cache.settle))
+        # 2)
+        m, period, q = self._loop_m[stable], self._loop_n[stable], self._loop_q[stable]
+        grid = period * q
+        g = np.rint(self._phase[stable] * grid.astype(np.float64)).astype(np.int64) % grid
+        s = g % q
+        # 3)
+        slot = self._loop_slot[stable]
+        valid = (slot >= 0) & (cache.generation[slot] == self._loop_gen[stable]) # slot = -1 lit la dernière case, masquée par slot >= 0
+        builds = cache.builds
+        table = wave_type in TABLE_WAVES
+        for pos in np.flatnonzero(~valid).tolist():
+            r = int(stable[pos])
+            key = (wave_type, self.fs, int(m[pos]), int(period[pos]), int(self._table_offset[r]) if table else 0, self.interp, int(s[pos]))
+            found = cache.find(key)
+            if found < 0 and builds > 0:
+                found = cache.build(key, lambda dst: self._build_loop(dst, key, int(q[pos]), wave_type))
+                builds -= 1
+            if found >= 0:
+                slot[pos] = self._loop_slot[r] = found
+                self._loop_gen[r] = cache.generation[found]
+        valid = (slot >= 0) & (cache.generation[slot] == self._loop_gen[stable]) # Une boucle calculée a pu prendre la case d'une autre
+        hit = stable[valid]
+        # 4)
+        if not valid.all():
+            until = self._clock + 1
+        else:
+            waiting = age[cacheable & (age <= cache.settle)]
+            until = self._clock + cache.settle + 1 - int(waiting.max()) if len(waiting) else np.iinfo(np.int64).max
+        return {"state": (rows, wave_type, cache.epoch), "until": until, "rows": hit, "live": np.setdiff1d(np.arange(rows), hit),
+                "slot": slot[valid], "base": slot[valid] * cache.stride, "g": g[valid], "q": q[valid], "inv": self._loop_inv[hit],
+                "period": period[valid], "grid": grid[valid], "mq": (m * q)[valid]}
+
+    def _build_loop(self, dst, key, q, wave_type):
+        """Calcule la boucle d'une clé du cache dans dst : n trames aux phases k · m / n + s / (n · q), en float64 puis au type du banc"""
+        _, _, m, period, offset, _, s = key
+        k = np.arange(period, dtype=np.int64)
+        loop = ((k * m % period * q + s) / (period * q))[None, :]
+        taps = [np.empty_like(loop) for _ in range(5)]
+        self._waveform(loop, np.array([m / period]), np.array([offset], dtype=np.int64), wave_type, taps, np.empty(loop.shape, dtype=np.int64))
+        dst[:] = loop[0]
+
+    def _render_kernel(self, out, wave_type, env, rows):
+        """render par la boucle compilée kernels.render_bank (backend numba); les copies servies par le cache y sont lues dans leurs boucles"""
+        code = kernels.WAVE_CODES.get(wave_type, -1)
+        table, size = self._no_table, 0
+        if code == kernels.TABLE:
+            if self.wavetables is None:
+                code = -1 # Pas de tables : silence, comme la version numpy
+            else:
+                table = (self.wavetables.flat32 if self.dtype == np.float32 else self.wavetables.flat)[TABLE_WAVES[wave_type]]
+                size = self.wavetables.size
+        kernels.render_bank(out[:, None] if out.ndim == 1 else out, code, self._phase[:rows], self._inc[:rows], self._gain[:rows],
+                            self._no_env if env is None else env, self.unison, table, self._table_offset[:rows], size, self.interp == "cubic",
+                            self._no_table if self.cache is None else self.cache.flat, self._loop_at[:rows])
+        return out
@@ -0,0 +1,187 @@
+import importlib.util
+import math
+
+import numpy as np
+
+numba = None # Dépendance optionnelle (pip install numba), importée seulement quand le backend numba est choisi (voir available)
+_KERNELS = [] # Fonctions compilées par available, dans l'ordre de définition
+
+# Backends de calcul : "numpy" (référence, opérations vectorisées sur des tableaux entiers) ou "numba" (boucles compilées fusionnées)
+BACKENDS = ("numpy", "numba")
+
+# Forme d'onde → code entier lu par render_bank (les formes d'onde "(table)" utilisent TABLE)
+SINE, SQUARE, SAW, TABLE, SQUARE_BLEP, SAW_BLEP = range(6)
+WAVE_CODES = {
+    "Sinus": SINE,
+    "Carré": SQUARE,
+    "Dents de scie": SAW,
+    "Carré (table)": TABLE,
+    "Dents de scie (table)": TABLE,
+    "Carré (polyBLEP)": SQUARE_BLEP,
+    "Dents de scie (polyBLEP)": SAW_BLEP,
+}
+
+
+def available():
+    """Vrai si Numba est installé et utilisable
+    Au premier appel qui le trouve (sans l'importer : importlib.util.find_spec), importe Numba et remplace chaque boucle du module
+    par sa version compilée. L'import de Numba (plusieurs centaines de ms) n'est donc payé que par le backend numba :
+    un script qui n'utilise que numpy importe le module en quelques millisecondes.
+    """
+    global numba
+    if numba is None and importlib.util.find_spec("numba") is not None:
+        try:
+            import numba as module
+        except ImportError: # Installé mais inutilisable (ex: version de numpy non prise en charge)
+            return False
+        for func in _KERNELS: # Les boucles appelées par une autre (_polyblep) sont remplacées avant la compilation de celle-ci
+            globals()[func.__name__] = module.njit(cache=True, nogil=True)(func)
+        numba = module
+    return numba is not None
+
+
+def resolve_backend(backend="auto"):
+    """Backend de calcul à utiliser (importe et prépare Numba s'il est choisi, voir available)
+    input:  - backend: "auto" (ou None) : "numba" si Numba est installé, "numpy" sinon; ou "numpy", "numba"
+    output: "numpy" ou "numba"
+    """
+    if backend in (None, "auto"):
+        return "numba" if available() else "numpy"
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend!r} (attendu : auto, {', '.join(BACKENDS)})")
+    if backend == "numba" and not available():
+        raise RuntimeError("le backend numba nécessite Numba (pip install numba)")
+    return backend
+
+
+def _jit(func):
+    """Enregistre func pour la compilation par Numba (faite par available, au premier choix du backend numba) :
+    compilation enregistrée sur le disque (cache=True, le démarrage suivant ne recompile pas) et exécution sans le GIL
+    (nogil=True, les autres threads Python continuent pendant le rendu). Jusque-là, func reste une fonction Python
+    (jamais appelée par le backend numpy). Les appelants passent par le module (kernels.render_bank) : ils voient la version compilée."""
+    _KERNELS.append(func)
+    return func
+
+
+@_jit
+def _polyblep(t, dt):
+    """Correction polyBLEP d'une discontinuité en t = 0, pour un échantillon (voir generator.polyblep)"""
+    after = max(1.0 - t / dt, 0.0)
+    before = max(1.0 - (1.0 - t) / dt, 0.0)
+    return before * before - after * after
+
+
+@_jit
+def render_bank(out, wave, phase, inc, gain, env, unison, table, offsets, size, cubic, loops, loop_at):
+    """Rend et mixe toutes les copies d'un OscillatorBank en un seul passage sur out (même calcul que OscillatorBank.render)
+    input:  - out: Tableau (trames, canaux) à remplir (vue (trames, 1) en mono)
+            - wave: Code de forme d'onde (WAVE_CODES)
+            - phase, inc: Phase (en cycles) et incrément de phase de chaque copie (lignes); phase est avancée de la longueur du bloc
+            - gain: Tableau (lignes, canaux) des gains
+            - env: Tableau (voix, trames) d'enveloppe, ou tableau vide (0, 0) : pas d'enveloppe
+            - unison: Nombre de copies par voix (la copie r appartient à la voix r // unison)
+            - table, offsets, size, cubic: Vue à plat des tables d'onde, décalage de la table de chaque copie, taille d'une période,
+              interpolation cubique (formes d'onde "(table)" seulement; sinon tableaux quelconques du bon type)
+            - loops, loop_at: Vue à plat des boucles du cache de périodes, et position de départ de chaque copie dans loops
+              (-1 : copie calculée); une copie lue dans une boucle n'est pas avancée (sa phase est tenue par l'appelant)
+
+    Pour chaque copie puis chaque trame : phase, forme d'onde, enveloppe et ajout pondéré sur chaque canal, sans tableau intermédiaire
+    (le tableau de travail (lignes × trames) de la version numpy n'existe pas ici).
+    """
+    n, channels = out.shape
+    has_env = env.shape[0] > 0
+    out[:, :] = 0.0
+    for r in range(phase.shape[0]):
+        v = r // unison
+        at = loop_at[r]
+        if at >= 0: # Copie lue dans une boucle : pas de calcul de phase ni de forme d'onde
+            for j in range(n):
+                y = np.float64(loops[at + j])
+                if has_env:
+                    y *= env[v, j]
+                for c in range(channels):
+                    out[j, c] += y * gain[r, c]
+            continue
+        p0 = np.float64(phase[r])
+        dt = np.float64(inc[r])
+        for j in range(n):
+            t = p0 + dt * j
+            t -= math.floor(t)
+            if wave == SINE:
+                y = math.sin(2.0 * math.pi * t)
+            elif wave == SQUARE:
+                y = 1.0 if t < 0.5 else -1.0
+            elif wave == SAW:
+                y = 2.0 * t - 1.0
+            elif wave == TABLE:
+                pos = t * size
+                i = int(pos)
+                x = pos - i
+                if i >= size: # t arrondi à 1.0 : début de la période suivante
+                    i -= size
+                k = offsets[r] + i
+                p1 = np.float64(table[k])
+                p2 = np.float64(table[k + 1])
+                if cubic: # Catmull-Rom (voir WavetableSet.read)
+                    p0_ = np.float64(table[k - 1])
+                    p3 = np.float64(table[k + 2])
+                    a = 3.0 * (p1 - p2) + p3 - p0_
+                    b = p0_ - 2.0 * p1 + p2 - a
+                    c = p2 - p0_
+                    y = p1 + 0.5 * x * (c + x * (b + x * a))
+                else:
+                    y = p1 + (p2 - p1) * x
+            elif wave == SAW_BLEP:
+                y = 2.0 * t - 1.0 - _polyblep(t, dt)
+            elif wave == SQUARE_BLEP:
+                half = t + 0.5
+                half -= math.floor(half)
+                y = (1.0 if t < 0.5 else -1.0) + _polyblep(t, dt) - _polyblep(half, dt)
+            else:
+                y = 0.0
+            if has_env:
+                y *= env[v, j]
+            for c in range(channels):
+                out[j, c] += y * gain[r, c]
+        p = p0 + dt * n
+        phase[r] = p - math.floor(p)
+
+
+@_jit
+def adsr(env, t0, start_level, rel_at, rel_level, n_attack, n_decay, sustain, n_release):
+    """Enveloppe ADSR de toutes les voix sur un bloc, en un seul passage (même calcul que VoiceAllocator.render)
+    input:  - env: Tableau (voix, trames) à remplir
+            - t0: Échantillons écoulés depuis l'appui au début du bloc, par voix
+            - start_level, rel_at, rel_level: Niveau à l'appui, t au relâchement (inf : note tenue), niveau au relâchement, par voix
+            - n_attack, n_decay, sustain, n_release: Paramètres de l'enveloppe (durées en échantillons)
+    """
+    nv, n = env.shape
+    for v in range(nv):
+        start = start_level[v]
+        for j in range(n):
+            t = t0[v] + j
+            since = t - rel_at[v]
+            if since >= 0.0:
+                e = rel_level[v] * (1.0 - min(max(since / n_release, 0.0), 1.0))
+            else:
+                e = start + (1.0 - start) * min(max(t / n_attack, 0.0), 1.0) - (1.0 - sustain) * min(max((t - n_attack) / n_decay, 0.0), 1.0)
+            env[v, j] = e
+
+
+@_jit
+def convert(mix, out, soft_clip, scale, quantize):
+    """Limitation et conversion d'un bloc en un seul passage (même calcul que OutputStage.process sans dither)
+    input:  - mix, out: Tableaux à plat de même longueur (bloc de mix flottant, bloc au format de sortie)
+            - soft_clip: Limitation douce (True) ou écrêtage à [-1, 1] (False)
+            - scale, quantize: Pleine échelle et quantification (arrondi et bornes de l'int16) du format de sortie
+    """
+    for i in range(mix.shape[0]):
+        x = np.float64(mix[i])
+        if soft_clip:
+            x = min(max(x, -1.5), 1.5)
+            x -= x * x * x / 6.75
+        else:
+            x = min(max(x, -1.0), 1.0)
+        if quantize:
+            x = min(max(np.rint(x * scale), -32768.0), 32767.0)
+        out[i] = x
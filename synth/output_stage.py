@@ -0,0 +1,104 @@
+import numpy as np
+
+from . import kernels
+
+# Format de sortie → (type numpy, valeur pleine échelle)
+OUTPUT_FORMATS = {
+    "float32": (np.float32, 1.0),
+    "int16": (np.int16, 32767.0),
+}
+
+
+class OutputStage:
+    """Étage de sortie unique de la chaîne audio : limitation, dither et conversion, une seule fois par bloc
+
+    Toute la chaîne (oscillateurs, enveloppes, mix) est en float32 ; c'est ici, et seulement ici, que le signal est :
+        - limité : limitation douce (par défaut) ou écrêtage à [-1, 1]. Un mix qui dépasse la pleine échelle sature
+          au lieu de "boucler" (repliement d'entier d'une conversion int16 sans limitation)
+        - bruité d'un dither TPDF optionnel (somme de deux bruits uniformes, ±1 pas de quantification) avant une quantification
+        - converti au format de sortie (float32 pour la carte son, int16 ou float32 pour un fichier)
+    Les calculs sont faits en place dans des buffers préalloués : process() n'alloue rien.
+
+    Limitation douce (polynôme cubique, sans table ni tanh) : x est limité à [-1.5, 1.5] puis y = x - x³ / 6.75.
+    La pente vaut 1 en 0 (pas de changement de niveau des signaux faibles) et 0 en ±1.5, où y atteint ±1.
+    Avec le backend numba et sans dither, limitation et conversion sont faites en un seul passage par kernels.convert.
+    """
+
+    def __init__(self, max_frames, channels=1, fmt="float32", soft_clip=True, dither=False, dither_bits=16, seed=None, backend="auto"):
+        """
+        input:  - max_frames: Nombre maximal de trames par bloc
+                - channels: Nombre de canaux
+                - fmt: Format de sortie ("float32" ou "int16")
+                - soft_clip: Limitation douce (True) ou écrêtage (False)
+                - dither: Ajoute un dither TPDF avant la quantification
+                - dither_bits: Résolution visée par le dither pour une sortie float32 (la carte son quantifie elle-même);
+                  en int16 le dither est toujours d'un pas de 16 bits
+                - seed: Graine du générateur de bruit (dither reproductible)
+                - backend: Backend de calcul ("auto", "numpy" ou "numba"); le dither est toujours calculé par numpy
+
+        1) Vérifie le format et prépare le type et la pleine échelle de sortie
+        2) Préalloue le buffer de sortie et les buffers de travail (réutilisés à chaque bloc)
+        3) Avec le backend numba, compile kernels.convert (ou la charge depuis le cache disque) par un appel sur un bloc vide
+        """
+        # 1)
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Format inconnu : {fmt!r} (attendu : {', '.join(OUTPUT_FORMATS)})")
+        self.fmt = fmt
+        self.dtype, self.scale = OUTPUT_FORMATS[fmt]
+        self.soft_clip = soft_clip
+        self.dither = dither
+        self.lsb = 1.0 / self.scale if fmt == "int16" else 2.0 ** (1 - dither_bits) # Pas de quantification (pleine échelle = 1)
+        self.rng = np.random.default_rng(seed)
+        # 2)
+        shape = (int(max_frames), int(channels)) if channels > 1 else (int(max_frames),)
+        self.out = np.zeros(shape, dtype=self.dtype) # Bloc au format de sortie
+        self._work = np.zeros(shape, dtype=np.float32)
+        self._noise = np.zeros(shape, dtype=np.float32)
+        # 3)
+        self.backend = kernels.resolve_backend(backend)
+        if self.backend == "numba" and not dither:
+            kernels.convert(self._work.reshape(-1)[:0], self.out.reshape(-1)[:0], soft_clip, self.scale, fmt == "int16")
+
+    def process(self, mix):
+        """Convertit un bloc de mix float vers le format de sortie
+        input:  - mix: Tableau flottant de forme (n,) ou (n, channels), n ≤ max_frames (non modifié)
+        output: Vue sur les n premières trames du buffer de sortie (réutilisé au bloc suivant)
+
+        1) Limitation douce ou écrêtage dans le buffer de travail
+        2) Dither TPDF éventuel : (u1 - u2) · pas de quantification, u1 et u2 uniformes dans [0, 1)
+        3) Mise à l'échelle, arrondi et conversion (int16), ou simple copie (float32)
+        """
+        n = len(mix)
+        work = self._work[:n]
+        out = self.out[:n]
+        if self.backend == "numba" and not self.dither: # Étapes 1 et 3 en un seul passage
+            kernels.convert(mix.reshape(-1), out.reshape(-1), self.soft_clip, self.scale, self.fmt == "int16")
+            return out
+        # 1)
+        if self.soft_clip:
+            np.clip(mix, -1.5, 1.5, out=work)
+            noise = self._noise[:n]
+            np.multiply(work, work, out=noise)
+            np.multiply(noise, work, out=noise)
+            np.multiply(noise, 1 / 6.75, out=noise)
+            np.subtract(work, noise, out=work)
+        else:
+            np.clip(mix, -1.0, 1.0, out=work)
+        # 2)
+        if self.dither:
+            noise = self._noise[:n]
+            self.rng.random(out=noise, dtype=np.float32)
+            np.multiply(noise, self.lsb, out=noise)
+            np.add(work, noise, out=work)
+            self.rng.random(out=noise, dtype=np.float32)
+            np.multiply(noise, self.lsb, out=noise)
+            np.subtract(work, noise, out=work)
+        # 3)
+        if self.fmt == "int16":
+            np.multiply(work, self.scale, out=work)
+            np.rint(work, out=work)
+            np.clip(work, -32768, 32767, out=work) # Le dither peut dépasser la pleine échelle d'un pas
+            np.copyto(out, work, casting="unsafe")
+        else:
+            np.copyto(out, work)
+        return out
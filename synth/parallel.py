@@ -0,0 +1,340 @@
+import time
+
+import numpy as np
+
+from .generator import SignalGenerator
+from .voices import VoiceAllocator
+
+
+def _play(voices, out, wave_type, events):
+    """Applique les événements reçus pour un bloc et rend le bloc dans out
+    input:  - voices: VoiceAllocator
+            - events: Liste (méthode, arguments) : un événement ("split", (k,)) (voir ParallelVoices.split) rend d'abord les trames
+              jusqu'à k, les événements suivants s'appliquent donc à partir de la trame k
+    output: note_id terminées pendant le bloc (relâchement fini ou voix volée)
+    """
+    playing = set(voices.bank.ids[:voices.n_voices].tolist())
+    start = 0
+    for method, args in events:
+        if method == "split":
+            if args[0] > start:
+                voices.render(out[start:args[0]], wave_type)
+                start = args[0]
+            continue
+        getattr(voices, method)(*args)
+        if method == "note_on":
+            playing.add(args[0])
+    voices.render(out[start:], wave_type)
+    playing.difference_update(voices.bank.ids[:voices.n_voices].tolist())
+    return tuple(playing)
+
+
+def _worker_main(conn, shm_name, index, n_workers, max_frames, fs, interp, backend, cache_settings, max_voices, bank_kwargs, alloc_kwargs):
+    """Boucle d'un processus de rendu
+    input:  - conn: Extrémité de Pipe vers le processus principal (messages de contrôle uniquement, jamais d'échantillons)
+            - shm_name: Nom du segment partagé contenant les cases de mix (n_workers × max_frames × canaux, float32)
+            - index: Case de mix de ce worker
+            - fs, interp, backend: Paramètres du SignalGenerator (tables d'onde et boucles compilées lues depuis le cache disque)
+            - cache_settings: Paramètres du cache de périodes propre à ce worker (voir PeriodCache.settings), None : pas de cache
+            - max_voices: Taille du pool de voix de ce worker
+            - bank_kwargs: Paramètres de l'OscillatorBank (canaux, unisson)
+            - alloc_kwargs: Paramètres du VoiceAllocator (enveloppe, politique de vol, gain)
+
+    1) Ouvre la mémoire partagée, prépare son propre générateur et son pool de voix, puis signale qu'il est prêt
+    2) Pour chaque message "render" : applique les événements de notes reçus et rend ses voix dans sa case, en découpant le bloc
+       aux trames des événements (voir _play), puis répond (nombre de voix actives, nombre de voix volées, notes terminées)
+    3) S'arrête sur le message "stop" (ou si le processus principal a disparu)
+    """
+    # 1)
+    from multiprocessing import shared_memory
+    from .period_cache import PeriodCache
+    shm = shared_memory.SharedMemory(name=shm_name) # Le resource_tracker est celui du processus principal (hérité par "spawn")
+    channels = bank_kwargs["channels"]
+    slots = np.ndarray((n_workers, max_frames) + ((channels,) if channels > 1 else ()), dtype=np.float32, buffer=shm.buf)
+    gen = SignalGenerator(fs, interp=interp, backend=backend, period_cache=PeriodCache(**cache_settings) if cache_settings else None)
+    voices = VoiceAllocator(gen.make_bank(max_voices=max_voices, max_frames=max_frames, **bank_kwargs), **alloc_kwargs)
+    conn.send("ready")
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            # 2)
+            if msg[0] == "render":
+                _, n, wave_type, events = msg
+                finished = _play(voices, slots[index, :n], wave_type, events)
+                conn.send((voices.n_voices, voices.stolen, finished))
+            # 3)
+            elif msg[0] == "stop":
+                break
+    finally:
+        del slots
+        shm.close()
+
+
+class ParallelVoices:
+    """Pool de voix réparti sur plusieurs processus, même interface que VoiceAllocator
+
+    Chaque worker possède une part du pool (son propre OscillatorBank et VoiceAllocator) et rend ses voix dans sa case
+    d'un buffer de mix en mémoire partagée (multiprocessing.shared_memory) : aucun échantillon n'est sérialisé.
+    Le processus principal n'envoie que de petits messages (événements de notes et ordre de rendu, regroupés en un message
+    par worker et par bloc), attend les réponses, puis additionne les cases dans le buffer de sortie.
+
+    Une note est envoyée au worker qui la joue déjà (relance), sinon au worker le moins chargé : voix actives à sa dernière réponse
+    plus notes envoyées depuis. Chaque réponse donne les notes terminées, oubliées par la répartition.
+    Les événements sont appliqués au début du bloc suivant, comme dans VoiceAllocator. Pour placer les événements à leur trame
+    sans un aller-retour par tranche, l'appelant marque les trames de découpe par split(k) entre les événements, puis rend
+    le bloc entier en un seul appel de render : chaque worker découpe lui-même son bloc (voir _play).
+
+    Le thread de rendu n'attend jamais un worker plus d'un bloc : un worker en retard est sauté (ses voix sont muettes pendant ce bloc,
+    compté dans late) et ses événements partent avec l'ordre suivant. Un worker arrêté (plantage, processus tué), ou en retard
+    depuis plus de grace secondes, fait basculer tout le pool sur un VoiceAllocator local (voir _fallback) : le son continue.
+    """
+
+    def __init__(self, gen, max_voices=32, max_frames=4096, workers=2, channels=1, unison=1, detune=0.0, spread=0.0, timeout=None, grace=1.0,
+                 **alloc_kwargs):
+        """
+        input:  - gen: SignalGenerator (seuls fs, interp, backend et les paramètres de son cache de périodes sont transmis :
+                  chaque worker construit le sien, avec un cache vide dont la mémoire est une part égale de celle de gen.period_cache)
+                - max_voices: Polyphonie totale, répartie entre les workers
+                - max_frames: Nombre maximal de trames par bloc
+                - workers: Nombre de processus de rendu
+                - channels, unison, detune, spread: Canaux de sortie et unisson de chaque voix, voir OscillatorBank
+                - timeout: Attente maximale des réponses des workers à chaque bloc (en secondes; None : durée d'un bloc de max_frames trames)
+                - grace: Retard (en secondes) au-delà duquel un worker est considéré comme bloqué et le pool bascule en rendu local
+                - alloc_kwargs: Paramètres transmis à chaque VoiceAllocator (attack, decay, sustain, release, steal, gain)
+
+        1) Crée le buffer de mix partagé (une case de max_frames trames sur tous les canaux par worker)
+        2) Démarre les workers (méthode "spawn" : pas de copie de l'état du processus principal, ni de ses threads)
+           et attend qu'ils soient prêts : un worker qui échoue au démarrage lève une exception ici (et non pendant le rendu)
+        3) Initialise la répartition des notes, les compteurs et de quoi construire le pool local de repli
+        """
+        # 1)
+        import multiprocessing as mp # Importés ici : le rendu sans workers (cas par défaut) ne charge pas multiprocessing
+        from multiprocessing import shared_memory
+        self.workers = int(workers)
+        self.max_frames = int(max_frames)
+        self.dtype = np.dtype(np.float32)
+        self.channels = int(channels)
+        shape = (self.workers, self.max_frames) + ((self.channels,) if self.channels > 1 else ())
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * self.dtype.itemsize)
+        self._slots = np.ndarray(shape, dtype=self.dtype, buffer=self._shm.buf)
+        self._slots.fill(0)
+        # 2)
+        ctx = mp.get_context("spawn")
+        per_worker = -(-int(max_voices) // self.workers)
+        bank_kwargs = {"channels": self.channels, "unison": unison, "detune": detune, "spread": spread}
+        cache_settings = gen.period_cache.settings() if gen.period_cache is not None else None
+        if cache_settings:
+            cache_settings["max_bytes"] //= self.workers
+        self._conns, self._procs = [], []
+        try:
+            for i in range(self.workers):
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(target=_worker_main, name=f"VoiceWorker-{i}", daemon=True,
+                                   args=(child, self._shm.name, i, self.workers, self.max_frames, gen.fs, gen.interp, gen.backend, cache_settings, per_worker, bank_kwargs,
+                                         alloc_kwargs))
+                proc.start()
+                child.close()
+                self._conns.append(parent)
+                self._procs.append(proc)
+            for conn in self._conns:
+                if not conn.poll(30.0): # Chargement des tables d'onde et import de numpy dans chaque worker
+                    raise TimeoutError("un worker de rendu ne répond pas")
+                try:
+                    conn.recv()
+                except EOFError:
+                    raise RuntimeError("un worker de rendu s'est arrêté au démarrage") from None
+        except BaseException:
+            self.close()
+            raise
+        # 3)
+        self.max_voices = per_worker * self.workers
+        self._pending = [[] for _ in range(self.workers)] # Événements à envoyer avec le prochain ordre de rendu
+        self._owner = {} # note_id → worker qui joue la note (jusqu'à ce qu'il la signale terminée)
+        self._counts = [0] * self.workers # Voix actives de chaque worker à sa dernière réponse
+        self._queued = [set() for _ in range(self.workers)] # note_id démarrées sur chaque worker depuis son dernier ordre de rendu
+        self._stolen = [0] * self.workers
+        self._late_since = [None] * self.workers # Instant où le worker a manqué sa première échéance (None : à l'heure)
+        self.fs = gen.fs
+        self.timeout = timeout
+        self.grace = float(grace)
+        self.late = 0 # Blocs dont la part d'un worker a manqué (voix de ce worker muettes pendant le bloc)
+        self.error = None # Cause du passage en rendu local, None tant que les workers répondent
+        self._local = None # VoiceAllocator de repli, créé par _fallback
+        self._local_events = [] # Événements en attente du pool local (appliqués par render, comme ceux des workers)
+        self._local_args = (gen, self.max_voices, bank_kwargs, alloc_kwargs)
+
+    @property
+    def n_voices(self):
+        """Nombre de voix en cours (tenues ou en relâchement), d'après la dernière réponse des workers"""
+        if self._local is not None:
+            return self._local.n_voices
+        return sum(self._counts)
+
+    @property
+    def stolen(self):
+        return sum(self._stolen) + (self._local.stolen if self._local is not None else 0)
+
+    def note_on(self, note_id, freq, velocity=1.0, pan=0.0):
+        """Démarre une note sur le worker qui la joue déjà, sinon sur le moins chargé"""
+        if self._local is not None:
+            self._local_events.append(("note_on", (note_id, freq, velocity, pan)))
+            return
+        w = self._owner.get(note_id)
+        if w is None:
+            w = min(range(self.workers), key=lambda k: self._counts[k] + len(self._queued[k]))
+            self._owner[note_id] = w
+        self._queued[w].add(note_id)
+        self._pending[w].append(("note_on", (note_id, freq, velocity, pan)))
+
+    def note_off(self, note_id):
+        if self._local is not None:
+            self._local_events.append(("note_off", (note_id,)))
+            return
+        w = self._owner.get(note_id)
+        if w is not None:
+            self._pending[w].append(("note_off", (note_id,)))
+
+    def _broadcast(self, method, *args):
+        if self._local is not None:
+            self._local_events.append((method, args))
+            return
+        for pending in self._pending:
+            pending.append((method, args))
+
+    def split(self, frame):
+        """Marque une découpe du prochain bloc : les événements suivants s'appliquent à partir de la trame frame de ce bloc"""
+        self._broadcast("split", frame)
+
+    def all_notes_off(self, lo=0, hi=None):
+        self._broadcast("all_notes_off", lo, hi)
+
+    def set_adsr(self, attack, decay, sustain, release):
+        self._broadcast("set_adsr", attack, decay, sustain, release)
+
+    def retune(self, lo, hi, inc, ratio=1.0):
+        self._broadcast("retune", lo, hi, inc, ratio)
+
+    def set_pan(self, lo, hi, pan):
+        self._broadcast("set_pan", lo, hi, pan)
+
+    def set_unison(self, detune=None, spread=None):
+        self._broadcast("set_unison", detune, spread)
+
+    def clear(self):
+        self._broadcast("clear")
+        self._owner.clear()
+        for queued in self._queued:
+            queued.clear()
+
+    def _reply(self, w, reply):
+        """Enregistre la réponse du worker w : voix actives, voix volées, et oublie les notes qu'il a terminées
+        (sauf celles redémarrées depuis son ordre de rendu : la relance est encore en attente chez ce worker)"""
+        self._counts[w], self._stolen[w], finished = reply
+        for note_id in finished:
+            if self._owner.get(note_id) == w and note_id not in self._queued[w]:
+                del self._owner[note_id]
+
+    def render(self, out, wave_type):
+        """Rend toutes les voix dans out (en découpant aux trames marquées par split depuis le rendu précédent)
+        1) Un worker encore en retard sur un bloc précédent ne reçoit pas de nouvel ordre tant que sa réponse n'est pas arrivée
+           (elle est lue et ignorée : sa case contient un bloc déjà passé). Les autres reçoivent leurs événements en attente
+           et l'ordre de rendre len(out) trames
+        2) Attend les réponses (voix actives, voix volées, notes terminées) jusqu'à l'échéance (timeout, par défaut la durée
+           d'un bloc de max_frames trames, quelle que soit la longueur de out); un worker qui la manque est sauté pour ce bloc
+        3) Additionne dans out les cases des workers qui ont répondu
+        4) Un worker arrêté (EOFError, BrokenPipeError, processus mort) ou en retard depuis plus de grace secondes fait passer
+           le pool en rendu local (_fallback) : ce bloc et les suivants sont rendus dans ce processus
+        """
+        if self._local is not None:
+            events, self._local_events = self._local_events, []
+            _play(self._local, out, wave_type, events)
+            return out
+        n = len(out)
+        now = time.perf_counter()
+        deadline = now + (self.timeout if self.timeout is not None else self.max_frames / self.fs)
+        try:
+            # 1)
+            sent = []
+            for w, conn in enumerate(self._conns):
+                if self._late_since[w] is not None:
+                    if not conn.poll():
+                        if not self._procs[w].is_alive():
+                            raise EOFError(f"le worker de rendu {w} s'est arrêté")
+                        if now - self._late_since[w] > self.grace:
+                            raise TimeoutError(f"le worker de rendu {w} ne répond plus depuis {now - self._late_since[w]:.1f} s")
+                        continue
+                    self._reply(w, conn.recv())
+                    self._late_since[w] = None
+                conn.send(("render", n, wave_type, self._pending[w]))
+                self._pending[w] = []
+                self._queued[w].clear()
+                sent.append(w)
+            # 2)
+            out[:] = 0
+            for w in sent:
+                conn = self._conns[w]
+                if not conn.poll(max(deadline - time.perf_counter(), 0.0)):
+                    if not self._procs[w].is_alive():
+                        raise EOFError(f"le worker de rendu {w} s'est arrêté")
+                    self._late_since[w] = now
+                    self.late += 1
+                    continue
+                self._reply(w, conn.recv())
+                # 3)
+                np.add(out, self._slots[w, :n], out=out)
+        # 4)
+        except (EOFError, BrokenPipeError, ConnectionResetError, TimeoutError) as e:
+            self._fallback(e)
+            return self.render(out, wave_type)
+        return out
+
+    def _fallback(self, error):
+        """Arrête les workers et continue le rendu dans ce processus
+        Les notes en cours sur les workers sont perdues (le pool local démarre vide); les notes suivantes sont jouées normalement.
+        """
+        print(f"Erreur du rendu multiprocessus, rendu dans le processus courant : {error}")
+        self.error = str(error)
+        for proc in self._procs:
+            proc.kill() # SIGKILL : un worker bloqué (ou suspendu) n'est pas attendu
+        self.close(timeout=0.1)
+        gen, max_voices, bank_kwargs, alloc_kwargs = self._local_args
+        self._local = VoiceAllocator(gen.make_bank(max_voices=max_voices, max_frames=self.max_frames, **bank_kwargs), **alloc_kwargs)
+
+    def close(self, timeout=1.0):
+        """Arrête les workers (terminés s'ils ne s'arrêtent pas en timeout secondes) et libère la mémoire partagée"""
+        for conn in self._conns:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._procs = [], []
+        if self._shm is not None:
+            del self._slots
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def make_voices(gen, max_voices=32, max_frames=4096, workers=0, channels=1, unison=1, detune=0.0, spread=0.0, timeout=None, **alloc_kwargs):
+    """Crée le pool de voix : réparti sur workers processus si workers > 1, sinon (ou si le démarrage échoue) un VoiceAllocator local
+    Le mode local est déterministe et sert de repli : mêmes paramètres, même interface.
+    channels, unison, detune et spread sont ceux de l'OscillatorBank de chaque pool; timeout est l'attente maximale des workers
+    à chaque bloc (None : durée d'un bloc de max_frames trames, pour le temps réel), voir ParallelVoices.
+    """
+    bank_kwargs = {"channels": channels, "unison": unison, "detune": detune, "spread": spread}
+    if workers > 1:
+        try:
+            return ParallelVoices(gen, max_voices=max_voices, max_frames=max_frames, workers=workers, timeout=timeout, **bank_kwargs,
+                                  **alloc_kwargs)
+        except Exception as e:
+            print(f"Erreur lors du démarrage du rendu multiprocessus, rendu dans le processus courant : {e}")
+    return VoiceAllocator(gen.make_bank(max_voices=max_voices, max_frames=max_frames, **bank_kwargs), **alloc_kwargs)
@@ -0,0 +1,181 @@
+import numpy as np
+
+
+def best_ratios(x, max_den, max_cents):
+    """Plus petite fraction m / n égale à chaque x à max_cents près, parmi les réduites du développement de x en fraction continue
+    input:  - x: Tableau de nombres positifs (ex: incréments de phase freq / fs)
+            - max_den: Dénominateur maximal
+            - max_cents: Écart maximal accepté (en cents)
+    output: (m, n, inv) tableaux d'entiers de la forme de x : m / n premiers entre eux et inv l'inverse de m modulo n,
+            ou (0, 0, 0) là où aucune réduite de dénominateur ≤ max_den n'est assez proche
+
+    Les réduites sont les meilleures approximations de x pour leur dénominateur : la première qui convient est la plus courte.
+    Toutes les valeurs avancent ensemble d'une réduite par itération (quelques itérations : les dénominateurs croissent au moins
+    comme la suite de Fibonacci), et celles qui ont trouvé leur fraction sont retirées des tableaux de travail.
+    Deux réduites consécutives h0 / k0 et h1 / k1 vérifient h1 · k0 - h0 · k1 = ±1 : l'inverse de m modulo n est ±k0.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    flat = x.ravel()
+    m, n, inv = (np.zeros(flat.size, dtype=np.int64) for _ in range(3))
+    lo, hi = 2 ** (-max_cents / 1200), 2 ** (max_cents / 1200) # Écart de max_cents en rapport de fréquences
+    idx = np.arange(flat.size) # Valeurs encore en cours
+    xs = y = flat
+    h0, h1 = np.zeros(flat.size, dtype=np.int64), np.ones(flat.size, dtype=np.int64) # Numérateurs des deux réduites précédentes
+    k0, k1 = np.ones(flat.size, dtype=np.int64), np.zeros(flat.size, dtype=np.int64) # Dénominateurs des deux réduites précédentes
+    while idx.size:
+        a = np.floor(y)
+        ai = a.astype(np.int64)
+        h0, h1 = h1, ai * h1 + h0
+        k0, k1 = k1, ai * k1 + k0
+        frac = y - a
+        target = k1 * xs
+        fits = k1 <= max_den
+        close = fits & (h1 > 0) & (h1 >= target * lo) & (h1 <= target * hi)
+        stop = close | ~fits | (frac < 1e-12) # Trouvée, dénominateur trop grand, ou x (presque) exactement h1 / k1
+        if stop.any():
+            done = stop & fits & (h1 > 0)
+            sel = idx[done]
+            m[sel], n[sel] = h1[done], k1[done]
+            inv[sel] = (h1[done] * k0[done] - h0[done] * k1[done]) * k0[done] % k1[done]
+            keep = ~stop
+            idx, xs, frac, h0, h1, k0, k1 = idx[keep], xs[keep], frac[keep], h0[keep], h1[keep], k0[keep], k1[keep]
+        y = 1 / frac
+    return m.reshape(x.shape), n.reshape(x.shape), inv.reshape(x.shape)
+
+
+class PeriodCache:
+    """Cache LRU de périodes de formes d'onde, pour les notes tenues sans modulation
+
+    Une note tenue dont la fréquence ne change pas est strictement périodique. Avec un cache, l'OscillatorBank arrondit
+    l'incrément de phase de chaque copie à une fraction m / n (au plus max_cents d'écart, inaudible) : n trames contiennent
+    exactement m périodes. Une copie stable depuis settle blocs est alors lue dans une boucle de n échantillons précalculée,
+    au lieu d'être recalculée : toutes les copies lues le sont par une seule lecture indexée (np.take), quel que soit
+    le coût de la forme d'onde (tables, polyBLEP).
+
+    La boucle dépend de la phase de la copie : la phase est ramenée sur une grille de resolution pas par cycle
+    (décalage d'au plus 1 / (2 · resolution) cycle, une seule fois, quand la copie devient stable), et chaque boucle
+    correspond à une position sur cette grille modulo 1 / n. Clé : (forme d'onde, fs, m, n, table, interpolation, position).
+
+    Les boucles sont rangées dans un tableau préalloué de cases de max_period + max_frames trames (la boucle suivie de
+    son début : une lecture de max_frames trames au plus ne revient jamais au début), dont le nombre est fixé par max_bytes.
+    Quand toutes les cases sont prises, la moins récemment lue est réutilisée (LRU par date de dernière lecture, mise à jour
+    en une opération pour toutes les copies lues d'un bloc). Chaque réutilisation incrémente la génération de la case :
+    une copie qui lisait l'ancienne boucle le voit et cherche à nouveau la sienne.
+    Au plus builds boucles sont calculées par bloc rendu (les autres copies sont calculées normalement en attendant) :
+    l'attaque d'un grand accord ne retarde pas le rendu. Utilisé par un seul thread de rendu (pas de verrou).
+    """
+
+    def __init__(self, max_bytes=32 * 2**20, max_period=16384, max_frames=4096, dtype=np.float32, max_cents=0.1, resolution=2**20,
+                 settle=4, builds=2):
+        """
+        input:  - max_bytes: Mémoire maximale occupée par les boucles (octets)
+                - max_period: Longueur maximale d'une boucle (trames)
+                - max_frames: Nombre maximal de trames lues par bloc (les bancs aux blocs plus longs ne sont pas servis)
+                - dtype: Type des échantillons (celui des bancs d'oscillateurs qui utilisent le cache)
+                - max_cents: Écart d'accord maximal accepté par l'arrondi de l'incrément de phase (cents)
+                - resolution: Pas de la grille de phase par cycle
+                - settle: Nombre de blocs sans changement (note, hauteur, unisson) avant qu'une copie soit lue dans le cache
+                - builds: Nombre maximal de boucles calculées par bloc rendu
+
+        1) Enregistre les paramètres
+        2) Préalloue les cases des boucles (pages mémoire réservées à la première écriture) et leur état :
+           clé, date de dernière lecture, génération
+        """
+        # 1)
+        self.max_bytes = int(max_bytes)
+        self.max_period = int(max_period)
+        self.max_frames = int(max_frames)
+        self.dtype = np.dtype(dtype)
+        self.max_cents = float(max_cents)
+        self.resolution = int(resolution)
+        self.settle = int(settle)
+        self.builds = int(builds)
+        # 2)
+        self.stride = self.max_period + self.max_frames # Trames d'une case
+        n_slots = self.max_bytes // (self.stride * self.dtype.itemsize)
+        self.pool = np.zeros((n_slots, self.stride), dtype=self.dtype)
+        self.flat = self.pool.reshape(-1) # Vue à plat pour les lectures indexées
+        self.slot_key = [None] * n_slots # Clé de la boucle de chaque case (None : case libre)
+        self.last_used = np.zeros(n_slots, dtype=np.int64) # Date (numéro de bloc) de la dernière lecture de chaque case
+        self.generation = np.zeros(n_slots, dtype=np.int64) # Incrémentée à chaque réutilisation de la case
+        self._index = {} # Clé → case
+        self.clock = 0 # Numéro du bloc en cours (avancé à chaque lecture)
+        self.epoch = 0 # Incrémenté à chaque boucle retirée : les bancs revérifient alors leurs cases
+        self.hits = 0 # Lectures servies par le cache (une par copie et par bloc)
+        self.misses = 0 # Boucles calculées
+        self.evictions = 0 # Boucles remplacées (toutes les cases prises)
+
+    def settings(self):
+        """Paramètres du cache (pour créer un cache vide identique, ex: dans un processus de rendu)"""
+        return {"max_bytes": self.max_bytes, "max_period": self.max_period, "max_frames": self.max_frames, "dtype": self.dtype.str,
+                "max_cents": self.max_cents, "resolution": self.resolution, "settle": self.settle, "builds": self.builds}
+
+    def snap(self, inc):
+        """Fractions m / n les plus courtes proches des incréments de phase inc (tableau) et inverses de m modulo n (voir best_ratios),
+        (0, 0, 0) pour les notes qui ne peuvent pas être mises en cache"""
+        return best_ratios(inc, self.max_period, self.max_cents)
+
+    def find(self, key):
+        """Case de la boucle de la clé key, ou -1 si elle est absente"""
+        return self._index.get(key, -1)
+
+    def build(self, key, fill):
+        """Ajoute la boucle de la clé key
+        input:  - key: Clé de la boucle (voir la description de la classe)
+                - fill: Fonction fill(out) qui écrit la boucle (n trames) dans out
+        output: Case de la boucle (-1 si le cache n'a aucune case)
+
+        1) Prend une case libre, sinon la case la moins récemment lue (son ancienne boucle est retirée)
+        2) Écrit la boucle, puis ses max_frames premières trames à sa suite
+        """
+        if not len(self.pool):
+            return -1
+        # 1)
+        slot = self.slot_key.index(None) if len(self._index) < len(self.pool) else int(np.argmin(self.last_used))
+        old = self.slot_key[slot]
+        if old is not None:
+            del self._index[old]
+            self.evictions += 1
+            self.epoch += 1
+        self.generation[slot] += 1
+        # 2)
+        period = key[3]
+        row = self.pool[slot]
+        fill(row[:period])
+        for start in range(period, self.stride, period): # Début de la boucle répété jusqu'au bout de la case
+            stop = min(start + period, self.stride)
+            row[start:stop] = row[:stop - start]
+        self.slot_key[slot] = key
+        self._index[key] = slot
+        self.last_used[slot] = self.clock
+        self.misses += 1
+        return slot
+
+    def use(self, slots):
+        """Marque les cases lues pendant un bloc (tableau d'indices) : date de dernière lecture et compteur hits"""
+        self.last_used[slots] = self.clock
+        self.clock += 1
+        self.hits += len(slots)
+
+    def __len__(self):
+        return len(self._index)
+
+    def clear(self):
+        """Retire toutes les boucles (les compteurs sont conservés)"""
+        self.slot_key = [None] * len(self.pool)
+        self._index.clear()
+        self.generation += 1
+        self.epoch += 1
+
+    def stats(self):
+        """Compteurs du cache : lectures servies, boucles calculées, remplacées, nombre de boucles et mémoire occupée"""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._index),
+                "slots": len(self.pool), "bytes": len(self._index) * self.stride * self.dtype.itemsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def report(self):
+        """Texte court pour le panneau de statistiques de l'interface"""
+        s = self.stats()
+        return (f"cache de périodes : {s['entries']}/{s['slots']} boucles ({s['bytes'] / 2**20:.1f} Mo), "
+                f"{s['hits']} lectures ({s['hit_rate']:.0%}), {s['misses']} calculées, {s['evictions']} remplacées")
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from .output_stage import OutputStage
+from .ringbuffer import RingBuffer
+from .wav_writer import FlacWriter, RawWriter, WavWriter
+
+# Format de fichier → (classe d'écriture, extension)
+RECORD_FORMATS = {
+    "wav": (WavWriter, ".wav"),
+    "flac": (FlacWriter, ".flac"),
+    "raw": (RawWriter, ".raw"),
+}
+
+
+def record_path(folder=".", fmt="wav"):
+    """Chemin d'un nouvel enregistrement, horodaté (ex: ./synth_20250314_153012.wav)"""
+    return os.path.join(folder, time.strftime("synth_%Y%m%d_%H%M%S") + RECORD_FORMATS[fmt][1])
+
+
+class DiskRecorder:
+    """Enregistrement sur disque de la sortie jouée, sans ralentir le thread de rendu
+
+    Le thread de rendu dépose chaque bloc de sortie (après OutputStage) dans un buffer circulaire préalloué à un producteur
+    et un consommateur (ringbuffer.RingBuffer, sans verrou) : une copie de bloc, rien d'autre. Si le buffer est plein
+    (disque trop lent), le bloc est abandonné et compté (dropped) : le rendu n'attend jamais le disque.
+
+    Un thread d'écriture vide le buffer toutes les interval secondes, par lots de batch secondes (grandes écritures, peu d'appels
+    système), convertit au format du fichier si besoin (int16 avec dither TPDF, voir OutputStage) et corrige l'en-tête toutes
+    les header_interval secondes : un fichier en cours d'enregistrement est lisible, et reste valide si l'application s'arrête.
+    L'espace disque est réservé par tranches de preallocate secondes (WAV). La mémoire utilisée est fixe, quelle que soit la durée.
+    """
+
+    def __init__(self, path, fs=44100, channels=1, block_dtype=np.float32, fmt="wav", sample_format="int16", buffer=2.0, batch=0.5,
+                 interval=0.1, header_interval=1.0, preallocate=60.0):
+        """
+        input:  - path: Fichier d'enregistrement
+                - fs, channels: Fréquence d'échantillonnage et nombre de canaux de la sortie
+                - block_dtype: Type des blocs déposés (format de la carte son, float32 ou int16)
+                - fmt: Format du fichier ("wav", "flac" ou "raw")
+                - sample_format: Format des échantillons du fichier ("int16" ou "float32"; int16 seulement en FLAC)
+                - buffer: Profondeur du buffer circulaire (s) : temps pendant lequel le disque peut ne pas répondre sans perte
+                - batch: Durée maximale d'une écriture (s)
+                - interval: Période de réveil du thread d'écriture (s)
+                - header_interval: Période de correction de l'en-tête (s)
+                - preallocate: Durée réservée à l'avance sur le disque (s, WAV uniquement; 0 : pas de réservation)
+
+        1) Ouvre le fichier et réserve l'espace des preallocate premières secondes
+        2) Préalloue le buffer circulaire, le lot lu par le thread d'écriture et l'étage de conversion éventuel
+        3) Démarre le thread d'écriture
+        """
+        # 1)
+        if fmt not in RECORD_FORMATS:
+            raise ValueError(f"Format d'enregistrement inconnu : {fmt!r} (attendu : {', '.join(RECORD_FORMATS)})")
+        writer_class = RECORD_FORMATS[fmt][0]
+        if writer_class is RawWriter:
+            self.writer = RawWriter(channels=channels, fmt=sample_format, path=path)
+        else:
+            self.writer = writer_class(path, fs=fs, channels=channels, fmt=sample_format)
+        self.path = path
+        self.fs = fs
+        self.channels = int(channels)
+        self.preallocate = int(preallocate * fs) if isinstance(self.writer, WavWriter) else 0
+        if self.preallocate:
+            self.writer.preallocate(self.preallocate)
+        # 2)
+        self.ring = RingBuffer(int(buffer * fs), self.channels, dtype=block_dtype)
+        self._batch = np.zeros((max(int(batch * fs), 1), self.channels), dtype=block_dtype)
+        convert = np.dtype(block_dtype) != np.dtype(self.writer.dtype)
+        self._output = OutputStage(len(self._batch), self.channels, fmt=sample_format, soft_clip=False, dither=True) if convert else None
+        self.interval = interval
+        self.header_interval = header_interval
+        self.dropped = 0 # Blocs abandonnés (buffer plein)
+        self.pushed = 0 # Blocs déposés
+        self.errors = 0 # Erreurs d'écriture
+        self.error = None # Dernière erreur d'écriture (affichée par status)
+        # 3)
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="DiskRecorder", daemon=True)
+        self._thread.start()
+
+    def push(self, block):
+        """Dépose un bloc de sortie (appelé par le thread de rendu, ne bloque jamais)
+        input:  - block: Tableau de forme (n,) ou (n, channels), au type block_dtype
+        output: True si le bloc est déposé, False s'il est abandonné (buffer plein) ou si l'enregistrement est arrêté
+        """
+        if self._closing.is_set():
+            return False
+        if self.ring.free() < len(block):
+            self.dropped += 1
+            return False
+        self.ring.write(block)
+        self.pushed += 1
+        return True
+
+    @property
+    def frames(self):
+        """Trames écrites dans le fichier"""
+        return self.writer.frames
+
+    @property
+    def seconds(self):
+        """Durée enregistrée (s)"""
+        return self.writer.frames / self.fs
+
+    def _drain(self):
+        """Écrit tout le contenu du buffer circulaire, par lots
+        1) Lit au plus un lot (la lecture libère la place dans le buffer pour le thread de rendu)
+        2) Convertit au format du fichier si besoin, puis écrit le lot en une fois
+        3) Étend l'espace réservé quand il est presque rempli
+        """
+        while True:
+            # 1)
+            n = min(self.ring.available(), len(self._batch))
+            if n == 0:
+                return
+            batch = self._batch[:n]
+            self.ring.read_into(batch)
+            # 2)
+            data = batch if self.channels > 1 else batch[:, 0]
+            if self._output is not None:
+                data = self._output.process(data)
+            self.writer.write(data)
+            # 3)
+            writer = self.writer
+            if self.preallocate and writer.allocated - writer.data_end < self.preallocate // 2 * self.channels * writer.width:
+                writer.preallocate(self.preallocate) # Nouvelle tranche quand il reste moins d'une demi-tranche réservée
+
+    def _run(self):
+        """Boucle du thread d'écriture : vide le buffer toutes les interval secondes et corrige l'en-tête périodiquement,
+        puis, à l'arrêt, écrit ce qui reste et ferme le fichier"""
+        last_fix = time.perf_counter()
+        try:
+            while not self._closing.wait(self.interval):
+                try:
+                    self._drain()
+                    if time.perf_counter() - last_fix >= self.header_interval:
+                        self.writer.fix_header()
+                        last_fix = time.perf_counter()
+                except Exception as e: # Disque plein, support retiré... : le buffer continue d'être vidé (blocs perdus) sans arrêter le rendu
+                    self._failed(e)
+                    self.ring.clear()
+            self._drain()
+        except Exception as e:
+            self._failed(e)
+        finally:
+            try:
+                self.writer.close()
+            except Exception as e:
+                self._failed(e)
+
+    def _failed(self, error):
+        """Compte une erreur d'écriture et la garde pour status() (message affiché une seule fois)"""
+        self.errors += 1
+        self.error = f"{type(error).__name__}: {error}"
+        if self.errors == 1:
+            print(f"Erreur lors de l'écriture de l'enregistrement : {error}")
+
+    def close(self):
+        """Arrête l'enregistrement : écrit les blocs en attente, corrige l'en-tête et ferme le fichier"""
+        self._closing.set()
+        self._thread.join()
+
+    def status(self):
+        """Texte d'état pour l'interface (durée, blocs perdus, dernière erreur d'écriture)"""
+        text = f"● {self.seconds:6.1f} s  {self.dropped} bloc(s) perdu(s)"
+        if self.error is not None:
+            text += f"  {self.errors} erreur(s) d'écriture : {self.error}"
+        return text
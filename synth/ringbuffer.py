@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Buffer circulaire préalloué à un seul producteur et un seul consommateur (SPSC)
+
+    Le producteur (génération des blocs) appelle write() et le consommateur (callback audio de PortAudio) appelle read_into().
+    Chaque côté ne modifie que son propre index (_write_pos pour le producteur, _read_pos pour le consommateur) :
+    aucun verrou n'est nécessaire, l'affectation d'un entier Python étant atomique.
+    Les index sont des compteurs croissants, la position dans le tableau est obtenue par modulo de la capacité.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.int16):
+        """
+        input:  - capacity: Nombre de trames (frames) que le buffer peut contenir
+                - channels: Nombre de canaux par trame (1 = mono)
+                - dtype: Type des échantillons stockés (np.int16 ou np.float32)
+
+        1) Préalloue le tableau de stockage (capacity, channels) une seule fois
+        2) Initialise les index de lecture et d'écriture à 0
+        """
+        # 1)
+        self.capacity = int(capacity) # Nombre de trames stockables
+        self.channels = int(channels) # Nombre de canaux
+        self.data = np.zeros((self.capacity, self.channels), dtype=dtype) # Stockage préalloué, jamais réalloué ensuite
+        # 2)
+        self._write_pos = 0 # Nombre total de trames écrites (modifié uniquement par le producteur)
+        self._read_pos = 0  # Nombre total de trames lues (modifié uniquement par le consommateur)
+
+    def available(self):
+        """Retourne le nombre de trames prêtes à être lues"""
+        return self._write_pos - self._read_pos
+
+    def read_position(self):
+        """Retourne le nombre total de trames lues depuis la création (horloge de lecture du consommateur)"""
+        return self._read_pos
+
+    def free(self):
+        """Retourne le nombre de trames pouvant encore être écrites sans écraser les données non lues"""
+        return self.capacity - (self._write_pos - self._read_pos)
+
+    def write(self, block):
+        """Copie un bloc dans le buffer sans jamais bloquer
+        input:  - block: Tableau numpy de forme (n,) ou (n, channels)
+        output: Nombre de trames effectivement écrites (le surplus est ignoré si le buffer est plein)
+
+        1) Limite le nombre de trames à l'espace libre
+        2) Copie en une ou deux parties selon que l'on passe la fin du tableau
+        3) Publie les nouvelles trames en avançant l'index d'écriture en dernier
+        """
+        # 1)
+        if block.ndim == 1:
+            block = block.reshape(-1, 1) # Vue (pas de copie) pour le mono
+        n = min(len(block), self.free())
+        if n <= 0:
+            return 0
+        # 2)
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start) # Trames avant la fin du tableau
+        self.data[start:start + first] = block[:first]
+        if n > first: # Le reste repart au début du tableau
+            self.data[:n - first] = block[first:n]
+        # 3)
+        self._write_pos += n # Publication : le consommateur voit les trames seulement maintenant
+        return n
+
+    def read_into(self, out):
+        """Copie les trames disponibles dans le tableau de sortie fourni
+        input:  - out: Tableau numpy de forme (frames, channels) à remplir (ex: outdata du callback)
+        output: Nombre de trames copiées; le reste de out est mis à zéro (silence)
+        """
+        n = min(len(out), self.available())
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        if n > first:
+            out[first:n] = self.data[:n - first]
+        if n < len(out):
+            out[n:] = 0 # Silence pour les trames manquantes
+        self._read_pos += n # Libère l'espace pour le producteur
+        return n
+
+    def clear(self):
+        """Vide le buffer (à appeler uniquement quand le consommateur est arrêté)"""
+        self._read_pos = self._write_pos
@@ -0,0 +1,437 @@
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+import numpy as np
+
+from .generator import SAMPLER_WAVE, pan_gains # SAMPLER_WAVE est défini avec les autres formes d'onde : le lire n'importe pas ce module
+
+# (code de format WAV, bits par échantillon) → (type numpy, facteur de mise à l'échelle vers [-1, 1])
+WAV_DTYPES = {
+    (1, 16): (np.dtype("<i2"), 1 / 32768),  # WAVE_FORMAT_PCM 16 bits
+    (1, 32): (np.dtype("<i4"), 1 / 2 ** 31), # WAVE_FORMAT_PCM 32 bits
+    (3, 32): (np.dtype("<f4"), 1.0),         # WAVE_FORMAT_IEEE_FLOAT
+}
+NOTE_NAMES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+
+def read_wav_layout(path):
+    """Lit l'en-tête d'un fichier WAV sans lire ses échantillons
+    input:  - path: Chemin du fichier
+    output: Dictionnaire : fs, channels, dtype, scale (vers [-1, 1]), offset (position du bloc data en octets) et frames
+
+    1) Vérifie l'en-tête RIFF/WAVE puis parcourt les blocs jusqu'au bloc "data" (les blocs inconnus sont sautés sans être lus)
+    2) Décode le bloc "fmt " (y compris WAVE_FORMAT_EXTENSIBLE, dont le vrai code est au début du sous-format)
+    3) Nombre de trames : taille annoncée du bloc data, bornée par la taille du fichier (fichier en cours d'écriture ou tronqué)
+    """
+    # 1)
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"{path} n'est pas un fichier WAV")
+        fmt = None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                raise ValueError(f"{path} : bloc data introuvable")
+            chunk, size = struct.unpack("<4sI", head)
+            if chunk == b"fmt ":
+                fmt = f.read(size)
+                f.seek(size & 1, 1)
+            elif chunk == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + (size & 1), 1) # Les blocs ont une taille paire
+        file_size = os.fstat(f.fileno()).st_size
+    # 2)
+    if fmt is None or len(fmt) < 16:
+        raise ValueError(f"{path} : bloc fmt absent ou incomplet")
+    code, channels, fs, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if code == 0xFFFE and len(fmt) >= 26: # WAVE_FORMAT_EXTENSIBLE
+        code = struct.unpack("<H", fmt[24:26])[0]
+    if (code, bits) not in WAV_DTYPES:
+        raise ValueError(f"{path} : format non pris en charge (code {code}, {bits} bits; attendu : PCM 16 ou 32 bits, ou float32)")
+    dtype, scale = WAV_DTYPES[code, bits]
+    # 3)
+    frames = min(size, file_size - offset) // block_align
+    return {"fs": fs, "channels": channels, "dtype": dtype, "scale": scale, "offset": offset, "frames": frames}
+
+
+def note_from_name(name):
+    """Note MIDI indiquée à la fin d'un nom de fichier (sans extension) : nom de note ("C4", "F#3", "Bb2", Do4 = 60) ou numéro ("piano_060")
+    output: Numéro de note, ou None si le nom n'en contient pas
+    """
+    m = re.search(r"([A-G])([#b]?)(-?\d)$", name)
+    if m:
+        letter, accidental, octave = m.groups()
+        note = 12 * (int(octave) + 1) + NOTE_NAMES[letter] + {"#": 1, "b": -1, "": 0}[accidental]
+        return note if 0 <= note < 128 else None
+    m = re.search(r"(\d{1,3})$", name)
+    if m and int(m.group(1)) < 128:
+        return int(m.group(1))
+    return None
+
+
+class Sample:
+    """Échantillon projeté en mémoire : np.memmap sur le bloc data du fichier WAV
+
+    Rien n'est lu à l'ouverture (seul l'en-tête l'est) : le système charge les pages du fichier à la première lecture
+    et peut les libérer sous pression mémoire. Une tranche de data est une vue sur la projection, sans copie.
+    """
+
+    def __init__(self, path, root=60, lo=None, hi=None):
+        """
+        input:  - path: Chemin du fichier WAV (PCM 16 ou 32 bits, ou float32; mono ou stéréo)
+                - root: Note MIDI jouée par l'échantillon à sa vitesse d'origine
+                - lo, hi: Notes extrêmes (incluses) jouées par cet échantillon (None : zone décidée par SampleLibrary)
+        """
+        layout = read_wav_layout(path)
+        if layout["frames"] < 2:
+            raise ValueError(f"{path} : échantillon vide")
+        self.path = path
+        self.root = int(root)
+        self.lo, self.hi = lo, hi
+        self.fs = layout["fs"]
+        self.channels = layout["channels"]
+        self.frames = layout["frames"]
+        self.scale = layout["scale"]
+        self.frame_bytes = layout["dtype"].itemsize * self.channels
+        self.offset = layout["offset"]
+        self.root_freq = 440.0 * 2 ** ((self.root - 69) / 12)
+        self.data = np.memmap(path, dtype=layout["dtype"], mode="r", offset=layout["offset"], shape=(self.frames, self.channels))
+
+    def touch(self, start, stop, scratch=None):
+        """Charge en mémoire les trames [start, stop) (appelé par le thread de préchargement, jamais par le thread de rendu)
+        input:  - start, stop: Trames extrêmes (bornées à l'échantillon)
+                - scratch: Buffer de lecture (bytearray) réutilisé d'un appel à l'autre (None : un buffer de 256 Kio est alloué)
+        output: Nombre de pages chargées
+
+        1) Lit la plage dans le fichier par readinto : la lecture disque a lieu sans le GIL, le thread de rendu n'est pas bloqué.
+           Les pages sont alors dans le cache du système
+        2) Lit un échantillon par page de la projection : les pages (déjà en cache) sont rattachées à la projection du processus
+        """
+        start, stop = max(int(start), 0), min(int(stop), self.frames)
+        if stop <= start:
+            return 0
+        # 1)
+        view = memoryview(scratch if scratch is not None else bytearray(1 << 18))
+        remaining = (stop - start) * self.frame_bytes
+        with open(self.path, "rb", buffering=0) as f:
+            f.seek(self.offset + start * self.frame_bytes)
+            while remaining > 0:
+                read = f.readinto(view[:min(remaining, len(view))])
+                if not read:
+                    break
+                remaining -= read
+        # 2)
+        step = max(1, mmap.PAGESIZE // self.frame_bytes)
+        pages = self.data[start:stop:step, 0]
+        np.add.reduce(pages, dtype=np.float64) # La lecture suffit : le résultat est ignoré
+        return len(pages)
+
+
+class SampleLibrary:
+    """Bibliothèque d'échantillons multiéchantillonnée : table de 128 zones (échantillon joué par chaque note MIDI)
+
+    Chargement en temps constant par fichier : seuls les en-têtes WAV sont lus, les données sont projetées en mémoire.
+    Le temps de démarrage et la mémoire résidente ne dépendent donc pas de la taille des fichiers.
+    """
+
+    def __init__(self, samples):
+        """
+        input:  - samples: Liste de Sample
+
+        Zones : chaque note est jouée par l'échantillon de note racine la plus proche; les zones explicites (lo, hi) sont prioritaires
+        """
+        if not samples:
+            raise ValueError("Bibliothèque d'échantillons vide")
+        self.samples = list(samples)
+        roots = np.array([s.root for s in self.samples])
+        notes = np.arange(128)
+        self.zone = np.argmin(np.abs(notes[:, None] - roots[None, :]), axis=1) # Échantillon joué par chaque note
+        for k, s in enumerate(self.samples):
+            if s.lo is not None or s.hi is not None:
+                self.zone[(s.lo if s.lo is not None else 0):(s.hi if s.hi is not None else 127) + 1] = k
+
+    @classmethod
+    def load(cls, path):
+        """Charge une bibliothèque
+        input:  - path: Dossier de fichiers WAV dont le nom se termine par leur note racine (ex: "piano_C4.wav", "harpe_060.wav"),
+                  ou fichier JSON : [{"file": "piano/C4.wav", "root": 60, "lo": 58, "hi": 62}, ...] (chemins relatifs au fichier JSON,
+                  "lo" et "hi" optionnels; sans "root", la note est lue dans le nom du fichier)
+        output: SampleLibrary
+        """
+        if os.path.isdir(path):
+            entries = [{"file": os.path.join(path, name)} for name in sorted(os.listdir(path)) if name.lower().endswith(".wav")]
+        else:
+            with open(path) as f:
+                entries = json.load(f)
+            base = os.path.dirname(os.path.abspath(path))
+            entries = [dict(entry, file=os.path.join(base, entry["file"])) for entry in entries]
+        samples = []
+        for entry in entries:
+            root = entry.get("root")
+            if root is None:
+                root = note_from_name(os.path.splitext(os.path.basename(entry["file"]))[0])
+            if root is None:
+                print(f"Échantillon ignoré (note racine inconnue) : {entry['file']}")
+                continue
+            samples.append(Sample(entry["file"], root, entry.get("lo"), entry.get("hi")))
+        return cls(samples)
+
+    @property
+    def dtypes(self):
+        """Types des échantillons de la bibliothèque"""
+        return {s.data.dtype for s in self.samples}
+
+    def find(self, freq):
+        """Index de l'échantillon joué pour une fréquence (note du tempérament égal la plus proche)"""
+        note = int(np.clip(round(69 + 12 * np.log2(max(freq, 1e-9) / 440.0)), 0, 127))
+        return int(self.zone[note])
+
+
+class SamplerBank:
+    """Banc de voix d'échantillonneur, même interface que OscillatorBank : utilisable par VoiceAllocator (enveloppes, vol de voix)
+
+    Chaque voix lit son échantillon à sa propre vitesse (rapport entre la fréquence de la note et celle de la note racine,
+    et entre les fréquences d'échantillonnage). Pour chaque voix et chaque bloc :
+        - les positions de lecture des n trames sont pos + rate · (0, 1, ..., n-1), calculées en une opération (float64 :
+          précis même loin dans un long échantillon)
+        - la tranche de l'échantillon couverte par le bloc est une vue sur la projection en mémoire, sans copie
+        - l'interpolation linéaire entre les deux échantillons voisins de chaque position est vectorisée sur tout le bloc
+        - le mix sur les canaux de sortie est un produit matriciel (trames, canaux de l'échantillon) · gains
+    Les voix lisent des fichiers différents : la boucle Python est par voix, jamais par échantillon.
+    Un échantillon terminé rend du silence jusqu'à la fin du relâchement de sa note.
+    """
+
+    def __init__(self, library, fs=44100, max_voices=32, max_frames=4096, channels=1, dtype=np.float32):
+        """
+        input:  - library: SampleLibrary
+                - fs: Fréquence d'échantillonnage de sortie (en Hz)
+                - max_voices: Nombre maximal de voix simultanées
+                - max_frames: Nombre maximal de trames par bloc rendu
+                - channels: Nombre de canaux de sortie
+                - dtype: Type des calculs (float32, comme OscillatorBank)
+
+        1) Préalloue l'état des voix : identifiant, échantillon lu, position de lecture, vitesse, amplitude, panoramique et gains
+        2) Préalloue les tableaux de travail d'un bloc : positions, index, parties fractionnaires, échantillons voisins bruts
+           (un tableau par type d'échantillon de la bibliothèque, pour np.take sans conversion) et convertis
+        """
+        # 1)
+        self.library = library
+        self.fs = fs
+        self.max_voices = int(max_voices)
+        self.max_frames = int(max_frames)
+        self.channels = int(channels)
+        self.dtype = np.dtype(dtype)
+        self.n_voices = 0
+        self.ids = np.full(self.max_voices, -1, dtype=np.int64)
+        self.sample = np.zeros(self.max_voices, dtype=np.int64) # Index de l'échantillon dans la bibliothèque
+        self.pos = np.zeros(self.max_voices) # Position de lecture (en trames de l'échantillon, float64)
+        self.rate = np.zeros(self.max_voices) # Trames d'échantillon lues par trame de sortie
+        self.amp = np.zeros(self.max_voices)
+        self.pan = np.zeros(self.max_voices)
+        self.gain = np.zeros((self.max_voices, 2, self.channels), dtype=dtype) # Gains (canal de l'échantillon, canal de sortie)
+        # 2)
+        n = self.max_frames
+        self._ramp = np.arange(n, dtype=np.float64)
+        self._t = np.empty(n)
+        self._idx = np.empty(n, dtype=np.int64)
+        self._frac = np.empty((n, 1), dtype=dtype)
+        self._raw = {dt: (np.empty(2 * n, dtype=dt), np.empty(2 * n, dtype=dt)) for dt in library.dtypes}
+        self._y0 = np.empty(2 * n, dtype=dtype)
+        self._y1 = np.empty(2 * n, dtype=dtype)
+        self._voice = np.empty(n * self.channels, dtype=dtype)
+
+    def _slot(self, voice_id):
+        """Retourne la case occupée par la voix voice_id, ou -1 si elle n'existe pas"""
+        slots = np.flatnonzero(self.ids[:self.n_voices] == voice_id)
+        return int(slots[0]) if len(slots) else -1
+
+    def _slots(self, lo, hi):
+        ids = self.ids[:self.n_voices]
+        return np.flatnonzero((ids >= lo) & (ids < hi))
+
+    def add_voice(self, voice_id, freq, amp=1.0, phase=0.0, pan=0.0):
+        """Ajoute une voix (phase ignorée : la lecture part du début de l'échantillon), voir OscillatorBank.add_voice"""
+        i = self._slot(voice_id)
+        if i < 0:
+            if self.n_voices >= self.max_voices:
+                raise ValueError(f"SamplerBank plein ({self.max_voices} voix)")
+            i = self.n_voices
+            self.n_voices += 1
+        self.assign(i, voice_id, freq, amp, pan)
+        return i
+
+    def assign(self, i, voice_id, freq, amp=1.0, pan=0.0):
+        """Affecte la case i à une note : échantillon de sa zone, lu depuis le début à la vitesse donnant freq"""
+        k = self.library.find(freq)
+        self.ids[i] = voice_id
+        self.sample[i] = k
+        self.pos[i] = 0.0
+        self.rate[i] = self._rate(k, freq)
+        self.amp[i] = amp
+        self.pan[i] = pan
+        self._update_gain(i)
+
+    def _rate(self, k, freq):
+        """Vitesse de lecture de l'échantillon k pour jouer freq : (freq / fréquence racine) · (fs de l'échantillon / fs de sortie)"""
+        s = self.library.samples[k]
+        return freq / s.root_freq * s.fs / self.fs
+
+    def _update_gain(self, i):
+        """Gains de la voix i : un échantillon mono est placé par le panoramique (voir generator.pan_gains); un échantillon stéréo
+        garde ses canaux (gauche et droite sur les deux premiers canaux, panoramique en balance), mixés en mono sur une sortie mono"""
+        s = self.library.samples[int(self.sample[i])]
+        self.gain[i] = 0.0
+        if s.channels == 1:
+            self.gain[i, 0] = self.amp[i] * pan_gains(self.pan[i], self.channels)
+        elif self.channels == 1:
+            self.gain[i, :, 0] = self.amp[i] / 2
+        else:
+            left, right = pan_gains(self.pan[i], 2) * np.sqrt(2) # 1 et 1 au centre
+            self.gain[i, 0, 0] = self.amp[i] * left
+            self.gain[i, 1, 1] = self.amp[i] * right
+
+    def retune(self, lo, hi, inc, ratio=1.0):
+        """Réaccorde les voix dont l'identifiant est dans [lo, hi) (pitch bend), voir OscillatorBank.retune. La position de lecture est conservée"""
+        slots = self._slots(lo, hi)
+        for i in slots.tolist():
+            self.rate[i] = self._rate(int(self.sample[i]), inc[self.ids[i] - lo] * self.fs * ratio)
+        return len(slots)
+
+    def set_pan(self, lo, hi, pan):
+        slots = self._slots(lo, hi)
+        for i in slots.tolist():
+            self.pan[i] = pan
+            self._update_gain(i)
+        return len(slots)
+
+    def set_unison(self, detune=None, spread=None):
+        """Sans effet : l'unisson est propre aux oscillateurs"""
+
+    def remove_voice(self, voice_id):
+        """Supprime une voix en déplaçant la dernière voix active dans sa case, voir OscillatorBank.remove_voice"""
+        i = self._slot(voice_id)
+        if i < 0:
+            return -1
+        last = self.n_voices - 1
+        for arr in (self.ids, self.sample, self.pos, self.rate, self.amp, self.pan, self.gain):
+            arr[i] = arr[last]
+        self.ids[last] = -1
+        self.n_voices = last
+        return i
+
+    def clear(self):
+        self.ids[:self.n_voices] = -1
+        self.n_voices = 0
+
+    def render(self, out, wave_type=None, env=None):
+        """Rend toutes les voix et les mixe dans out (wave_type est ignoré)
+        input:  - out: Tableau à remplir, 1-D en mono, (trames, canaux) sinon
+                - env: Tableau (voix × trames) d'enveloppe, dans l'ordre des cases (None : pas d'enveloppe)
+        output: out
+
+        Pour chaque voix :
+        1) Positions de lecture du bloc et avance de la position; seules les m trames dont les deux voisins existent sont rendues
+        2) Index entiers (relatifs au début de la tranche) et parties fractionnaires
+        3) Tranche de l'échantillon couverte par le bloc (vue sur la projection, sans copie), lecture des deux voisins
+           dans des tableaux préalloués, conversion vers [-1, 1]
+        4) Interpolation linéaire y = y0 + frac · (y1 - y0), enveloppe, puis mix sur les canaux de sortie (produit matriciel par les gains)
+        """
+        n = len(out)
+        out[:] = 0
+        ramp, t, idx = self._ramp[:n], self._t[:n], self._idx[:n]
+        for i in range(self.n_voices):
+            s = self.library.samples[int(self.sample[i])]
+            # 1)
+            pos, rate = self.pos[i], self.rate[i]
+            self.pos[i] = pos + rate * n
+            end = s.frames - 1 # Dernière position interpolable (il faut l'échantillon suivant)
+            if pos >= end:
+                continue
+            np.multiply(ramp, rate, out=t)
+            np.add(t, pos, out=t)
+            m = n if t[-1] < end else int(np.searchsorted(t, end))
+            # 2)
+            ti, ii, frac = t[:m], idx[:m], self._frac[:m]
+            np.copyto(ii, ti, casting="unsafe") # Positions positives : troncature = partie entière
+            np.subtract(ti, ii, out=frac[:, 0], casting="same_kind")
+            first = int(ii[0])
+            np.subtract(ii, first, out=ii)
+            # 3)
+            sc = min(s.channels, 2)
+            seg = s.data[first:first + int(ii[-1]) + 2, :sc]
+            raw0, raw1 = self._raw[s.data.dtype]
+            a, b = raw0[:m * sc].reshape(m, sc), raw1[:m * sc].reshape(m, sc)
+            np.take(seg, ii, axis=0, out=a)
+            np.add(ii, 1, out=ii)
+            np.take(seg, ii, axis=0, out=b)
+            y0, y1 = self._y0[:m * sc].reshape(m, sc), self._y1[:m * sc].reshape(m, sc)
+            np.multiply(a, s.scale, out=y0, casting="same_kind")
+            np.multiply(b, s.scale, out=y1, casting="same_kind")
+            # 4)
+            np.subtract(y1, y0, out=y1)
+            np.multiply(y1, frac, out=y1)
+            np.add(y0, y1, out=y0)
+            if env is not None:
+                np.multiply(y0, env[i, :m, None], out=y0)
+            if out.ndim == 1:
+                voice = self._voice[:m]
+                np.dot(y0, self.gain[i, :sc, 0], out=voice)
+            else:
+                voice = self._voice[:m * self.channels].reshape(m, self.channels)
+                np.dot(y0, self.gain[i, :sc], out=voice)
+            np.add(out[:m], voice, out=out[:m])
+        return out
+
+
+class Prefetcher(threading.Thread):
+    """Thread de préchargement des échantillons : les défauts de page (lecture disque) ont lieu ici, pas dans le thread de rendu
+
+    1) Au démarrage : le début (head secondes) de chaque échantillon. L'attaque d'une note, lue dès le bloc suivant l'appui,
+       est alors déjà en mémoire. La mémoire résidente ajoutée est bornée par échantillon (head secondes), quelle que soit sa durée
+    2) Ensuite, toutes les interval secondes : les ahead secondes qui suivent la position de lecture de chaque voix en cours
+       (état de SamplerBank lu sans verrou : une valeur périmée ne fait que précharger une page de trop ou de moins).
+       Seule la partie pas encore chargée de chaque échantillon est lue (loaded : fin de la partie chargée, en trames)
+    """
+
+    def __init__(self, bank, head=0.5, ahead=0.5, interval=0.05):
+        super().__init__(name="SamplePrefetcher", daemon=True)
+        self.bank = bank
+        self.head = head
+        self.ahead = ahead
+        self.interval = interval
+        self.pages = 0 # Pages chargées
+        self.loaded = np.zeros(len(bank.library.samples)) # Fin de la partie chargée de chaque échantillon (trames)
+        self._scratch = bytearray(1 << 18)
+        self.ready = threading.Event() # Signalé quand le début de chaque échantillon est en mémoire
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # 1)
+        for k, s in enumerate(self.bank.library.samples):
+            if self._stop_event.is_set():
+                return
+            self.pages += s.touch(0, self.head * s.fs, self._scratch)
+            self.loaded[k] = self.head * s.fs
+        self.ready.set()
+        # 2)
+        bank, samples = self.bank, self.bank.library.samples
+        while not self._stop_event.wait(self.interval):
+            nv = bank.n_voices
+            for k, pos, rate in zip(bank.sample[:nv].tolist(), bank.pos[:nv].tolist(), bank.rate[:nv].tolist()):
+                s = samples[k]
+                end = pos + self.ahead * s.fs * max(rate, 1.0)
+                if end > self.loaded[k] and self.loaded[k] < s.frames:
+                    self.pages += s.touch(max(pos, self.loaded[k]), end, self._scratch)
+                    self.loaded[k] = end
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=1.0)
@@ -0,0 +1,120 @@
+import numpy as np
+
+N_NOTES = 128 # Notes MIDI 0 à 127
+BEND_CENTER = 8192 # Valeur de pitch bend MIDI (14 bits) au repos
+BEND_STEPS = 2 * BEND_CENTER # 16384 valeurs de pitch bend
+
+
+def read_scl(path):
+    """Lit un fichier d'échelle Scala (.scl)
+    input:  - path: Chemin du fichier
+    output: (description, ratios) : ratios est la liste des rapports de fréquence des degrés 1 à N par rapport au degré 0;
+            le dernier est la période de l'échelle (en général l'octave, 2/1)
+
+    Format : lignes de commentaire commençant par "!", puis une ligne de description (éventuellement vide), le nombre de degrés N
+    et N lignes de hauteurs. Une hauteur contenant un point est en cents (ex: 701.955), sinon c'est un rapport (ex: 3/2) ou un entier.
+    """
+    with open(path, encoding="latin-1") as f:
+        lines = [line for line in (raw.strip() for raw in f) if not line.startswith("!")] # Commentaires éventuellement indentés
+    if len(lines) < 2:
+        raise ValueError(f"Fichier Scala incomplet : {path}")
+    description = lines[0]
+    pitches = [line.split()[0] for line in lines[1:] if line]
+    count = int(pitches[0])
+    ratios = []
+    for token in pitches[1:count + 1]:
+        if "." in token:
+            ratio = 2 ** (float(token) / 1200)
+        elif "/" in token:
+            num, den = token.split("/")
+            ratio = int(num) / int(den)
+        else:
+            ratio = float(int(token))
+        if ratio <= 0:
+            raise ValueError(f"Hauteur invalide dans {path} : {token}")
+        ratios.append(ratio)
+    if count < 1 or len(ratios) != count:
+        raise ValueError(f"{path} annonce {count} degrés mais en contient {len(ratios)}")
+    return description, ratios
+
+
+class Tuning:
+    """Accordage : tables précalculées des fréquences et des incréments de phase des 128 notes MIDI, et du pitch bend
+
+    Les tables sont recalculées une seule fois à chaque changement (fréquence d'échantillonnage, La de référence, échelle) :
+    le thread de rendu ne fait ensuite que des lectures indexées par numéro de note (et par valeur de pitch bend),
+    sans calcul de puissance ni dictionnaire indexé par des fréquences.
+
+    Tempérament égal par défaut, ou échelle Scala (.scl) : le degré 0 de l'échelle est joué sur la note root,
+    et l'échelle est transposée pour que la note 69 (La4) sonne à a4 Hz.
+    """
+
+    def __init__(self, fs=44100, a4=440.0, ratios=None, root=60, bend_range=2.0, description="Tempérament égal"):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - a4: Fréquence de référence de la note 69 (en Hz)
+                - ratios: Rapports des degrés 1 à N de l'échelle, le dernier étant la période (None : tempérament égal à 12 notes)
+                - root: Note MIDI du degré 0 de l'échelle
+                - bend_range: Amplitude du pitch bend (en demi-tons, de part et d'autre du repos)
+                - description: Nom de l'échelle
+
+        Attributs (tables, reconstruites par _build) :
+        - freqs : fréquence de chaque note (128,)
+        - inc : incrément de phase par échantillon de chaque note, en cycles (freqs / fs), comme OscillatorBank.inc
+        - bend_ratio : rapport de fréquence de chaque valeur de pitch bend (16384,), 1 au repos (8192)
+        """
+        self.fs = fs
+        self.a4 = float(a4)
+        self.ratios = None if ratios is None else [float(r) for r in ratios]
+        self.root = int(root)
+        self.bend_range = float(bend_range)
+        self.description = description
+        self._build()
+
+    @classmethod
+    def from_scl(cls, path, fs=44100, a4=440.0, root=60, bend_range=2.0):
+        """Accordage à partir d'un fichier d'échelle Scala"""
+        description, ratios = read_scl(path)
+        return cls(fs, a4, ratios, root, bend_range, description or path)
+
+    def _build(self):
+        """Recalcule toutes les tables
+        1) Rapport de fréquence de chaque note par rapport au degré 0 : période ** (nombre de périodes) · rapport du degré
+        2) Transposition pour que la note 69 sonne à a4, puis incréments de phase à la fréquence d'échantillonnage
+        3) Table du pitch bend : 2 ** (bend_range · (v - 8192) / 8192 / 12)
+        Les nouvelles tables remplacent les anciennes en une affectation chacune (un lecteur voit l'ancienne ou la nouvelle table)
+        """
+        # 1)
+        notes = np.arange(N_NOTES)
+        if self.ratios is None:
+            rel = 2.0 ** ((notes - 69) / 12)
+        else:
+            degrees = np.concatenate([[1.0], self.ratios[:-1]]) # Rapport de chaque degré dans une période
+            periods, steps = np.divmod(notes - self.root, len(self.ratios))
+            rel = self.ratios[-1] ** periods.astype(float) * degrees[steps]
+            rel /= rel[69]
+        # 2)
+        freqs = self.a4 * rel
+        self.inc = freqs / self.fs
+        self.freqs = freqs
+        # 3)
+        self.bend_ratio = 2.0 ** (self.bend_range * (np.arange(BEND_STEPS) - BEND_CENTER) / BEND_CENTER / 12)
+
+    def set_fs(self, fs):
+        self.fs = fs
+        self._build()
+
+    def set_a4(self, a4):
+        self.a4 = float(a4)
+        self._build()
+
+    def set_scale(self, ratios, root=None, description=""):
+        """Change d'échelle (None : tempérament égal)"""
+        self.ratios = None if ratios is None else [float(r) for r in ratios]
+        self.root = self.root if root is None else int(root)
+        self.description = description or ("Tempérament égal" if ratios is None else f"Échelle à {len(ratios)} degrés")
+        self._build()
+
+    def freq(self, note, bend=BEND_CENTER):
+        """Fréquence (en Hz) d'une note MIDI pour une valeur de pitch bend (0 à 16383)"""
+        return self.freqs[note] * self.bend_ratio[bend]
@@ -0,0 +1,249 @@
+import numpy as np
+
+from . import kernels
+
+STEAL_POLICIES = ("oldest", "quietest")
+
+
+class VoiceAllocator:
+    """Gestionnaire de voix à taille fixe, avec vol de voix et enveloppe ADSR par voix
+
+    Les voix sont celles d'un OscillatorBank : l'état de chaque voix (enveloppe, âge) est rangé dans des tableaux numpy
+    préalloués, indexés par la case de la voix dans le banc. Quand le banc supprime une voix, il déplace la dernière voix
+    dans la case libérée : l'allocateur fait le même échange sur ses propres tableaux.
+
+    L'enveloppe ADSR (linéaire par morceaux) est calculée pour tout le bloc et toutes les voix en une seule fois,
+    à partir du nombre d'échantillons écoulés depuis l'appui (t) et depuis le relâchement :
+        - avant relâchement : env(t) = start + (1 - start) · clip(t / Na, 0, 1) - (1 - S) · clip((t - Na) / Nd, 0, 1)
+        - après relâchement : env = niveau au relâchement · (1 - clip((t - t_rel) / Nr, 0, 1))
+    où start est le niveau de la voix au moment de l'appui (0, ou le niveau courant d'une voix réutilisée, pour éviter un clic).
+    Avec le backend numba, ces deux formules sont évaluées en un seul passage par kernels.adsr, sans tableaux intermédiaires.
+    """
+
+    def __init__(self, bank, attack=0.005, decay=0.1, sustain=0.7, release=0.05, steal="oldest", gain=0.25, backend=None):
+        """
+        input:  - bank: OscillatorBank dont les cases forment le pool de voix (sa taille max_voices fixe la polyphonie)
+                - attack, decay, release: Durées de l'enveloppe (en secondes)
+                - sustain: Niveau de maintien (entre 0 et 1)
+                - steal: Politique de vol de voix quand le pool est plein : "oldest" (la plus ancienne) ou "quietest" (la plus faible)
+                - gain: Gain fixe appliqué au mix. Le niveau d'une note ne dépend plus du nombre de notes jouées
+                - backend: Backend de calcul de l'enveloppe ("auto", "numpy" ou "numba"; None : celui du banc)
+
+        1) Vérifie la politique de vol et enregistre les paramètres d'enveloppe (convertis en nombres d'échantillons)
+        2) Préalloue l'état des voix (une case par voix du banc)
+        3) Préalloue les tableaux de travail (voix × trames) du calcul d'enveloppe; avec le backend numba, compile kernels.adsr
+           (ou la charge depuis le cache disque) par un appel sur un bloc vide
+        """
+        # 1)
+        if steal not in STEAL_POLICIES:
+            raise ValueError(f"Politique de vol inconnue : {steal!r} (attendu : {', '.join(STEAL_POLICIES)})")
+        self.bank = bank
+        self.steal = steal
+        self.gain = gain
+        self.set_adsr(attack, decay, sustain, release)
+        # 2)
+        size = bank.max_voices
+        self.t = np.zeros(size) # Échantillons écoulés depuis l'appui
+        self.rel_at = np.full(size, np.inf) # Valeur de t au relâchement (inf : note tenue)
+        self.rel_level = np.zeros(size) # Niveau d'enveloppe au relâchement
+        self.start_level = np.zeros(size) # Niveau d'enveloppe au moment de l'appui
+        self.level = np.zeros(size) # Niveau d'enveloppe à la fin du dernier bloc
+        self.order = np.zeros(size, dtype=np.int64) # Numéro d'ordre de l'appui (pour voler la plus ancienne)
+        self._counter = 0
+        self.stolen = 0 # Nombre de voix volées
+        # 3)
+        work = size * bank.max_frames
+        dtype = bank.dtype # Même type que le banc (float32 par défaut) : l'enveloppe multiplie directement son tableau de travail
+        self._t = np.empty(work, dtype=dtype) # t de chaque échantillon
+        self._env = np.empty(work, dtype=dtype) # Enveloppe
+        self._tmp = np.empty(work, dtype=dtype)
+        self._mask = np.empty(work, dtype=bool) # Échantillons après le relâchement
+        self._ramp = np.arange(bank.max_frames, dtype=dtype)
+        self._since = np.empty(size) # Temps écoulé depuis le relâchement au début du bloc (float64 : t peut dépasser la précision du float32)
+        self.backend = kernels.resolve_backend(getattr(bank, "backend", "auto") if backend is None else backend)
+        if self.backend == "numba":
+            kernels.adsr(self._env[:0].reshape(0, 0), self.t[:0], self.start_level[:0], self.rel_at[:0], self.rel_level[:0],
+                         self.n_attack, self.n_decay, self.sustain, self.n_release)
+
+    def set_adsr(self, attack, decay, sustain, release):
+        """Modifie les paramètres d'enveloppe (durées en secondes, sustain entre 0 et 1)"""
+        fs = self.bank.fs
+        self.n_attack = max(attack * fs, 1.0)
+        self.n_decay = max(decay * fs, 1.0)
+        self.sustain = float(np.clip(sustain, 0.0, 1.0))
+        self.n_release = max(release * fs, 1.0)
+
+    @property
+    def dtype(self):
+        """Type des échantillons rendus (celui du banc)"""
+        return self.bank.dtype
+
+    @property
+    def channels(self):
+        """Nombre de canaux rendus (ceux du banc)"""
+        return self.bank.channels
+
+    @property
+    def n_voices(self):
+        """Nombre de voix en cours (tenues ou en relâchement)"""
+        return self.bank.n_voices
+
+    def _env_on(self, i, t):
+        """Niveau d'enveloppe (avant relâchement) de la voix i à l'instant t"""
+        a = min(t / self.n_attack, 1.0)
+        d = min(max((t - self.n_attack) / self.n_decay, 0.0), 1.0)
+        start = self.start_level[i]
+        return start + (1 - start) * a - (1 - self.sustain) * d
+
+    def note_on(self, note_id, freq, velocity=1.0, pan=0.0):
+        """Démarre une note
+        input:  - note_id: Identifiant entier de la note
+                - freq: Fréquence (en Hz)
+                - velocity: Amplitude de la note (entre 0 et 1)
+                - pan: Panoramique (-1 : gauche, 0 : centre, 1 : droite), sans effet en mono
+        output: Case de la voix utilisée
+
+        1) Si la note sonne déjà (tenue ou en relâchement), on la relance dans la même case
+        2) Sinon on prend une case libre, ou on vole une voix selon la politique choisie
+        3) L'enveloppe repart du niveau courant de la case : pas de saut de niveau, donc pas de clic
+        """
+        bank = self.bank
+        # 1)
+        i = bank._slot(note_id)
+        # 2)
+        if i < 0:
+            if bank.n_voices < bank.max_voices:
+                i = bank.add_voice(note_id, freq, velocity, pan=pan)
+                self.level[i] = 0.0
+            else:
+                i = self._victim()
+                self.stolen += 1
+                bank.assign(i, note_id, freq, velocity, pan)
+        else:
+            bank.assign(i, note_id, freq, velocity, pan)
+        # 3)
+        self.start_level[i] = self.level[i]
+        self.t[i] = 0.0
+        self.rel_at[i] = np.inf
+        self.order[i] = self._counter
+        self._counter += 1
+        return i
+
+    def note_off(self, note_id):
+        """Passe une note en phase de relâchement (elle est libérée à la fin du relâchement)"""
+        i = self.bank._slot(note_id)
+        if i < 0 or np.isfinite(self.rel_at[i]):
+            return
+        self.rel_level[i] = self._env_on(i, self.t[i])
+        self.rel_at[i] = self.t[i]
+
+    def retune(self, lo, hi, inc, ratio=1.0):
+        """Réaccorde les voix dont l'identifiant est dans [lo, hi), voir OscillatorBank.retune"""
+        return self.bank.retune(lo, hi, inc, ratio)
+
+    def set_pan(self, lo, hi, pan):
+        """Change le panoramique des voix dont l'identifiant est dans [lo, hi), voir OscillatorBank.set_pan"""
+        return self.bank.set_pan(lo, hi, pan)
+
+    def set_unison(self, detune=None, spread=None):
+        """Modifie le désaccord et la largeur stéréo de l'unisson, voir OscillatorBank.set_unison"""
+        self.bank.set_unison(detune, spread)
+
+    def all_notes_off(self, lo=0, hi=None):
+        """Relâche les notes dont l'identifiant est dans [lo, hi) (par défaut : toutes)"""
+        for note_id in self.bank.ids[:self.bank.n_voices].tolist():
+            if note_id >= lo and (hi is None or note_id < hi):
+                self.note_off(note_id)
+
+    def _victim(self):
+        """Choisit la voix à voler : d'abord parmi les voix en relâchement, puis la plus ancienne ou la plus faible"""
+        nv = self.bank.n_voices
+        released = np.flatnonzero(np.isfinite(self.rel_at[:nv]))
+        candidates = released if len(released) else np.arange(nv)
+        if self.steal == "quietest":
+            return int(candidates[np.argmin(self.level[candidates])])
+        return int(candidates[np.argmin(self.order[candidates])])
+
+    def render(self, out, wave_type):
+        """Rend toutes les voix avec leur enveloppe dans out (mix multiplié par le gain)
+        input:  - out: Tableau à remplir (longueur au plus bank.max_frames) : 1-D en mono, (trames, canaux) sinon
+                - wave_type: Forme d'onde (voir OscillatorBank.render)
+        output: out
+
+        Avec le backend numba, les étapes 1 à 3 sont faites en un seul passage par kernels.adsr.
+
+        1) t de chaque échantillon : t (voix, 1) + rampe (1, trames)
+        2) Enveloppe avant relâchement : attaque puis décroissance vers le sustain
+        3) Après relâchement : décroissance linéaire vers 0 depuis le niveau au relâchement (remplacée uniquement là où t ≥ t_rel).
+           t - t_rel est calculé par voix en float64 puis déroulé sur le bloc : pas de perte de précision sur les notes longues en float32
+        4) Rend les oscillateurs multipliés par l'enveloppe et applique le gain
+        5) Avance le temps des voix et libère celles dont le relâchement est terminé
+        """
+        n = len(out)
+        nv = self.bank.n_voices
+        if nv == 0:
+            out[:] = 0
+            return out
+        size = nv * n
+        env = self._env[:size].reshape(nv, n)
+        if self.backend == "numba":
+            kernels.adsr(env, self.t[:nv], self.start_level[:nv], self.rel_at[:nv], self.rel_level[:nv],
+                         self.n_attack, self.n_decay, self.sustain, self.n_release)
+        else:
+            self._adsr(env, nv, n)
+        # 4)
+        self.bank.render(out, wave_type, env)
+        np.multiply(out, self.gain, out=out)
+        # 5)
+        self.level[:nv] = env[:, -1]
+        self.t[:nv] += n
+        for i in range(nv - 1, -1, -1): # Parcours à l'envers : la voix déplacée dans la case i a déjà été traitée
+            if self.t[i] - self.rel_at[i] >= self.n_release:
+                self._free(i)
+        return out
+
+    def _adsr(self, env, nv, n):
+        """Étapes 1 à 3 de render en opérations numpy sur des tableaux (voix × trames) : enveloppe de toutes les voix dans env"""
+        size = nv * n
+        t = self._t[:size].reshape(nv, n)
+        tmp = self._tmp[:size].reshape(nv, n)
+        mask = self._mask[:size].reshape(nv, n)
+        # 1)
+        np.add(self.t[:nv, None], self._ramp[:n], out=t)
+        # 2)
+        np.divide(t, self.n_attack, out=env)
+        np.clip(env, 0.0, 1.0, out=env)
+        np.multiply(env, (1 - self.start_level[:nv])[:, None], out=env)
+        np.add(env, self.start_level[:nv, None], out=env)
+        np.subtract(t, self.n_attack, out=tmp)
+        np.divide(tmp, self.n_decay, out=tmp)
+        np.clip(tmp, 0.0, 1.0, out=tmp)
+        np.multiply(tmp, 1 - self.sustain, out=tmp)
+        np.subtract(env, tmp, out=env)
+        # 3)
+        since = self._since[:nv]
+        np.subtract(self.t[:nv], self.rel_at[:nv], out=since) # -inf pour les notes tenues
+        np.add(self._ramp[:n], since[:, None], out=tmp)
+        np.greater_equal(tmp, 0.0, out=mask)
+        if mask.any():
+            np.divide(tmp, self.n_release, out=tmp)
+            np.clip(tmp, 0.0, 1.0, out=tmp)
+            np.subtract(1.0, tmp, out=tmp)
+            np.multiply(tmp, self.rel_level[:nv, None], out=tmp)
+            np.copyto(env, tmp, where=mask)
+
+    def _free(self, i):
+        """Libère la case i (même échange que OscillatorBank.remove_voice sur les tableaux d'état)"""
+        last = self.bank.n_voices - 1
+        self.bank.remove_voice(int(self.bank.ids[i]))
+        for arr in (self.t, self.rel_at, self.rel_level, self.start_level, self.level, self.order):
+            arr[i] = arr[last]
+        self.rel_at[last] = np.inf
+
+    def clear(self):
+        """Coupe immédiatement toutes les voix"""
+        self.bank.clear()
+        self.rel_at[:] = np.inf
+
+    def close(self):
+        """Rien à libérer (même interface que parallel.ParallelVoices)"""
@@ -0,0 +1,192 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Format d'échantillon → (code de format WAV, type numpy, octets par échantillon)
+SAMPLE_FORMATS = {
+    "int16": (1, np.int16, 2),    # WAVE_FORMAT_PCM
+    "float32": (3, np.float32, 4), # WAVE_FORMAT_IEEE_FLOAT
+}
+
+RIFF_MAX = 0xFFFFFFFF # Plus grande taille d'un champ 32 bits RIFF (au-delà : RF64)
+DS64_SIZE = 28 # Bloc "ds64" : tailles du fichier et des données, nombre de trames (64 bits), longueur de la table (0)
+
+
+class WavWriter:
+    """Écriture d'un fichier WAV au fil de l'eau, sans garder le signal en mémoire
+
+    L'en-tête est écrit à l'ouverture avec des tailles provisoires, puis corrigé par fix_header()
+    (à la fermeture, et à la demande pour qu'un fichier en cours d'écriture reste lisible).
+    Les tailles d'un fichier RIFF sont sur 32 bits (4 Gio, ≈ 3.4 h de stéréo float32) : l'en-tête réserve un bloc "JUNK" de la taille
+    d'un bloc "ds64", remplacé au-delà de 4 Gio par le bloc "ds64" (tailles sur 64 bits) d'un fichier RF64 (EBU Tech 3306).
+    L'en-tête garde la même longueur : il est toujours réécrit en place.
+    L'espace disque peut être réservé à l'avance (preallocate) : les écritures suivantes n'ont pas à agrandir le fichier.
+    """
+
+    def __init__(self, path, fs=44100, channels=1, fmt="int16"):
+        """
+        input:  - path: Chemin du fichier WAV
+                - fs: Fréquence d'échantillonnage (en Hz)
+                - channels: Nombre de canaux
+                - fmt: Format des échantillons ("int16" ou "float32")
+        """
+        if fmt not in SAMPLE_FORMATS:
+            raise ValueError(f"Format inconnu : {fmt!r} (attendu : {', '.join(SAMPLE_FORMATS)})")
+        self.fs = fs
+        self.channels = channels
+        self.fmt = fmt
+        self.code, self.dtype, self.width = SAMPLE_FORMATS[fmt]
+        self.frames = 0 # Nombre de trames écrites
+        self.allocated = 0 # Taille réservée du fichier (octets), 0 : pas de réservation
+        self.file = open(path, "wb")
+        self._write_header()
+
+    def _header(self):
+        """Construit l'en-tête RIFF/WAVE pour le nombre de trames déjà écrites (RF64 si les données dépassent 4 Gio)
+        1) Blocs "fmt " et "fact" (formats non PCM), tailles réelles des données et du fichier
+        2) Jusqu'à 4 Gio : en-tête RIFF, précédé d'un bloc "JUNK" réservant la place du bloc "ds64"
+        3) Au-delà : en-tête RF64, tailles 32 bits à 0xFFFFFFFF et vraies tailles dans le bloc "ds64"
+        """
+        # 1)
+        data_size = self.frames * self.channels * self.width
+        block_align = self.channels * self.width
+        fmt_chunk = struct.pack("<HHIIHH", self.code, self.channels, self.fs, self.fs * block_align, block_align, self.width * 8)
+        fact = b""
+        if self.code != 1: # Formats non PCM : champ cbSize dans fmt et bloc "fact" (nombre de trames)
+            fmt_chunk += struct.pack("<H", 0)
+            fact = b"fact" + struct.pack("<II", 4, min(self.frames, RIFF_MAX))
+        chunks = b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk + fact + b"data"
+        riff_size = 4 + 8 + DS64_SIZE + len(chunks) + 4 + data_size # "WAVE", bloc JUNK/ds64, blocs, taille de data, données
+        # 2)
+        if riff_size <= RIFF_MAX:
+            return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE" + b"JUNK" + struct.pack("<I", DS64_SIZE) + bytes(DS64_SIZE)
+                    + chunks + struct.pack("<I", data_size))
+        # 3)
+        ds64 = struct.pack("<QQQI", riff_size, data_size, self.frames, 0) # Tailles 64 bits, table de blocs vide
+        return (b"RF64" + struct.pack("<I", RIFF_MAX) + b"WAVE" + b"ds64" + struct.pack("<I", DS64_SIZE) + ds64
+                + chunks + struct.pack("<I", RIFF_MAX))
+
+    def _write_header(self):
+        self.file.write(self._header())
+        self.data_start = self.file.tell()
+
+    @property
+    def data_end(self):
+        """Position (octets) de la fin des données écrites"""
+        return self.data_start + self.frames * self.channels * self.width
+
+    def fix_header(self):
+        """Réécrit l'en-tête avec les tailles courantes, puis revient à la fin des données (avant l'espace réservé)"""
+        self.file.seek(0)
+        self.file.write(self._header())
+        self.file.seek(self.data_end)
+        self.file.flush()
+
+    def preallocate(self, frames):
+        """Réserve l'espace disque de frames trames au-delà des données écrites (sans effet si l'espace est déjà réservé).
+        L'en-tête ne compte que les données écrites : le fichier reste lisible, l'espace réservé inutilisé est rendu à la fermeture"""
+        size = self.data_end + int(frames) * self.channels * self.width
+        if size <= self.allocated:
+            return
+        self.file.flush()
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(self.file.fileno(), self.allocated, size - self.allocated)
+        else:
+            self.file.truncate(size)
+        self.allocated = size
+
+    def write(self, samples):
+        """Ajoute des échantillons (déjà au format du fichier, ex: sortie de OutputStage.process, forme (n,) ou (n, channels))"""
+        samples = np.ascontiguousarray(samples, dtype=self.dtype)
+        self.file.write(memoryview(samples).cast("B")) # Écrit le tableau sans le recopier
+        self.frames += len(samples)
+
+    def close(self):
+        """Corrige l'en-tête, rend l'espace réservé inutilisé et ferme le fichier"""
+        if not self.file.closed:
+            self.fix_header()
+            if self.allocated > self.data_end:
+                self.file.truncate(self.data_end)
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawWriter:
+    """Écriture d'échantillons bruts (sans en-tête) dans un flux binaire, par défaut la sortie standard, ou dans un fichier (path)"""
+
+    def __init__(self, stream=None, channels=1, fmt="int16", path=None):
+        if fmt not in SAMPLE_FORMATS:
+            raise ValueError(f"Format inconnu : {fmt!r} (attendu : {', '.join(SAMPLE_FORMATS)})")
+        self.owned = path is not None # Fichier ouvert ici, fermé par close()
+        self.stream = open(path, "wb") if path is not None else (stream if stream is not None else sys.stdout.buffer)
+        self.channels = channels
+        self.fmt = fmt
+        self.dtype = SAMPLE_FORMATS[fmt][1]
+        self.frames = 0
+
+    def write(self, samples):
+        samples = np.ascontiguousarray(samples, dtype=self.dtype)
+        self.stream.write(memoryview(samples).cast("B"))
+        self.frames += len(samples)
+
+    def fix_header(self):
+        """Pas d'en-tête : rend seulement les données écrites visibles dans le fichier"""
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+        if self.owned:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FlacWriter:
+    """Écriture d'un fichier FLAC (sans perte, environ deux fois plus petit qu'un WAV) au fil de l'eau, par libsndfile
+
+    Dépendance optionnelle : pip install soundfile, importée à la création du premier FlacWriter (libsndfile n'est pas chargée
+    par les écritures WAV). Échantillons int16 uniquement (FLAC est un format entier).
+    """
+
+    def __init__(self, path, fs=44100, channels=1, fmt="int16"):
+        try:
+            import soundfile
+        except ImportError:
+            raise RuntimeError("l'écriture FLAC nécessite soundfile (pip install soundfile)") from None
+        if fmt != "int16":
+            raise ValueError(f"Format {fmt!r} non pris en charge en FLAC (attendu : int16)")
+        self.fs = fs
+        self.channels = channels
+        self.fmt = fmt
+        self.dtype = SAMPLE_FORMATS[fmt][1]
+        self.frames = 0
+        self.file = soundfile.SoundFile(path, "w", samplerate=fs, channels=channels, format="FLAC", subtype="PCM_16")
+
+    def write(self, samples):
+        self.file.write(np.ascontiguousarray(samples, dtype=self.dtype))
+        self.frames += len(samples)
+
+    def fix_header(self):
+        """Vide les tampons de libsndfile (l'en-tête FLAC est complété à la fermeture)"""
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+
+# Formes d'onde "table d'onde" proposées dans l'interface et forme d'onde de base correspondante
+TABLE_WAVES = {"Carré (table)": "Carré", "Dents de scie (table)": "Dents de scie"}
+# Nom de chaque forme d'onde de base dans le fichier de cache (noms ASCII)
+_CACHE_KEYS = {"Carré": "square", "Dents de scie": "saw"}
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "synthm2")
+
+
+class WavetableSet:
+    """Tables d'onde à bande limitée, une table par octave (mip-mapping)
+
+    Pour chaque forme d'onde, la table de l'octave k ne contient que les harmoniques qui restent sous la fréquence de Nyquist
+    pour la note la plus aiguë de l'octave (f0 * 2**(k+1)) : la lecture ne produit donc pas de repliement (aliasing).
+    Chaque table est bordée d'un échantillon avant et de deux échantillons après (copiés de l'autre extrémité)
+    pour que l'interpolation linéaire ou cubique n'ait jamais besoin de modulo.
+    """
+
+    def __init__(self, fs=44100, size=2048, n_octaves=10, f0=27.5, tables=None):
+        """
+        input:  - fs: Fréquence d'échantillonnage (en Hz)
+                - size: Nombre d'échantillons par période dans chaque table
+                - n_octaves: Nombre de tables (octaves) par forme d'onde
+                - f0: Fréquence la plus basse de la première octave (27.5 Hz = La0)
+                - tables: Dictionnaire {forme d'onde: tableau (n_octaves, size + 3)} déjà calculé (ex: chargé depuis le cache), sinon les tables sont calculées
+
+        1) Enregistre les paramètres
+        2) Calcule les tables si elles ne sont pas fournies
+        3) Garde une vue à plat de chaque table pour les lectures vectorisées (np.take), en float64 et en float32
+        """
+        # 1)
+        self.fs = fs
+        self.size = int(size)
+        self.n_octaves = int(n_octaves)
+        self.f0 = f0
+        self.stride = self.size + 3 # Longueur d'une ligne (table + bordures)
+        # 2)
+        self.tables = tables if tables is not None else {wave: self._build(wave) for wave in _CACHE_KEYS}
+        # 3)
+        self.flat = {wave: np.ascontiguousarray(tab).ravel() for wave, tab in self.tables.items()}
+        self.flat32 = {wave: tab.astype(np.float32) for wave, tab in self.flat.items()} # Lecture par un OscillatorBank en float32 sans conversion
+
+    def _build(self, wave):
+        """Calcule les tables d'une forme d'onde par synthèse additive (FFT inverse)
+        input:  - wave: "Carré" ou "Dents de scie"
+        output: Tableau (n_octaves, size + 3)
+
+        1) Coefficients de Fourier (en sinus) de la forme d'onde idéale, identique à celle de OscillatorBank :
+            - Carré : +1 sur la première demi-période : 4/(π k) pour les harmoniques impaires
+            - Dents de scie : rampe de -1 à 1 : -2/(π k) pour toutes les harmoniques
+        2) Pour chaque octave, ne garde que les harmoniques sous Nyquist et reconstruit une période par FFT inverse
+        3) Ajoute les bordures pour l'interpolation
+        """
+        # 1)
+        k = np.arange(self.size // 2 + 1, dtype=np.float64)
+        coefs = np.zeros_like(k)
+        if wave == "Carré":
+            coefs[1::2] = 4 / (np.pi * k[1::2])
+        else:
+            coefs[1:] = -2 / (np.pi * k[1:])
+        out = np.empty((self.n_octaves, self.stride))
+        for octave in range(self.n_octaves):
+        # 2)
+            max_harmonic = max(1, int((self.fs / 2) // (self.f0 * 2 ** (octave + 1)))) # Harmonique la plus haute sans repliement
+            spectrum = np.zeros(len(k), dtype=np.complex128)
+            spectrum[1:max_harmonic + 1] = -0.5j * self.size * coefs[1:max_harmonic + 1] # a·sin(2πkx) ↔ -j·a·N/2 en FFT réelle
+            period = np.fft.irfft(spectrum, n=self.size)
+        # 3)
+            out[octave, 1:self.size + 1] = period
+            out[octave, 0] = period[-1]
+            out[octave, self.size + 1:] = period[:2]
+        return out
+
+    @classmethod
+    def load_or_build(cls, fs=44100, size=2048, n_octaves=10, f0=27.5, cache_dir=DEFAULT_CACHE_DIR):
+        """Charge les tables depuis le cache disque, ou les calcule puis les enregistre dans le cache
+        input:  - fs, size, n_octaves, f0: voir __init__ (ils font partie du nom du fichier de cache)
+                - cache_dir: Dossier du cache (None pour ne pas utiliser de cache)
+        output: Instance de WavetableSet
+        """
+        if cache_dir is None:
+            return cls(fs, size, n_octaves, f0)
+        path = os.path.join(cache_dir, f"wavetables_{fs}_{size}_{n_octaves}_{f0}.npz")
+        try:
+            with np.load(path) as data:
+                tables = {wave: data[key] for wave, key in _CACHE_KEYS.items()}
+            return cls(fs, size, n_octaves, f0, tables=tables)
+        except (OSError, KeyError, ValueError): # Cache absent ou invalide : on recalcule
+            pass
+        wavetables = cls(fs, size, n_octaves, f0)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(path, **{key: wavetables.tables[wave] for wave, key in _CACHE_KEYS.items()})
+        except OSError as e: # Un cache non inscriptible n'empêche pas de jouer
+            print(f"Impossible d'écrire le cache des tables d'onde : {e}")
+        return wavetables
+
+    def row_offset(self, freq):
+        """Retourne le décalage (dans la vue à plat) de la table à utiliser pour une fréquence donnée"""
+        octave = int(np.clip(np.floor(np.log2(max(freq, 1e-9) / self.f0)), 0, self.n_octaves - 1))
+        return octave * self.stride + 1 # +1 : on saute la bordure de début
+
+    def row_offsets(self, freqs):
+        """Comme row_offset, pour un tableau de fréquences (une seule opération, ex: toutes les copies d'unisson d'une voix)"""
+        octave = np.clip(np.floor(np.log2(np.maximum(freqs, 1e-9) / self.f0)), 0, self.n_octaves - 1)
+        return octave.astype(np.int64) * self.stride + 1
+
+    def read(self, wave, work, offsets, idx, taps, interp="linear"):
+        """Lit les tables en place, sans allocation
+        input:  - wave: "Carré" ou "Dents de scie"
+                - work: Tableau (voix × trames) contenant la phase en cycles; remplacé par les échantillons lus
+                - offsets: Tableau (voix,) des décalages de table de chaque voix (voir row_offset)
+                - idx: Tableau d'entiers de même forme que work (travail)
+                - taps: Cinq tableaux de travail de même forme que work : les quatre échantillons voisins et un tableau intermédiaire
+                - interp: "linear" ou "cubic" (Catmull-Rom)
+
+        1) Position dans la table : partie entière (index) et partie fractionnaire de phase * size
+        2) Lit les échantillons voisins dans la table de chaque voix (np.take sur la vue à plat)
+        3) Interpole entre les échantillons voisins
+        """
+        flat = (self.flat32 if work.dtype == np.float32 else self.flat)[wave]
+        p0, p1, p2, p3 = taps[:4]
+        # 1)
+        np.remainder(work, 1.0, out=work)
+        np.multiply(work, self.size, out=work)
+        np.floor(work, out=p1)
+        np.subtract(work, p1, out=work) # work = partie fractionnaire
+        np.copyto(idx, p1, casting="unsafe")
+        np.add(idx, offsets[:, None], out=idx)
+        # 2)
+        np.take(flat, idx, out=p1)
+        np.add(idx, 1, out=idx)
+        np.take(flat, idx, out=p2)
+        # 3)
+        if interp == "cubic":
+            scratch = taps[4]
+            np.add(idx, 1, out=idx)
+            np.take(flat, idx, out=p3)
+            np.subtract(idx, 3, out=idx)
+            np.take(flat, idx, out=p0)
+            # Catmull-Rom : y = p1 + x/2 · (c + x · (b + x · a)) avec
+            # a = 3(p1 - p2) + p3 - p0, b = p0 - 2p1 + p2 - a, c = p2 - p0
+            np.subtract(p1, p2, out=scratch)
+            np.multiply(scratch, 3.0, out=scratch)
+            np.subtract(p3, p0, out=p3)
+            np.add(p3, scratch, out=p3) # p3 = a
+            np.add(p0, p2, out=scratch)
+            np.subtract(scratch, p1, out=scratch)
+            np.subtract(scratch, p1, out=scratch)
+            np.subtract(scratch, p3, out=scratch) # scratch = b
+            np.subtract(p2, p0, out=p2) # p2 = c
+            np.multiply(p3, work, out=p3)
+            np.add(p3, scratch, out=p3)
+            np.multiply(p3, work, out=p3)
+            np.add(p3, p2, out=p3)
+            np.multiply(p3, work, out=p3)
+            np.multiply(p3, 0.5, out=p3)
+            np.add(p1, p3, out=work)
+        else:
+            np.subtract(p2, p1, out=p2)
+            np.multiply(p2, work, out=p2)
+            np.add(p1, p2, out=work)
+        return work
+
@@ -0,0 +1,80 @@
+"""Parité des backends de calcul (synth/kernels.py) : chaque boucle compilée par Numba contre la version numpy de référence
+
+La boucle compilée déroule la phase en float64 : en float64 les deux backends doivent donner le même signal à l'arrondi près,
+en float32 l'écart est celui de la phase arrondie de la version numpy (voir benchmarks/bench_kernels.py pour les temps).
+"""
+import numpy as np
+import pytest
+
+from synth import kernels
+from synth.generator import SignalGenerator
+from synth.output_stage import OutputStage
+from synth.voices import VoiceAllocator
+
+pytestmark = pytest.mark.skipif(not kernels.available(), reason="nécessite Numba (pip install numba)")
+
+TOLERANCE = {np.float64: 1e-9, np.float32: 2e-4}
+BLOCK = 128
+
+
+@pytest.fixture(scope="module")
+def gens():
+    """Un générateur par backend (tables d'onde partagées via le cache disque)"""
+    return {backend: SignalGenerator(44100, backend=backend) for backend in kernels.BACKENDS}
+
+
+def render_blocks(gen, wave, voices, dtype, channels, unison, blocks=8):
+    """Rend blocks blocs d'un OscillatorBank (enveloppe fixe, pitch bend d'un ton de la moitié des voix au milieu du rendu)"""
+    bank = gen.make_bank(max_voices=voices, max_frames=BLOCK, dtype=dtype, channels=channels, unison=unison, detune=10.0, spread=0.7)
+    freqs = 55.0 * 2 ** (np.arange(voices) * 7 % 60 / 12)
+    for k in range(voices):
+        bank.add_voice(k, freqs[k], 0.8, pan=(k % 5 - 2) / 2)
+    env = np.random.default_rng(voices).uniform(0.0, 1.0, (voices, BLOCK)).astype(dtype)
+    out = np.zeros((BLOCK, channels) if channels > 1 else BLOCK, dtype=dtype)
+    sig = np.zeros((blocks,) + out.shape, dtype=np.float64)
+    for b in range(blocks):
+        if b == blocks // 2:
+            bank.retune(0, voices // 2 + 1, freqs / gen.fs, ratio=2 ** (2 / 12))
+        sig[b] = bank.render(out, wave, env)
+    return sig
+
+
+@pytest.mark.parametrize("channels, unison", [(1, 1), (2, 3)])
+@pytest.mark.parametrize("voices", [1, 8, 32])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("wave", list(kernels.WAVE_CODES))
+def test_render_bank(gens, wave, dtype, voices, channels, unison):
+    ref, sig = (render_blocks(gens[backend], wave, voices, dtype, channels, unison) for backend in kernels.BACKENDS)
+    np.testing.assert_allclose(sig, ref, rtol=0, atol=TOLERANCE[dtype])
+
+
+@pytest.mark.parametrize("voices", [1, 8, 32])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_adsr(gens, dtype, voices):
+    """Même état de voix (attaque, décroissance, maintien, relâchement en cours ou à venir dans le bloc) : mêmes enveloppes"""
+    pool = VoiceAllocator(gens["numpy"].make_bank(max_voices=voices, max_frames=BLOCK, dtype=dtype), attack=0.005, decay=0.02,
+                          sustain=0.6, release=0.01)
+    rng = np.random.default_rng(voices)
+    pool.t[:voices] = rng.integers(0, 4000, voices)
+    pool.start_level[:voices] = rng.uniform(0.0, 1.0, voices)
+    released = rng.uniform(size=voices) < 0.5
+    pool.rel_at[:voices] = np.where(released, pool.t[:voices] + rng.integers(-600, BLOCK, voices), np.inf)
+    pool.rel_level[:voices] = rng.uniform(0.0, 1.0, voices)
+    ref = np.zeros((voices, BLOCK), dtype=dtype)
+    env = np.zeros((voices, BLOCK), dtype=dtype)
+    pool._adsr(ref, voices, BLOCK)
+    kernels.adsr(env, pool.t[:voices], pool.start_level[:voices], pool.rel_at[:voices], pool.rel_level[:voices],
+                 pool.n_attack, pool.n_decay, pool.sustain, pool.n_release)
+    np.testing.assert_allclose(env, ref, rtol=0, atol=TOLERANCE[dtype])
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("soft_clip", [True, False])
+@pytest.mark.parametrize("fmt", ["float32", "int16"])
+def test_convert(fmt, soft_clip, channels):
+    """Limitation et conversion : identiques en float32, au plus un pas de quantification en int16 (arrondi à la limite de deux pas)"""
+    shape = (BLOCK, channels) if channels > 1 else (BLOCK,)
+    mix = (np.random.default_rng(channels).standard_normal(shape) * 0.8).astype(np.float32)
+    ref, out = (OutputStage(BLOCK, channels=channels, fmt=fmt, soft_clip=soft_clip, backend=backend).process(mix).astype(np.float64)
+                for backend in kernels.BACKENDS)
+    np.testing.assert_allclose(out, ref, rtol=0, atol=1.0 if fmt == "int16" else 1e-6)
@@ -0,0 +1,78 @@
+"""Rendu hors ligne de référence (offline.render_offline) : en-têtes, nombre de trames et niveau du signal d'une courte séquence fixe
+
+Les valeurs de référence (REFERENCE_RMS) ont été mesurées avec le backend numpy : un écart signale un changement du son rendu.
+"""
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from offline import render_offline
+from synth.generator import SignalGenerator
+from synth.wav_writer import RawWriter, WavWriter
+
+FS = 44100
+# Accord de trois notes, relâchement échelonné, une note rejouée : 0.5 s + 0.05 s de relâchement
+EVENTS = [(0.0, "on", 60, 0.8), (0.0, "on", 64, 0.8), [0.1, "on", 67, 0.6], {"time": 0.25, "type": "off", "note": 60},
+          (0.3, "on", 60, 1.0), (0.4, "off", 64), (0.5, "off", 67), (0.5, "off", 60)]
+FRAMES = int(round(0.55 * FS))
+REFERENCE_RMS = {
+    ("Sinus", 1): 0.15840,
+    ("Dents de scie (polyBLEP)", 2): 0.09003,
+}
+
+
+def render(writer, wave_type, channels):
+    gen = SignalGenerator(FS, backend="numpy")
+    return render_offline(EVENTS, writer, fs=FS, block_size=256, wave_type=wave_type, gen=gen, channels=channels)
+
+
+def rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+
+@pytest.mark.parametrize("wave_type, channels", list(REFERENCE_RMS))
+def test_wav_int16(tmp_path, wave_type, channels):
+    path = tmp_path / "sortie.wav"
+    with WavWriter(path, fs=FS, channels=channels, fmt="int16") as writer:
+        stats = render(writer, wave_type, channels)
+    assert stats["frames"] == FRAMES
+    with wave.open(str(path)) as f:
+        assert (f.getnchannels(), f.getframerate(), f.getsampwidth(), f.getnframes()) == (channels, FS, 2, FRAMES)
+        data = np.frombuffer(f.readframes(FRAMES), dtype="<i2").reshape(FRAMES, channels) / 32767.0
+    assert rms(data) == pytest.approx(REFERENCE_RMS[wave_type, channels], rel=1e-3)
+
+
+@pytest.mark.parametrize("wave_type, channels", list(REFERENCE_RMS))
+def test_wav_float32(tmp_path, wave_type, channels):
+    path = tmp_path / "sortie.wav"
+    with WavWriter(path, fs=FS, channels=channels, fmt="float32") as writer:
+        render(writer, wave_type, channels)
+    raw = path.read_bytes()
+    assert raw[:4] == b"RIFF" and raw[8:12] == b"WAVE"
+    assert struct.unpack_from("<I", raw, 4)[0] == len(raw) - 8
+    code, n_channels, rate, byte_rate, block_align, bits = struct.unpack_from("<HHIIHH", raw, raw.index(b"fmt ") + 8)
+    assert (code, n_channels, rate, byte_rate, block_align, bits) == (3, channels, FS, FS * 4 * channels, 4 * channels, 32)
+    data_at = raw.index(b"data")
+    assert struct.unpack_from("<I", raw, raw.index(b"fact") + 8)[0] == FRAMES
+    assert struct.unpack_from("<I", raw, data_at + 4)[0] == FRAMES * 4 * channels
+    data = np.frombuffer(raw, dtype="<f4", offset=data_at + 8)
+    assert len(data) == FRAMES * channels
+    assert rms(data) == pytest.approx(REFERENCE_RMS[wave_type, channels], rel=1e-3)
+
+
+@pytest.mark.parametrize("wave_type, channels", list(REFERENCE_RMS))
+def test_raw_matches_wav(tmp_path, wave_type, channels):
+    """Les échantillons bruts sont exactement les données du fichier WAV (même rendu, sans en-tête)"""
+    stream = io.BytesIO()
+    writer = RawWriter(stream, channels=channels, fmt="int16")
+    stats = render(writer, wave_type, channels)
+    assert stats["frames"] == writer.frames == FRAMES
+    assert len(stream.getvalue()) == FRAMES * 2 * channels
+    path = tmp_path / "sortie.wav"
+    with WavWriter(path, fs=FS, channels=channels, fmt="int16") as wav_writer:
+        render(wav_writer, wave_type, channels)
+    with wave.open(str(path)) as f:
+        assert f.readframes(FRAMES) == stream.getvalue()
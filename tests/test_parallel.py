@@ -0,0 +1,73 @@
+"""Rendu multiprocessus (synth/parallel.py) : blocs découpés aux trames des événements, comme le fait le thread de rendu
+
+Le bloc est rendu en un seul ordre par worker, les découpes étant marquées par split : aucun worker ne doit manquer son échéance
+(durée d'un bloc, comme en temps réel), et le signal doit être celui du rendu dans le processus courant, tranche par tranche.
+"""
+import numpy as np
+import pytest
+
+from synth.generator import SignalGenerator
+from synth.parallel import ParallelVoices
+from synth.voices import VoiceAllocator
+
+BLOCK = 1024
+BLOCKS = 40
+WAVE = "Dents de scie (polyBLEP)"
+
+
+@pytest.fixture(scope="module")
+def gen():
+    return SignalGenerator(44100, backend="numpy")
+
+
+def schedule(b):
+    """Événements du bloc b, (trame, note, appui) : le bloc est découpé en tranches de 4, 296, 400 et 324 trames"""
+    note = 48 + (b * 5) % 24
+    return [(4, note, True), (300, note + 7, True), (700, note, False), (700, note + 7, False)]
+
+
+def render(voices, split):
+    """Rend BLOCKS blocs, chaque événement appliqué à sa trame : tranche par tranche, ou découpes marquées par split
+    puis un seul rendu par bloc"""
+    out = np.zeros((BLOCKS, BLOCK), dtype=np.float32)
+    for b in range(BLOCKS):
+        start = 0
+        for frame, note, on in schedule(b):
+            if frame > start:
+                if split:
+                    voices.split(frame)
+                else:
+                    voices.render(out[b, start:frame], WAVE)
+                start = frame
+            if on:
+                voices.note_on(note, 440.0 * 2 ** ((note - 69) / 12), 0.7)
+            else:
+                voices.note_off(note)
+        voices.render(out[b] if split else out[b, start:], WAVE)
+    return out
+
+
+def test_split_blocks_match_local_render(gen):
+    reference = render(VoiceAllocator(gen.make_bank(max_voices=16, max_frames=BLOCK), release=0.01), split=False)
+    voices = ParallelVoices(gen, max_voices=16, max_frames=BLOCK, workers=2, release=0.01)
+    try:
+        result = render(voices, split=True)
+        assert voices.late == 0 and voices.error is None
+    finally:
+        voices.close()
+    assert np.abs(reference).max() > 0.1
+    np.testing.assert_allclose(result, reference, atol=1e-5)
+
+
+def test_short_slices_wait_a_whole_block(gen):
+    """Sans split, une tranche de quelques trames attend quand même la durée d'un bloc entier (pas quelques microsecondes)"""
+    voices = ParallelVoices(gen, max_voices=8, max_frames=BLOCK, workers=2, release=0.01)
+    try:
+        voices.note_on(60, 261.63, 0.7)
+        out = np.zeros(BLOCK, dtype=np.float32)
+        for _ in range(50):
+            voices.render(out[:4], WAVE)
+            voices.render(out[4:], WAVE)
+        assert voices.late == 0
+    finally:
+        voices.close()
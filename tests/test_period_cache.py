@@ -0,0 +1,67 @@
+"""Arrondi des incréments de phase du cache de périodes (synth/period_cache.py) : best_ratios, vectorisé, contre le développement
+en fraction continue valeur par valeur, et état des boucles de chaque copie après OscillatorBank._snap
+"""
+import math
+
+import numpy as np
+import pytest
+
+from synth.generator import SignalGenerator
+from synth.period_cache import PeriodCache, best_ratios
+
+MAX_DEN = 16384
+MAX_CENTS = 0.1
+
+
+def reference_ratio(x, max_den, max_cents):
+    """Réduite la plus courte à max_cents près d'une seule valeur, (0, 0) si aucune ne convient"""
+    h0, h1, k0, k1 = 0, 1, 1, 0
+    y = x
+    while True:
+        a = math.floor(y)
+        h0, h1 = h1, a * h1 + h0
+        k0, k1 = k1, a * k1 + k0
+        if k1 > max_den:
+            return 0, 0
+        if h1 > 0 and abs(1200 * math.log2(h1 / (k1 * x))) <= max_cents:
+            return h1, k1
+        if y - a < 1e-12:
+            return (h1, k1) if h1 > 0 else (0, 0)
+        y = 1 / (y - a)
+
+
+def test_best_ratios_match_reference():
+    notes = 440.0 * 2 ** ((np.arange(128) - 69) / 12)
+    x = np.concatenate([notes / 44100, notes / 48000, np.random.default_rng(0).uniform(1e-4, 0.5, 5000), [0.0, 0.25, 1 / 3, 1e-9]])
+    m, n, inv = best_ratios(x, MAX_DEN, MAX_CENTS)
+    for xi, mi, ni, ii in zip(x.tolist(), m.tolist(), n.tolist(), inv.tolist()):
+        rm, rn = reference_ratio(xi, MAX_DEN, MAX_CENTS)
+        assert (mi, ni) == (rm, rn)
+        assert ii == (pow(rm, -1, rn) if rn else 0)
+
+
+def test_best_ratios_keep_shape():
+    x = np.full((3, 5), 0.01)
+    for result in best_ratios(x, MAX_DEN, MAX_CENTS):
+        assert result.shape == x.shape
+    assert [int(v) for v in best_ratios(0.01, MAX_DEN, MAX_CENTS)] == [1, 100, 1]
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_snap_rounds_every_copy(dtype):
+    """Après les appuis et un pitch bend, chaque copie de l'unisson a sa fraction m / n, l'inverse de m et son pas de grille"""
+    cache = PeriodCache(2**20, max_frames=256, dtype=dtype) # Un banc n'utilise que le cache de son type d'échantillons
+    gen = SignalGenerator(44100, backend="numpy", period_cache=cache)
+    bank = gen.make_bank(max_voices=8, max_frames=256, dtype=dtype, unison=5, detune=15.0)
+    freqs = 440.0 * 2 ** ((np.arange(128) - 69) / 12)
+    for note in (48, 55, 60, 64, 67):
+        bank.add_voice(note, freqs[note], 0.8)
+    bank.retune(0, 128, freqs / gen.fs, ratio=2 ** (0.37 / 12))
+    nv = bank.n_voices
+    assert nv == 5 and np.all(bank.loop_n[:nv] > 0)
+    for i in range(nv):
+        for u in range(bank.unison):
+            m, n = int(bank.loop_m[i, u]), int(bank.loop_n[i, u])
+            assert math.gcd(m, n) == 1 and bank.inc[i, u] == dtype(m / n)
+            assert m * int(bank.loop_inv[i, u]) % n == 1 % n
+            assert bank.loop_q[i, u] == -(-cache.resolution // n)
@@ -0,0 +1,30 @@
+"""En-têtes de synth/wav_writer.py : RIFF jusqu'à 4 Gio, RF64 au-delà, même longueur d'en-tête (réécrit en place)"""
+import struct
+import wave
+
+import numpy as np
+
+from synth.wav_writer import RIFF_MAX, WavWriter
+
+
+def test_riff_readable(tmp_path):
+    path = tmp_path / "a.wav"
+    with WavWriter(path, fs=48000, channels=2, fmt="int16") as writer:
+        writer.write(np.arange(2000, dtype=np.int16).reshape(1000, 2))
+    with wave.open(str(path)) as f:
+        assert (f.getnchannels(), f.getframerate(), f.getnframes()) == (2, 48000, 1000)
+        assert np.array_equal(np.frombuffer(f.readframes(1000), dtype="<i2"), np.arange(2000))
+
+
+def test_rf64_beyond_4gib(tmp_path):
+    """Au-delà de 4 Gio de données : en-tête RF64, tailles 32 bits saturées, vraies tailles dans le bloc ds64"""
+    with WavWriter(tmp_path / "b.wav", fs=44100, channels=2, fmt="float32") as writer:
+        riff = writer._header()
+        writer.frames = 2**30 # 8 Gio de stéréo float32 (seul l'en-tête est construit)
+        rf64 = writer._header()
+        writer.frames = 0
+    assert len(rf64) == len(riff)
+    assert rf64[:4] == b"RF64" and struct.unpack_from("<I", rf64, 4)[0] == RIFF_MAX and rf64[12:16] == b"ds64"
+    riff_size, data_size, frames = struct.unpack_from("<QQQ", rf64, 20)
+    assert (riff_size, data_size, frames) == (len(rf64) - 8 + 2**33, 2**33, 2**30)
+    assert rf64[-8:] == b"data" + struct.pack("<I", RIFF_MAX)